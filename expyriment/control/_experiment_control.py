@@ -226,6 +226,8 @@ def end(goodbye_text=None, goodbye_delay=None, confirmation=False,
             experiment._screen.colour = screen_colour
             experiment._event_file_log("Experiment,resumed")
             return False
+    if experiment.screen is not None:
+        experiment.screen._log_frame_stats()
     experiment._event_file_log("Experiment,ended")
     if goodbye_text is None:
         goodbye_text = defaults.goodbye_text
@@ -333,6 +335,11 @@ def initialize(experiment=None):
     else:
         experiment._events = None
     experiment._keyboard = Keyboard()
+    if defaults.initialize_measure_refresh_interval and \
+            experiment._screen.open_gl:
+        # The screen is still empty, so the repeated updates are not visible;
+        # without OpenGL, updates are not synchronised to the retrace
+        experiment._screen.measure_refresh_interval()
 
     logo = stimuli.Picture(misc.constants.EXPYRIMENT_LOGO_FILE,
                            position=(0, 100))
@@ -17,6 +17,7 @@ from expyriment.misc import constants as _constants
 
 
 initialize_delay = 10  # After approximately 10 seconds Python is timecritical
+initialize_measure_refresh_interval = True  # frame-locked timing (OpenGL)
 auto_create_subject_id = False
 goodbye_text = "Ending experiment..."
 goodbye_delay = 3000
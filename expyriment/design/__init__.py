@@ -16,4 +16,5 @@ import defaults
 import permute
 import randomize
 from _structure import Experiment, Block, Trial
+from _prefetch import TrialPrefetcher
 import extras
@@ -0,0 +1,366 @@
+"""
+The design._prefetch module of expyriment.
+
+This module contains a class implementing an asynchronous look-ahead
+preloading of the stimuli of upcoming trials.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import threading
+
+import defaults
+import expyriment
+from expyriment.misc import Clock
+
+
+class TrialPrefetcher(object):
+    """A class implementing a look-ahead preloading of trials of a block.
+
+    While trial N is running, a worker thread reads and decodes the files
+    of the visual stimuli of trials N+1 to N+depth (e.g. pictures). All
+    surfaces are created and preloaded (e.g. OpenGL texture upload) on the
+    main thread in small slices while Expyriment is waiting for a known
+    time (misc.Clock.wait or io.Keyboard.wait with a duration). Stimuli of
+    trials that have already been presented are unloaded automatically.
+
+    Examples
+    --------
+    >>> prefetcher = design.TrialPrefetcher(block, depth=3)
+    >>> for trial in prefetcher:
+    ...     for stimulus in trial.stimuli:
+    ...         stimulus.present()
+    ...         exp.clock.wait(500)
+    >>> print prefetcher.stalls
+
+    """
+
+    def __init__(self, block, depth=None, max_memory=None,
+                 unload_presented=True):
+        """Create a trial prefetcher.
+
+        Parameters
+        ----------
+        block : design.Block
+            the block with the trials to prefetch
+        depth : int, optional
+            number of upcoming trials to prepare
+        max_memory : int, optional
+            maximal number of bytes of loaded but not yet preloaded data
+        unload_presented : bool, optional
+            unload the stimuli of presented trials (default = True)
+
+        """
+
+        if depth is None:
+            depth = defaults.trialprefetcher_depth
+        if max_memory is None:
+            max_memory = defaults.trialprefetcher_max_memory
+        self._trials = list(block.trials)
+        self._depth = depth
+        self._max_memory = max_memory
+        self._unload_presented = unload_presented
+        self._position = -1
+        self._condition = threading.Condition()
+        self._pending = []  # stimuli to be loaded by the worker
+        self._in_progress = None
+        self._prepared = []  # [stimulus, data, n_bytes]
+        self._prepared_bytes = 0
+        self._stalls = 0
+        self._last_preload_time = 0
+        self._thread = None
+        self._running = False
+
+    @property
+    def depth(self):
+        """Getter for depth."""
+
+        return self._depth
+
+    @depth.setter
+    def depth(self, value):
+        """Setter for depth."""
+
+        self._depth = value
+        self._update_window()
+
+    @property
+    def max_memory(self):
+        """Getter for max_memory."""
+
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, value):
+        """Setter for max_memory."""
+
+        with self._condition:
+            self._max_memory = value
+            self._condition.notify_all()
+
+    @property
+    def stalls(self):
+        """Getter for the number of trials that were not ready in time."""
+
+        return self._stalls
+
+    @property
+    def position(self):
+        """Getter for the position of the current trial in the block."""
+
+        return self._position
+
+    @property
+    def is_running(self):
+        """Getter for is_running."""
+
+        return self._running
+
+    def __iter__(self):
+        """Iterate over the trials of the block.
+
+        The prefetcher is started and stopped automatically.
+
+        """
+
+        self.start()
+        try:
+            while True:
+                trial = self.next_trial()
+                if trial is None:
+                    break
+                yield trial
+        finally:
+            self.stop()
+
+    def start(self):
+        """Start the worker thread and the preloading in wait loops."""
+
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+        expyriment._active_exp._register_idle_function(self._idle)
+        self._update_window()
+
+    def stop(self):
+        """Stop the worker thread and discard all loaded data."""
+
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._pending = []
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+        expyriment._active_exp._unregister_idle_function(self._idle)
+        self._prepared = []
+        self._prepared_bytes = 0
+
+    def next_trial(self):
+        """Advance to the next trial and return it.
+
+        All stimuli of the returned trial are preloaded. If this was not done
+        in advance, the trial is preloaded now and counted as stall.
+
+        Returns
+        -------
+        trial : design.Trial
+            the next trial or None if there are no more trials
+
+        """
+
+        if self._unload_presented and 0 <= self._position < len(self._trials):
+            self._unload_trial(self._trials[self._position])
+        self._position += 1
+        if self._position >= len(self._trials):
+            return None
+        trial = self._trials[self._position]
+        self._update_window()
+        if self._make_ready(trial):
+            self._stalls += 1
+            expyriment._active_exp._event_file_log(
+                "Trial,prefetch stall,{0}".format(trial.id))
+        return trial
+
+    def _window(self):
+        """Return the stimuli of the upcoming trials (without duplicates)."""
+
+        stimuli = []
+        ids = set()
+        for trial in self._trials[self._position + 1:
+                                  self._position + 1 + self._depth]:
+            for stim in trial.stimuli:
+                if id(stim) not in ids:
+                    ids.add(id(stim))
+                    stimuli.append(stim)
+        return stimuli
+
+    def _update_window(self):
+        """Tell the worker which stimuli to create next."""
+
+        if not self._running:
+            return
+        with self._condition:
+            prepared = set([id(p[0]) for p in self._prepared])
+            pending = []
+            for stim in self._window():
+                if _needs_data(stim) and stim is not self._in_progress \
+                        and id(stim) not in prepared:
+                    pending.append(stim)
+            self._pending = pending
+            self._condition.notify_all()
+
+    def _take_prepared(self, stim):
+        """Return the loaded data of a stimulus (or None)."""
+
+        with self._condition:
+            while stim is self._in_progress:
+                self._condition.wait(0.01)
+            if stim in self._pending:
+                self._pending.remove(stim)
+            for idx, item in enumerate(self._prepared):
+                if item[0] is stim:
+                    self._prepared.pop(idx)
+                    self._prepared_bytes -= item[2]
+                    self._condition.notify_all()
+                    return item[1]
+        return None
+
+    def _make_ready(self, trial):
+        """Preload all stimuli of the trial; return True if work was needed."""
+
+        stalled = False
+        for stim in trial.stimuli:
+            data = None
+            if _needs_surface(stim):
+                data = self._take_prepared(stim)
+            if _needs_preload(stim):
+                stalled = True
+                self._preload(stim, data)
+        return stalled
+
+    def _preload(self, stim, data=None):
+        """Create the surface from loaded data and preload (main thread)."""
+
+        start = Clock._cpu_time()
+        if data is not None and _needs_surface(stim):
+            stim._set_surface(stim._create_surface_from_data(data))
+        stim.preload()
+        self._last_preload_time = int((Clock._cpu_time() - start) * 1000)
+
+    def _unload_trial(self, trial):
+        keep = set([id(s) for s in self._window()])
+        for stim in trial.stimuli:
+            if id(stim) in keep or not hasattr(stim, "unload"):
+                continue
+            if hasattr(stim, "_create_surface"):
+                stim.unload(keep_surface=False)
+            else:
+                stim.unload()
+
+    def _idle(self, time_left=None):
+        """Preload one stimulus of the upcoming trials.
+
+        This is called repeatedly from Expyriment wait loops. Nothing is done
+        if the remaining waiting time is unknown (e.g. during the playback of
+        a video) or too short.
+
+        Returns
+        -------
+        done : bool
+            True if a stimulus was preloaded
+
+        """
+
+        if time_left is None or time_left <= 2 * self._last_preload_time + 1:
+            return False
+        with self._condition:
+            if len(self._prepared) > 0:
+                stim, data, n_bytes = self._prepared.pop(0)
+                self._prepared_bytes -= n_bytes
+                self._condition.notify_all()
+            else:
+                stim, data = None, None
+        if stim is not None:
+            if _needs_preload(stim):
+                self._preload(stim, data)
+                return True
+            return False
+        # Stimuli without data to load in the worker (e.g. audio or text)
+        with self._condition:
+            busy = set([id(p[0]) for p in self._prepared] +
+                       [id(p) for p in self._pending] +
+                       [id(self._in_progress)])
+        for stim in self._window():
+            if _needs_preload(stim) and id(stim) not in busy:
+                self._preload(stim)
+                return True
+        return False
+
+    def _worker(self):
+        """Load the data of upcoming stimuli (worker thread).
+
+        Only files are read and decoded here; surfaces are created on the
+        main thread (see _preload), since pygame is not thread-safe.
+
+        """
+
+        while True:
+            with self._condition:
+                while self._running and (len(self._pending) == 0 or
+                                self._prepared_bytes >= self._max_memory):
+                    self._condition.wait(0.1)
+                if not self._running:
+                    return
+                stim = self._pending.pop(0)
+                self._in_progress = stim
+            try:
+                data = stim._load_data()
+            except:
+                data = None
+            n_bytes = _n_bytes(data)
+            with self._condition:
+                self._in_progress = None
+                if data is not None and self._running:
+                    self._prepared.append([stim, data, n_bytes])
+                    self._prepared_bytes += n_bytes
+                self._condition.notify_all()
+
+
+def _needs_surface(stimulus):
+    """Return True if the visual stimulus has neither surface nor texture."""
+
+    return hasattr(stimulus, "_create_surface") and \
+            not stimulus.has_surface and not stimulus.is_preloaded
+
+
+def _needs_data(stimulus):
+    """Return True if the stimulus needs a surface and loads data for it."""
+
+    return _needs_surface(stimulus) and \
+            stimulus.__class__._load_data.__func__ is not \
+            expyriment.stimuli._visual.Visual._load_data.__func__
+
+
+def _n_bytes(data):
+    """Return the number of bytes of the strings in the loaded data."""
+
+    if isinstance(data, (tuple, list)):
+        return sum([_n_bytes(x) for x in data])
+    if isinstance(data, basestring):
+        return len(data)
+    return 0
+
+
+def _needs_preload(stimulus):
+    return hasattr(stimulus, "preload") and not stimulus.is_preloaded
@@ -95,6 +95,7 @@ class Experiment(object):
         self._events = None
         self._log_level = 0  # will be set from initialize
         self._wait_callback_function = None
+        self._idle_functions = []
 
     @property
     def name(self):
@@ -918,18 +919,45 @@ type".format(permutation_type))
 
         self._wait_callback_function = None
 
-    def _execute_wait_callback(self):
-        """Execute wait function.
+    def _register_idle_function(self, function):
+        """Register an internal function to be executed in wait loops.
 
-        Returns True if wait function is defined and executed.
+        Idle functions are called with the remaining waiting time in ms
+        (or None if unknown) and have to return quickly. They return True if
+        they did some work.
 
         """
 
+        if function not in self._idle_functions:
+            self._idle_functions.append(function)
+
+    def _unregister_idle_function(self, function):
+        """Unregister an internal idle function."""
+
+        if function in self._idle_functions:
+            self._idle_functions.remove(function)
+
+    def _execute_wait_callback(self, time_left=None):
+        """Execute wait function and idle functions.
+
+        Returns True if the wait function is defined and executed or if an
+        idle function did some work.
+
+        Parameters
+        ----------
+        time_left : int, optional
+            remaining waiting time in ms, if known
+
+        """
+
+        executed = False
         if self._wait_callback_function is not None:
             self._wait_callback_function()
-            return True
-        else:
-            return False
+            executed = True
+        for function in self._idle_functions:
+            if function(time_left):
+                executed = True
+        return executed
 
 
 class Block(object):
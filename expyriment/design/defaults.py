@@ -28,5 +28,9 @@ experiment_filename_suffix = None
 block_name = None
 max_shuffle_time = 5000
 
+# TrialPrefetcher
+trialprefetcher_depth = 2
+trialprefetcher_max_memory = 128 * 1024 * 1024
+
 # trial_list
 trial_list_directory = 'trials'
@@ -15,6 +15,7 @@ __date__ = ''
 
 
 import defaults
+from _displaylist import DisplayList
 from _screen import Screen
 from _keyboard import Keyboard
 from _mouse import Mouse
@@ -0,0 +1,203 @@
+"""
+A display list.
+
+This module contains a class implementing a precompiled list of visual
+stimuli that are presented together.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import pygame
+
+import expyriment
+from expyriment.misc import Clock
+from _input_output import Output
+
+
+class DisplayList(Output):
+    """A class implementing a precompiled list of visual stimuli.
+
+    A display list presents several visual stimuli in one pass and with a
+    single screen update. All stimuli are validated and preloaded once, when
+    the list is compiled. The drawing order is optimised to minimise texture
+    changes, without changing the order of overlapping stimuli. Presenting
+    a display list writes a single record to the event file.
+
+    """
+
+    def __init__(self, stimuli=None):
+        """Create a display list.
+
+        Parameters
+        ----------
+        stimuli : list, optional
+            the visual stimuli to present (in drawing order)
+
+        """
+
+        Output.__init__(self)
+        if stimuli is None:
+            stimuli = []
+        self._stimuli = list(stimuli)
+        self._order = None
+        self._rects = None
+        self._positions = None
+
+    @property
+    def stimuli(self):
+        """Getter for stimuli."""
+
+        return self._stimuli
+
+    @property
+    def is_compiled(self):
+        """Getter for is_compiled."""
+
+        return self._order is not None
+
+    def add_stimulus(self, stimulus):
+        """Add a stimulus to the display list.
+
+        Parameters
+        ----------
+        stimulus : expyriment visual stimulus
+            the stimulus to add on top of all other stimuli
+
+        """
+
+        self._stimuli.append(stimulus)
+        self._order = None
+
+    def clear_stimuli(self):
+        """Remove all stimuli from the display list."""
+
+        self._stimuli = []
+        self._order = None
+
+    def compile(self):
+        """Validate and preload all stimuli and determine the drawing order.
+
+        Compiling is done automatically by present(), if required.
+
+        Returns
+        -------
+        time : int
+            the time it took to execute this method
+
+        """
+
+        start = Clock._cpu_time()
+        screen = expyriment._active_exp.screen
+        if not expyriment._active_exp.is_initialized or screen is None:
+            raise RuntimeError("Cannot not find a screen!")
+        for stim in self._stimuli:
+            if not hasattr(stim, "_create_surface"):
+                raise TypeError(
+                    "DisplayList can only present visual stimuli!")
+            if not stim.is_preloaded:
+                stim.preload()
+
+        # Screen rectangles and texture (surface) keys
+        half = (screen.size[0] / 2, screen.size[1] / 2)
+        rects = []
+        keys = []
+        for stim in self._stimuli:
+            if screen.open_gl:
+                size = stim._ogl_screen.size
+                keys.append(stim._ogl_screen.texture)
+            else:
+                surface = stim._get_surface()
+                size = surface.get_size()
+                keys.append(id(surface))
+            rect = pygame.Rect((0, 0), size)
+            rect.center = [stim.position[0] + half[0],
+                           - stim.position[1] + half[1]]
+            rects.append(rect)
+
+        # Group draws with the same texture. A stimulus is moved back to
+        # the last draw with the same texture only, if it does not overlap
+        # with any stimulus drawn in between.
+        order = []
+        for idx in range(len(self._stimuli)):
+            insert = len(order)
+            for pos in range(len(order) - 1, -1, -1):
+                if keys[order[pos]] == keys[idx]:
+                    insert = pos + 1
+                    break
+                if rects[order[pos]].colliderect(rects[idx]):
+                    break
+            order.insert(insert, idx)
+
+        self._order = order
+        self._rects = rects
+        self._positions = [list(s.position) for s in self._stimuli]
+        return int((Clock._cpu_time() - start) * 1000)
+
+    def _needs_compiling(self):
+        if self._order is None:
+            return True
+        for stim, position in zip(self._stimuli, self._positions):
+            if not stim.is_preloaded or list(stim.position) != position:
+                return True
+        return False
+
+    def present(self, clear=True, update=True, at_frame=None, at_time=None):
+        """Present all stimuli of the display list.
+
+        Parameters
+        ----------
+        clear : bool, optional
+            if True the screen will be cleared automatically
+            (default = True)
+        update : bool, optional
+            if False the screen will be not be updated automatically
+            (default = True)
+        at_frame : int, optional
+            update the screen this number of refresh intervals after the
+            last screen update (see Screen.update_at; requires update=True)
+        at_time : int, optional
+            update the screen on the frame closest to this time on the
+            experiment clock (in ms)
+
+        Returns
+        -------
+        time : int
+            the time it took to execute this method
+
+        """
+
+        start = Clock._cpu_time()
+        if self._needs_compiling():
+            self.compile()
+        screen = expyriment._active_exp.screen
+        scheduled = at_frame is not None or at_time is not None
+        if scheduled and not update:
+            raise ValueError(
+                "at_frame and at_time require update=True!")
+        if scheduled:
+            screen._require_refresh_interval()
+        if clear:
+            screen.clear()
+        if screen.open_gl:
+            for idx in self._order:
+                self._stimuli[idx]._ogl_screen.display()
+        else:
+            surface = screen.surface
+            for idx in self._order:
+                screen.mark_dirty(surface.blit(
+                    self._stimuli[idx]._get_surface(), self._rects[idx]))
+        if self._logging:
+            expyriment._active_exp._event_file_log(
+                "DisplayList,presented,{0}".format(
+                    " ".join([str(s.id) for s in self._stimuli])), 1)
+        if scheduled:
+            screen.update_at(at_frame=at_frame, at_time=at_time)
+        elif update:
+            screen.update()
+        return int((Clock._cpu_time() - start) * 1000)
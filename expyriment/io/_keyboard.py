@@ -201,7 +201,11 @@ class Keyboard(Input):
         pygame.event.pump()
         done = False
         while not done:
-            expyriment._active_exp._execute_wait_callback()
+            if duration:
+                expyriment._active_exp._execute_wait_callback(
+                    duration - int((Clock._cpu_time() - start) * 1000))
+            else:
+                expyriment._active_exp._execute_wait_callback()
             for event in pygame.event.get():
                 if check_for_control_keys and Keyboard.process_control_keys(event):
                     done = True
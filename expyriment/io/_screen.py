@@ -10,14 +10,20 @@ __revision__ = ''
 __date__ = ''
 
 
+import time
+from array import array
+
 import pygame
 try:
     import OpenGL.GL as ogl
 except ImportError:
     ogl = None
 
+import defaults
 import expyriment
+from expyriment.misc import Clock
 from _input_output import Output
+from _displaylist import DisplayList
 
 
 class Screen(Output):
@@ -32,6 +38,9 @@ class Screen(Output):
 
     """
 
+    _refresh_window = 31  # number of intervals for the refresh estimate
+    _min_refresh_interval = 4.0  # ms, shorter estimates are not plausible
+
     def __init__(self, colour, open_gl, window_mode, window_size):
         """Create and set up a screen output.
 
@@ -99,6 +108,26 @@ machine!")
         pygame.event.set_blocked(pygame.MOUSEBUTTONDOWN)
         pygame.event.set_blocked(pygame.MOUSEBUTTONUP)
 
+        # Ring buffer of flip timestamps (ms); 'continuous' marks flips that
+        # were requested less than one refresh interval after the previous
+        # flip, i.e. flips that were meant for the next frame
+        size = max(2, defaults.screen_frame_buffer_size)
+        self._flip_times = array('d', [0.0]) * size
+        self._flip_continuous = array('b', [0]) * size
+        self._n_flips = 0
+        self._flip_pixels = array('l', [0]) * size
+        self._refresh_interval = None
+        self._refresh_samples = array('d', [0.0]) * Screen._refresh_window
+        self._n_refresh_samples = 0
+        self._dropped_frames = 0
+
+        # Compositor (dirty rectangles, non OpenGL only)
+        self._compositor = False
+        self._dirty_rects = []
+        self._occupied_rects = []
+        self._full_redraw = True
+        self.compositor = defaults.screen_compositor
+
     @property
     def colour(self):
         """Getter for colour."""
@@ -108,6 +137,29 @@ machine!")
     def colour(self, value):
         """Setter for colour."""
         self._colour = value
+        self._full_redraw = True
+
+    @property
+    def compositor(self):
+        """Getter for compositor."""
+
+        return self._compositor
+
+    @compositor.setter
+    def compositor(self, value):
+        """Setter for compositor.
+
+        In compositor mode (non OpenGL only) the screen keeps track of the
+        areas stimuli have been drawn to. Clearing the screen restores the
+        background only in these areas and updating the screen copies only
+        the changed areas to the display.
+
+        """
+
+        self._compositor = bool(value) and not self._open_gl
+        self._dirty_rects = []
+        self._occupied_rects = []
+        self._full_redraw = True
 
     @property
     def surface(self):
@@ -141,18 +193,402 @@ machine!")
         """
 
         pygame.event.pump()
-        pygame.display.flip()
+        if self._open_gl:
+            expyriment.stimuli._visual._GLDrawState.reset()
+        request_time = Clock._cpu_time() * 1000
+        if self._compositor and not self._full_redraw:
+            rects = _merge_rects(self._dirty_rects)
+            pygame.display.update(rects)
+            pixels = sum([r.width * r.height for r in rects])
+        else:
+            pygame.display.flip()
+            pixels = self._window_size[0] * self._window_size[1]
+            self._full_redraw = False
+        self._dirty_rects = []
         if self._open_gl:
             ogl.glFinish()
+        self._register_flip(request_time, Clock._cpu_time() * 1000, pixels)
         if self._logging:
             expyriment._active_exp._event_file_log("Screen,updated", 2)
 
+    def update_at(self, at_frame=None, at_time=None):
+        """Update the screen on a certain frame.
+
+        The method waits until shortly before the target frame and then
+        updates the screen. The content of the screen (back buffer) should
+        therefore be prepared before calling this method.
+
+        Notes
+        -----
+        The refresh interval has to be known (see refresh_interval and
+        measure_refresh_interval). It is measured by control.initialize.
+        This requires OpenGL mode, since only then the screen updates are
+        synchronised to the vertical retrace.
+
+        Parameters
+        ----------
+        at_frame : int, optional
+            number of refresh intervals after the last screen update
+        at_time : int or float, optional
+            onset time on the experiment clock (in ms); the screen is
+            updated on the frame closest to this time
+
+        Returns
+        -------
+        onset : float
+            the realised onset on the experiment clock (in ms)
+
+        """
+
+        self._require_refresh_interval()
+        refresh = self._refresh_interval
+        if (at_frame is None) == (at_time is None):
+            raise ValueError("Either at_frame or at_time has to be specified!")
+        size = len(self._flip_times)
+        now = Clock._cpu_time() * 1000
+        if self._n_flips > 0:
+            last = self._flip_times[(self._n_flips - 1) % size]
+        else:
+            last = now
+        offset = expyriment._active_exp.clock.init_time
+        if at_time is not None:
+            requested = at_time
+            frame = int(round((at_time + offset - last) / refresh))
+        else:
+            requested = last + at_frame * refresh - offset
+            frame = at_frame
+        if last + frame * refresh < now:
+            frame = int((now - last) / refresh) + 1
+        target = last + frame * refresh
+        self._wait_until(target - min(defaults.screen_flip_lead_time,
+                                      refresh / 2.0))
+        self.update()
+        onset = self.last_flip_time
+        if self._logging:
+            expyriment._active_exp._event_file_log(
+                "Screen,updated at,{0:.3f},{1:.3f},{2:.3f}".format(
+                    requested, onset, onset - requested), 1)
+        return onset
+
+    def _wait_until(self, cpu_time):
+        """Wait until a certain CPU time (in ms)."""
+
+        exp = expyriment._active_exp
+        while True:
+            time_left = cpu_time - Clock._cpu_time() * 1000
+            if time_left <= 0:
+                break
+            if not exp._execute_wait_callback(time_left) and time_left > 20:
+                time.sleep(min(time_left - 10, 10) / 1000.0)
+
+    @property
+    def last_flip_time(self):
+        """Getter for the time of the last screen update.
+
+        The time is given on the experiment clock (in ms).
+
+        """
+
+        if self._n_flips == 0:
+            return None
+        cpu_time = self._flip_times[(self._n_flips - 1) % len(self._flip_times)]
+        return cpu_time - expyriment._active_exp.clock.init_time
+
+    def measure_refresh_interval(self, n_flips=30):
+        """Measure the refresh interval of the screen.
+
+        The screen is cleared and updated repeatedly, so this should only be
+        done while nothing is shown. control.initialize measures the refresh
+        interval (see control.defaults.initialize_measure_refresh_interval).
+
+        Notes
+        -----
+        The refresh interval can only be measured in OpenGL mode, since
+        otherwise the screen updates are not synchronised to the vertical
+        retrace. Without OpenGL, nothing is done and None is returned.
+        Estimates below 4 ms are rejected (e.g. if the synchronisation is
+        switched off in the graphics driver).
+
+        Parameters
+        ----------
+        n_flips : int, optional
+            number of screen updates (default = 30)
+
+        Returns
+        -------
+        refresh_interval : float
+            the estimated refresh interval in ms (or None)
+
+        """
+
+        if not self._open_gl:
+            return None
+        logging = self._logging
+        self._logging = False
+        try:
+            for _x in range(n_flips):
+                self.clear()
+                self.update()
+        finally:
+            self._logging = logging
+        return self._refresh_interval
+
+    def _require_refresh_interval(self):
+        """Raise a RuntimeError, if the refresh interval is unknown.
+
+        The refresh interval is never measured here, since this would blank
+        the screen in the middle of a trial.
+
+        """
+
+        if self._refresh_interval is not None:
+            return
+        if not self._open_gl:
+            raise RuntimeError(
+                "Frame-locked presentation requires OpenGL mode! Without " +
+                "OpenGL, screen updates are not synchronised to the " +
+                "vertical retrace (see control.defaults.open_gl).")
+        elif self._n_refresh_samples >= 3:
+            raise RuntimeError(
+                "Frame-locked presentation is not possible, since the " +
+                "screen updates are not synchronised to the vertical " +
+                "retrace (the measured refresh interval is below " +
+                "{0} ms)! Switch on vertical synchronisation ".format(
+                    Screen._min_refresh_interval) +
+                "in the graphics driver.")
+        else:
+            raise RuntimeError(
+                "The refresh interval of the screen is unknown! Call " +
+                "Screen.measure_refresh_interval() before the experiment " +
+                "starts (see control.defaults." +
+                "initialize_measure_refresh_interval).")
+
+    def play_sequence(self, sequence, clear=True):
+        """Present a sequence of visual stimuli frame-locked.
+
+        Each stimulus is presented for a given number of frames (refresh
+        intervals), e.g. for a rapid serial visual presentation. Onsets are
+        scheduled relative to the onset of the first stimulus, such that a
+        delayed onset does not shift the onsets of the following stimuli.
+        The last stimulus remains on the screen.
+        Frame-locked presentation requires OpenGL mode (see update_at).
+
+        Parameters
+        ----------
+        sequence : list
+            list of (stimulus, n_frames) tuples
+        clear : bool, optional
+            if True the screen will be cleared before each stimulus
+            (default = True)
+
+        Returns
+        -------
+        onsets : list
+            list of [stimulus id, requested onset, realised onset, drift]
+            for each item (times on the experiment clock in ms)
+
+        """
+
+        self._require_refresh_interval()
+        not_preloaded = []
+        for stim, _n_frames in sequence:
+            if not stim.is_preloaded:
+                not_preloaded.append((stim, stim.has_surface))
+                stim.preload(inhibit_ogl_compress=True)
+        onsets = []
+        requested = None
+        for stim, n_frames in sequence:
+            stim.present(clear=clear, update=False)
+            if requested is None:
+                self.update()
+                onset = requested = self.last_flip_time
+            else:
+                onset = self.update_at(at_time=requested)
+            onsets.append([stim.id, requested, onset, onset - requested])
+            requested += n_frames * self._refresh_interval
+        for stim, keep_surface in not_preloaded:
+            stim.unload(keep_surface=keep_surface)
+        return onsets
+
+    def mark_dirty(self, rect=None):
+        """Mark an area of the screen as changed (compositor mode only).
+
+        Stimuli presented via their present method are tracked
+        automatically. This method is only needed, if something has been
+        drawn directly on the screen surface.
+
+        Parameters
+        ----------
+        rect : pygame.Rect, optional
+            the changed area in screen (pixel) coordinates
+            (default = whole screen)
+
+        """
+
+        if not self._compositor:
+            return
+        if rect is None:
+            self._full_redraw = True
+        else:
+            rect = pygame.Rect(rect).clip(self._surface.get_rect())
+            if rect.width > 0 and rect.height > 0:
+                self._dirty_rects.append(rect)
+                self._occupied_rects.append(rect)
+
+    def _register_flip(self, request_time, flip_time, pixels=0):
+        """Store a flip timestamp and update the refresh estimate."""
+
+        size = len(self._flip_times)
+        continuous = False
+        if self._n_flips > 0:
+            last = self._flip_times[(self._n_flips - 1) % size]
+            interval = flip_time - last
+            refresh = self._refresh_interval
+            if refresh is None:
+                # Without estimate, a quickly requested flip is continuous
+                continuous = request_time - last < 50
+            else:
+                continuous = request_time - last < refresh
+            if continuous and self._open_gl:
+                # Only OpenGL flips are synchronised to the vertical retrace
+                if refresh is not None and interval > 1.5 * refresh:
+                    self._dropped_frames += 1
+                self._add_refresh_sample(interval)
+        idx = self._n_flips % size
+        self._flip_times[idx] = flip_time
+        self._flip_continuous[idx] = continuous
+        self._flip_pixels[idx] = pixels
+        self._n_flips += 1
+
+    def _add_refresh_sample(self, interval):
+        """Update the refresh estimate with the interval of a continuous flip.
+
+        The estimate is the median of the most recent intervals, so that
+        single short or long (dropped) frames do not change it. Medians
+        below Screen._min_refresh_interval are rejected, since the flips
+        are then not synchronised to the vertical retrace.
+
+        """
+
+        samples = self._refresh_samples
+        samples[self._n_refresh_samples % len(samples)] = interval
+        self._n_refresh_samples += 1
+        n = min(self._n_refresh_samples, len(samples))
+        if n >= 3:
+            recent = sorted(samples[:n])
+            if n % 2:
+                median = recent[n // 2]
+            else:
+                median = (recent[n // 2 - 1] + recent[n // 2]) / 2.0
+            if median >= Screen._min_refresh_interval:
+                self._refresh_interval = median
+            else:
+                self._refresh_interval = None
+
+    @property
+    def refresh_interval(self):
+        """Getter for the estimated refresh interval in ms (or None)."""
+
+        return self._refresh_interval
+
+    @property
+    def n_flips(self):
+        """Getter for the number of screen updates."""
+
+        return self._n_flips
+
+    @property
+    def dropped_frames(self):
+        """Getter for the number of dropped frames."""
+
+        return self._dropped_frames
+
+    def frame_stats(self, n_timestamps=None, percentile=95):
+        """Return statistics of the recent screen updates.
+
+        The timestamps of the last screen updates (flips) are kept in a ring
+        buffer of io.defaults.screen_frame_buffer_size entries. Intervals
+        are only taken into account for flips that were requested within
+        one refresh interval after the previous flip (e.g. animations). Such
+        a flip is counted as dropped frame, if it came more than 1.5
+        refresh intervals after the previous flip. The refresh interval is
+        the median of the last 31 of these intervals. Refresh interval and
+        dropped frames are only estimated in OpenGL mode (see
+        measure_refresh_interval).
+
+        Parameters
+        ----------
+        n_timestamps : int, optional
+            number of most recent timestamps to return (default = all
+            timestamps in the buffer)
+        percentile : int, optional
+            percentile of the intervals to return (default = 95)
+
+        Returns
+        -------
+        stats : dict
+            'n_flips', 'refresh_interval', 'mean_interval',
+            'percentile_interval', 'dropped_frames', 'timestamps' (array
+            of the most recent flip times in ms), 'pixels' (array of the
+            number of pixels copied to the display by these flips) and
+            'mean_pixels'
+
+        """
+
+        size = len(self._flip_times)
+        n_buffered = min(self._n_flips, size)
+        if n_timestamps is None or n_timestamps > n_buffered:
+            n_timestamps = n_buffered
+        first = self._n_flips - n_buffered
+        times = array('d', [self._flip_times[x % size]
+                            for x in range(first, self._n_flips)])
+        intervals = sorted([times[x] - times[x - 1]
+                            for x in range(1, n_buffered)
+                            if self._flip_continuous[(first + x) % size]])
+        pixels = array('l', [self._flip_pixels[x % size]
+                             for x in range(first, self._n_flips)])
+        if n_buffered > 0:
+            mean_pixels = float(sum(pixels)) / n_buffered
+        else:
+            mean_pixels = None
+        if len(intervals) > 0:
+            mean = sum(intervals) / len(intervals)
+            idx = int(round(percentile / 100.0 * (len(intervals) - 1)))
+            perc = intervals[max(0, min(idx, len(intervals) - 1))]
+        else:
+            mean = None
+            perc = None
+        return {"n_flips": self._n_flips,
+                "refresh_interval": self._refresh_interval,
+                "mean_interval": mean,
+                "percentile_interval": perc,
+                "dropped_frames": self._dropped_frames,
+                "timestamps": times[n_buffered - n_timestamps:],
+                "pixels": pixels[n_buffered - n_timestamps:],
+                "mean_pixels": mean_pixels}
+
+    def _log_frame_stats(self):
+        """Write a summary of the frame statistics to the event file."""
+
+        stats = self.frame_stats(0)
+        values = []
+        for key in ["n_flips", "refresh_interval", "mean_interval",
+                    "percentile_interval", "dropped_frames", "mean_pixels"]:
+            value = stats[key]
+            if isinstance(value, float):
+                value = "{0:.3f}".format(value)
+            values.append("{0}={1}".format(key, value))
+        expyriment._active_exp._event_file_log(
+            "Screen,frame stats," + " ".join(values))
+
     def update_stimuli(self, stimuli):
         """Update only some stimuli on the screen.
 
         Notes
         -----
-        This does only work for non OpenGL screens.
+        This does only work for non OpenGL screens. In compositor mode, all
+        areas that changed since the last update (e.g. cleared areas) are
+        updated as well.
 
         Parameters
         ----------
@@ -172,12 +608,85 @@ machine!")
                 rect_pos = (pos[0] + half_screen_size[0] - stim_size[0] / 2,
                             - pos[1] + half_screen_size[1] - stim_size[1] / 2)
                 rectangles.append(pygame.Rect(rect_pos, stim_size))
-            pygame.display.update(rectangles)
+            self._update_rects(rectangles)
             if self._logging:
                 expyriment._active_exp._event_file_log("Screen,stimuli updated,{0}"\
                                 .format([stim.id for stim in stimuli]), 2)
             pygame.event.pump()
 
+    def _update_rects(self, rects):
+        """Copy areas of the screen surface to the display (non OpenGL).
+
+        In compositor mode, the areas are marked as changed and all changed
+        areas are copied, so that no stale areas remain on the display.
+
+        Parameters
+        ----------
+        rects : list
+            list of pygame.Rect in screen (pixel) coordinates
+
+        """
+
+        if not self._compositor:
+            pygame.display.update(rects)
+            return
+        for rect in rects:
+            self.mark_dirty(rect)
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            pygame.display.update(_merge_rects(self._dirty_rects))
+        self._dirty_rects = []
+
+    def present_batch(self, stimuli, clear=True, update=True):
+        """Present several visual stimuli with a single screen update.
+
+        All stimuli are drawn in one pass (see io.DisplayList) and only one
+        record is written to the event file. Stimuli that are not preloaded
+        are preloaded and unloaded again afterwards (as by Visual.present, a
+        surface is only kept if the stimulus had one before).
+
+        Notes
+        -----
+        For a display that is presented repeatedly, create an io.DisplayList
+        once and call its present method.
+
+        Parameters
+        ----------
+        stimuli : list
+            the visual stimuli to present (in drawing order)
+        clear : bool, optional
+            if True the screen will be cleared automatically
+            (default = True)
+        update : bool, optional
+            if False the screen will be not be updated automatically
+            (default = True)
+
+        Returns
+        -------
+        time : int
+            the time it took to execute this method
+
+        """
+
+        start = Clock._cpu_time()
+        if type(stimuli) is not list:
+            stimuli = [stimuli]
+        # Like Visual.present, preload temporarily (without compression)
+        # and keep only surfaces that existed before
+        not_preloaded = [(s, s.has_surface) for s in stimuli
+                         if hasattr(s, "_create_surface") and
+                         not s.is_preloaded]
+        for stim, _keep_surface in not_preloaded:
+            stim.preload(inhibit_ogl_compress=True)
+        display_list = DisplayList(stimuli)
+        display_list.set_logging(self._logging)
+        display_list.present(clear=clear, update=update)
+        for stim, keep_surface in not_preloaded:
+            stim.unload(keep_surface=keep_surface)
+        return int((Clock._cpu_time() - start) * 1000)
+
     @property
     def center_x(self):
         """Getter for X-coordinate of the screen center."""
@@ -208,8 +717,14 @@ machine!")
                              float(self._colour[1]) / 255,
                              float(self._colour[2]) / 255, 0)
             ogl.glClear(ogl.GL_COLOR_BUFFER_BIT | ogl.GL_DEPTH_BUFFER_BIT)
+        elif self._compositor and not self._full_redraw:
+            for rect in _merge_rects(self._occupied_rects):
+                self._surface.fill(self._colour, rect)
+                self._dirty_rects.append(rect)
+            self._occupied_rects = []
         else:
             self._surface.fill(self._colour)
+            self._occupied_rects = []
         if self._logging:
             expyriment._active_exp._event_file_log("Screen,cleared", 2)
 
@@ -225,3 +740,29 @@ machine!")
         """
 
         pygame.image.save(self._surface, filename)
+
+
+def _merge_rects(rects):
+    """Merge overlapping rectangles.
+
+    Parameters
+    ----------
+    rects : list
+        list of pygame.Rect
+
+    Returns
+    -------
+    merged : list
+        list of non-overlapping pygame.Rect covering all rectangles
+
+    """
+
+    merged = []
+    for rect in sorted(rects, key=lambda r: (r.left, r.top)):
+        rect = pygame.Rect(rect)
+        idx = rect.collidelist(merged)
+        while idx >= 0:
+            rect.union_ip(merged.pop(idx))
+            idx = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -116,7 +116,7 @@ class TextInput(Input):
         else:
             self._message_font = find_font(expyriment._active_exp.text_font)
         try:
-            _font = pygame.font.Font(self._message_font, 10)
+            expyriment.stimuli.get_font_pool().get(self._message_font, 10)
         except:
             raise IOError("Font '{0}' not found!".format(message_font))
         if message_bold is not None:
@@ -145,7 +145,7 @@ class TextInput(Input):
         else:
             self._user_text_font = find_font(expyriment._active_exp.text_font)
         try:
-            _font = pygame.font.Font(self._user_text_font, 10)
+            expyriment.stimuli.get_font_pool().get(self._user_text_font, 10)
         except:
             raise IOError("Font '{0}' not found!".format(user_text_font))
         if user_text_colour is None:
@@ -188,11 +188,17 @@ class TextInput(Input):
             self._background_stimulus = None
 
         self._user = []
-        self._user_text_surface_size = None
         self._max_size = None
         self._message_surface_size = None
         self._canvas = None
         self._canvas_size = None
+        self._font = None
+        self._glyphs = {}  # character: (surface, advance)
+        self._line = None  # persistent input line (Canvas)
+        self._line_topleft = None
+        self._advances = []
+        self._line_width = 0
+        self._dirty_rects = []
 
     @property
     def message(self):
@@ -299,14 +305,15 @@ class TextInput(Input):
                 return event.key, event.unicode
 
     def _create(self):
-        """Create the input box."""
+        """Create the input box.
 
-        tmp = expyriment.stimuli.TextLine(text=self._length * "X",
-                               text_font=self.user_text_font,
-                               text_size=self.user_text_size,
-                               text_bold=self.user_text_bold)
-        expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
-        self._max_size = tmp.surface_size
+        The message, the frame and the empty input line are rendered once.
+
+        """
+
+        self._font = expyriment.stimuli.get_font_pool().get(
+            self.user_text_font, self.user_text_size, self.user_text_bold)
+        self._max_size = self._font.size(self._length * "X")
         message_text = expyriment.stimuli.TextLine(
             text=self._message, text_font=self.message_font,
             text_size=self.message_text_size, text_bold=self.message_bold,
@@ -339,6 +346,29 @@ class TextInput(Input):
                         message_text._get_surface(),
                         (self._canvas.surface_size[0] / 2 - \
                          self._message_surface_size[0] / 2, 0))
+
+        # Persistent input line
+        self._line = expyriment.stimuli.Canvas(
+            size=self._max_size, colour=self._background_colour)
+        expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
+        self._line._set_surface(self._line._get_surface())
+        offset = 2 + self._max_size[1] % 2
+        self._line.position = (self._canvas.absolute_position[0],
+                               self._canvas.absolute_position[1] + \
+                               self._canvas_size[1] / 2 - \
+                               self._max_size[1] / 2 - \
+                               self._message_surface_size[1] - self._gap - \
+                               offset)
+        screen_size = self._screen.size
+        self._line_topleft = (
+            self._line.position[0] + screen_size[0] / 2 - \
+            self._max_size[0] / 2,
+            - self._line.position[1] + screen_size[1] / 2 - \
+            self._max_size[1] / 2)
+        self._advances = []
+        self._line_width = 0
+        self._dirty_rects = [pygame.Rect((0, 0), self._max_size)]
+
         background = expyriment.stimuli.BlankScreen(
             colour=self._background_colour)
         if self._background_stimulus is not None:
@@ -348,29 +378,75 @@ class TextInput(Input):
         background.present() # for flipping with double buffer
         background.present() # for flipping with tripple buffer
 
+    def _get_glyph(self, char):
+        """Return the render and the advance of a character (cached)."""
+
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            glyph = (self._font.render(char, True, self.user_text_colour),
+                     self._font.size(char)[0])
+            self._glyphs[char] = glyph
+        return glyph
+
+    def _append(self, char):
+        """Append a character to the input line."""
+
+        surface, advance = self._get_glyph(char)
+        self._user.append(char)
+        self._dirty_rects.append(self._line._get_surface().blit(
+            surface, (self._line_width, 2)))
+        self._advances.append(advance)
+        self._line_width += advance
+
+    def _remove(self):
+        """Remove the last character from the input line."""
+
+        surface, advance = self._get_glyph(self._user.pop())
+        self._line_width -= self._advances.pop()
+        line = self._line._get_surface()
+        left = self._line_width
+        if len(self._user) > 0:
+            # The previous glyph can overhang its advance
+            left -= self._advances[-1]
+        rect = pygame.Rect(left, 0, self._line_width - left +
+                           max(advance, surface.get_width()),
+                           self._max_size[1]).clip(line.get_rect())
+        line.fill(self._background_colour, rect)
+        # Draw the glyphs that reach into the cleared area again
+        glyphs = []
+        x = self._line_width
+        for char, char_advance in zip(reversed(self._user),
+                                      reversed(self._advances)):
+            x -= char_advance
+            glyph = self._get_glyph(char)[0]
+            if len(glyphs) > 0 and x + glyph.get_width() <= rect.left:
+                break
+            glyphs.append((glyph, x))
+        line.set_clip(rect)
+        for glyph, x in reversed(glyphs):
+            line.blit(glyph, (x, 2))
+        line.set_clip(None)
+        self._dirty_rects.append(rect)
+
     def _update(self):
-        """Update the input box."""
+        """Update the input box.
 
-        user_canvas = expyriment.stimuli.Canvas(
-            size=self._max_size, colour=self._background_colour)
-        expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
-        user_canvas._set_surface(user_canvas._get_surface())
-        user_canvas_size = user_canvas.surface_size
-        offset = 2 + user_canvas_size[1] % 2
-        user_canvas.position = (self._canvas.absolute_position[0],
-                                     self._canvas.absolute_position[1] + \
-                                     self._canvas_size[1] / 2 - \
-                                     user_canvas_size[1] / 2 - \
-                                     self._message_surface_size[1] - self._gap - offset)
-        user_text = expyriment.stimuli.TextLine(
-            text="".join(self._user),
-            text_font=self.user_text_font, text_size=self.user_text_size,
-            text_bold=self.user_text_bold, text_colour=self.user_text_colour,
-            background_colour=self.background_colour)
-        expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
-        self._user_text_surface_size = user_text.surface_size
-        user_canvas._get_surface().blit(user_text._get_surface(), (0, 2))
-        user_canvas.present(clear=False)
+        Only the changed parts of the input line are copied to the screen
+        and to the display.
+
+        """
+
+        if len(self._dirty_rects) == 0:
+            return
+        if self._screen.open_gl:
+            self._line.present(clear=False)
+        else:
+            line = self._line._get_surface()
+            screen = self._screen.surface
+            self._screen._update_rects(
+                [screen.blit(line, rect.move(self._line_topleft), rect)
+                 for rect in self._dirty_rects])
+        self._dirty_rects = []
 
     def get(self, default_input=""):
         """Get input from user.
@@ -388,9 +464,9 @@ class TextInput(Input):
         """
 
         self._user = []
-        for char in default_input:
-            self._user.append(char)
         self._create()
+        for char in default_input:
+            self._append(char)
         self._update()
         if self._ascii_filter is None:
             ascii_filter = range(0, 256)
@@ -399,17 +475,18 @@ class TextInput(Input):
         while True:
             inkey, string = self._get_key()
             if inkey == pygame.K_BACKSPACE:
-                self._user = self._user[0:-1]
+                if len(self._user) > 0:
+                    self._remove()
             elif inkey == pygame.K_RETURN:
                 break
             elif inkey != pygame.K_LCTRL or pygame.K_RCTRL:
-                if not self._user_text_surface_size[0] >= self._max_size[0]:
+                if not self._line_width >= self._max_size[0]:
                     if android is not None:
                         if inkey in ascii_filter:
-                            self._user.append(chr(inkey))
+                            self._append(chr(inkey))
                     else:
                         if string and ord(string) in ascii_filter:
-                            self._user.append(string)
+                            self._append(string)
             self._update()
         got = "".join(self._user)
         if self._logging:
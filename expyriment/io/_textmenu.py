@@ -11,6 +11,8 @@ __version__ = ''
 __revision__ = ''
 __date__ = ''
 
+import pygame
+
 import defaults
 import expyriment
 from _keyboard import Keyboard
@@ -150,6 +152,10 @@ class TextMenu(Input):
                               text_justification=justification,
                               size=self._line_size))
             expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
+        self._rendered_items = {}  # index: [surface, selected surface]
+        self._static = None
+        self._strip = None
+        self._drawn = None  # (first visible item, selected item)
         self._heading = expyriment.stimuli.TextBox(heading,
                                     text_size=text_size,
                                     text_justification=justification,
@@ -235,51 +241,181 @@ class TextMenu(Input):
         """Getter for background_stimulus"""
         return self._background_stimulus
 
-    def _append_item(self, item, is_selected, y_position):
-        """helper function"""
-        item.clear_surface()
-        item.position = (self._position[0], y_position + self._position[1])
-        if is_selected:
-            item.background_colour = self._bkg_colours[1]
-            item.text_colour = self._text_colours[1]
-        else:
-            item.background_colour = self._bkg_colours[0]
-            item.text_colour = self._text_colours[0]
-        item.plot(self._canvas)
+    def _get_rendered_item(self, index):
+        """Return the pre-rendered surfaces of an item (normal, selected).
+
+        Items are rendered only once, when they are shown for the first
+        time.
+
+        """
+
+        surfaces = self._rendered_items.get(index)
+        if surfaces is None:
+            item = self._menu_items[index]
+            surfaces = [None, None]
+            for selected in (1, 0):
+                if item.has_surface:
+                    item.clear_surface()
+                item.background_colour = self._bkg_colours[selected]
+                item.text_colour = self._text_colours[selected]
+                surfaces[selected] = item._create_surface()
+            self._rendered_items[index] = surfaces
+        return surfaces
+
+    def _n_rows(self):
+        if self._scroll_menu > 0:
+            return 2 * (self._scroll_menu / 2) + 1
+        return len(self._menu_items)
+
+    def _first_item(self, selected_item):
+        """Return the item in the first visible row."""
+
+        if self._scroll_menu > 0:
+            return selected_item - self._scroll_menu / 2
+        return 0
+
+    def _rect(self, position, size):
+        """Return the canvas rectangle of an area at a position."""
+
+        canvas_size = self._canvas.surface_size
+        rect = pygame.Rect((0, 0), size)
+        rect.center = [position[0] + canvas_size[0] / 2,
+                       - position[1] + canvas_size[1] / 2]
+        return rect
+
+    def _row_y(self, row):
+        """Return the y position of a visible row."""
 
-    def _redraw(self, selected_item):
-        """helper function"""
         if self._scroll_menu > 0:
             n = self._scroll_menu
         else:
             n = len(self._menu_items)
-        self._canvas.clear_surface()
-        if self._background_stimulus is not None:
-            self._background_stimulus.plot(self._canvas)
         y_pos = int(((1.5 + n) * self._line_size[1]) + (n * self._gap)) / 2
-        self._heading.position = (self._position[0], y_pos + self._position[1])
-        self._heading.plot(self._canvas)
-        y_pos = y_pos - int(0.5 * self._line_size[1])
-
-        if self._scroll_menu == 0:
-            for cnt, item in enumerate(self._menu_items):
-                y_pos -= (self._line_size[1] + self._gap)
-                self._append_item(item, cnt == selected_item, y_pos)
-                if cnt == selected_item:
-                    self._frame.position = (0, y_pos)
-        else: #scroll menu
-            for cnt in range(selected_item - self._scroll_menu / 2,
-                             selected_item + 1 + self._scroll_menu / 2):
-                y_pos -= (self._line_size[1] + self._gap)
-                if cnt >= 0 and cnt < len(self._menu_items):
-                    self._append_item(self._menu_items[cnt], cnt == selected_item,
-                                      y_pos)
-                    if cnt == selected_item:
-                        self._frame.position = (0, y_pos)
+        return y_pos - int(0.5 * self._line_size[1]) - \
+                (row + 1) * (self._line_size[1] + self._gap)
+
+    def _row_rect(self, row, with_frame=False):
+        """Return the canvas rectangle of a visible row."""
+
+        y = self._row_y(row)
+        rect = self._rect((self._position[0], y + self._position[1]),
+                          self._line_size)
+        if with_frame and self._frame.line_width > 0:
+            rect.union_ip(self._rect((0, y), self._frame.surface_size))
+        return rect
+
+    def _strip_rect(self):
+        top = self._row_rect(0)
+        return pygame.Rect(top.topleft, (
+            self._line_size[0],
+            self._row_rect(self._n_rows() - 1).bottom - top.top))
+
+    def _draw_strip_rows(self, first, rows):
+        """Draw the items of some visible rows onto the strip."""
+
+        strip_top = self._row_rect(0).top
+        for row in rows:
+            rect = self._row_rect(row).move(0, -strip_top)
+            rect.left = 0
+            self._strip.fill((0, 0, 0, 0), rect)
+            if 0 <= first + row < len(self._menu_items):
+                self._strip.blit(self._get_rendered_item(first + row)[0],
+                                 rect)
+
+    def _scroll_strip(self, first, old_first):
+        """Scroll the strip of unselected items to a new first item.
+
+        The visible part of the strip is moved and only the rows that come
+        into view are drawn.
+
+        """
+
+        n_rows = self._n_rows()
+        delta = first - old_first
+        if abs(delta) >= n_rows:
+            self._draw_strip_rows(first, range(n_rows))
+            return
+        self._strip.scroll(0, -delta * (self._line_size[1] + self._gap))
+        if delta > 0:
+            self._draw_strip_rows(first, range(n_rows - delta, n_rows))
+        else:
+            self._draw_strip_rows(first, range(0, -delta))
+
+    def _restore(self, rect):
+        """Restore the static parts and the unselected items in a rect."""
+
+        surface = self._canvas._get_surface()
+        surface.blit(self._static, rect, rect)
+        strip_rect = self._strip_rect()
+        area = rect.clip(strip_rect)
+        if area.width > 0 and area.height > 0:
+            surface.blit(self._strip, area,
+                         area.move(-strip_rect.left, -strip_rect.top))
 
+    def _redraw(self, selected_item):
+        """helper function"""
+
+        surface = self._canvas._get_surface()
+        first = self._first_item(selected_item)
+        if self._drawn is None:
+            # Static parts (background and heading) are composited once
+            self._canvas.clear_surface()
+            if self._background_stimulus is not None:
+                self._background_stimulus.plot(self._canvas)
+            self._heading.position = (self._position[0],
+                                      self._row_y(-1) + \
+                                      int(0.5 * self._line_size[1]) + \
+                                      self._position[1])
+            self._heading.plot(self._canvas)
+            surface = self._canvas._get_surface()
+            self._static = surface.copy()
+            self._strip = pygame.surface.Surface(
+                self._strip_rect().size, pygame.SRCALPHA).convert_alpha()
+            self._draw_strip_rows(first, range(self._n_rows()))
+            self._restore(self._strip_rect())
+            dirty = None
+        else:
+            old_first, old_selected = self._drawn
+            if first != old_first:
+                self._scroll_strip(first, old_first)
+                dirty = [self._row_rect(0, True).union(
+                    self._row_rect(self._n_rows() - 1, True))]
+            else:
+                dirty = [self._row_rect(old_selected - first, True),
+                         self._row_rect(selected_item - first, True)]
+            for rect in dirty:
+                self._restore(rect)
+
+        # Selected item and frame; the unselected render of the strip must
+        # not show through a transparent selection background
+        row = selected_item - first
+        row_rect = self._row_rect(row)
+        surface.blit(self._static, row_rect, row_rect)
+        surface.blit(self._get_rendered_item(selected_item)[1], row_rect)
         if self._frame.line_width > 0:
+            self._frame.position = (0, self._row_y(row))
             self._frame.plot(self._canvas)
-        self._canvas.present()
+        self._drawn = (first, selected_item)
+
+        screen = expyriment._active_exp.screen
+        if dirty is None or screen.open_gl:
+            self._canvas.present()
+        else:
+            screen._update_rects([screen.surface.blit(surface, rect, rect)
+                                  for rect in dirty])
+
+    def _item_at(self, position, selected_item):
+        """Return the visible item at a position (or None)."""
+
+        canvas_size = self._canvas.surface_size
+        point = (position[0] + canvas_size[0] / 2,
+                 - position[1] + canvas_size[1] / 2)
+        first = self._first_item(selected_item)
+        for row in range(self._n_rows()):
+            if 0 <= first + row < len(self._menu_items) and \
+                    self._row_rect(row).collidepoint(point):
+                return first + row
+        return None
 
     def get(self, preselected_item=0):
         """Present the menu and return the selected item.
@@ -297,6 +433,7 @@ class TextMenu(Input):
         """
 
         selected = preselected_item
+        self._drawn = None
         # Keyboard
         if self._mouse is None:
             while True:
@@ -324,17 +461,7 @@ class TextMenu(Input):
                 print selected
                 self._redraw(selected)
                 event, pos, rt = self._mouse.wait_press()
-                if self._scroll_menu == 0:
-                    for cnt in range(len(self._menu_items)):
-                        if 0 <= cnt < len(self._menu_items):
-                            if self._menu_items[cnt].overlapping_with_position(pos):
-                                pressed = cnt
-                else:
-                    for cnt in range(selected-self._scroll_menu/2,
-                                     selected+1+self._scroll_menu/2):
-                        if 0 <= cnt < len(self._menu_items):
-                            if self._menu_items[cnt].overlapping_with_position(pos):
-                                pressed = cnt
+                pressed = self._item_at(pos, selected)
                 if pressed is not None:
                     if pressed == selected:
                         break
@@ -14,6 +14,11 @@ __date__ = ''
 
 from expyriment.misc import constants as _constants
 
+# Screen
+screen_frame_buffer_size = 3600
+screen_flip_lead_time = 2  # ms before a scheduled frame
+screen_compositor = False  # dirty rectangle updates (non OpenGL only)
+
 # Keyboard
 keyboard_default_keys = None
 
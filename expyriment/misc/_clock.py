@@ -102,12 +102,23 @@ class Clock(object) :
         """
 
         start = self.time
+        exp = expyriment._active_exp
         if type(function) == types.FunctionType or\
-                                 expyriment._active_exp._execute_wait_callback():
+                exp._wait_callback_function is not None:
             while (self.time < start + waiting_time):
                 if type(function) == types.FunctionType:
                     function()
-                expyriment._active_exp._execute_wait_callback()
+                exp._execute_wait_callback(start + waiting_time - self.time)
+        elif len(exp._idle_functions) > 0:
+            # Sleep in short slices, while idle functions have nothing to do
+            looptime = 200
+            while True:
+                time_left = start + waiting_time - self.time
+                if time_left <= 0:
+                    break
+                if not exp._execute_wait_callback(time_left) and \
+                        time_left > looptime:
+                    time.sleep(min(time_left - looptime, 10) / 1000.0)
         else:
             looptime = 200
             if (waiting_time > looptime):
@@ -62,11 +62,15 @@ def list_fonts():
         d[font] = pygame.font.match_font(font)
     return d
 
+_found_fonts = {}
+
 def find_font(font):
     """Find an installed font given a font name.
 
     This will try to match a font installed on the system that is similar to
     the given font name.
+    Found fonts are remembered, so that each font name is only looked up
+    once. Fonts that were not found are looked up again on the next call.
 
     Parameters
     ----------
@@ -84,15 +88,24 @@ def find_font(font):
     import pygame
     pygame.font.init()
 
+    try:
+        return _found_fonts[font]
+    except (KeyError, TypeError):
+        pass
     try:
         pygame.font.Font(font, 10)
-        return font
+        found = font
     except:
         font_file = pygame.font.match_font(font)
         if font_file is not None:
-            return font_file
+            found = font_file
         else:
             return ""
+    try:
+        _found_fonts[font] = found
+    except TypeError:
+        pass
+    return found
             
 def to_str(u, fse=False):
 
@@ -12,9 +12,36 @@ __revision__ = ''
 __date__ = ''
 
 import math as _math
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
 import expyriment as _expyriment
 
 
+def _require_numpy(function):
+    if _np is None:
+        raise ImportError("{0} needs the Python package 'numpy', ".format(
+            function) + "which is not installed.")
+
+
+def _screen_size(screen_size):
+    if screen_size is None:
+        return _expyriment._active_exp.screen.surface.get_size()
+    return screen_size
+
+
+def _as_point_array(points):
+    """Return points (array_like or list of XYPoints) as float array."""
+
+    points = [p.tuple if isinstance(p, XYPoint) else p for p in points] \
+            if isinstance(points, (list, tuple)) else points
+    points = _np.asarray(points, dtype=_np.float64)
+    if points.shape[-1:] != (2,):
+        raise ValueError("Points have to be an array of shape (..., 2)!")
+    return points
+
+
 def coordinates2position(coordinate):
     """Convert a coordinate on the screen to an expyriment position.
 
@@ -109,6 +136,120 @@ def visual_angle2position(visual_angle, viewing_distance, monitor_size):
             cm[1] * screen_size[1] / monitor_size[1])
 
 
+def coordinates2positions(coordinates, screen_size=None):
+    """Convert many coordinates on the screen to expyriment positions.
+
+    This is the array version of coordinates2position() and requires NumPy.
+
+    Parameters
+    ----------
+    coordinates : array_like
+        array of shape (..., 2) with coordinates (x, y)
+    screen_size : (int, int), optional
+        size of the screen (default = size of the current screen)
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        array of the shape of coordinates
+
+    """
+
+    _require_numpy("coordinates2positions()")
+    width, height = _screen_size(screen_size)
+    coordinates = _as_point_array(coordinates)
+    return coordinates * (1, -1) + (-(width // 2), height // 2)
+
+
+def positions2coordinates(positions, screen_size=None):
+    """Convert many expyriment positions to coordinates on the screen.
+
+    This is the array version of position2coordinate() and requires NumPy.
+
+    Parameters
+    ----------
+    positions : array_like
+        array of shape (..., 2) with positions (x, y)
+    screen_size : (int, int), optional
+        size of the screen (default = size of the current screen)
+
+    Returns
+    -------
+    coordinates : numpy.ndarray
+        array of the shape of positions
+
+    """
+
+    _require_numpy("positions2coordinates()")
+    width, height = _screen_size(screen_size)
+    positions = _as_point_array(positions)
+    return positions * (1, -1) + (width // 2, height // 2)
+
+
+def positions2visual_angles(positions, viewing_distance, monitor_size,
+                            screen_size=None):
+    """Convert many expyriment positions (pixel) to visual angles.
+
+    This is the array version of position2visual_angle() and requires NumPy.
+
+    Parameters
+    ----------
+    positions : array_like
+        array of shape (..., 2) with positions (x, y)
+    viewing_distance : numeric or array_like
+        viewing distance in cm (a single value or one value per position)
+    monitor_size : (numeric, numeric)
+        physical size of the monitor in cm (x, y)
+    screen_size : (int, int), optional
+        size of the screen (default = size of the current screen)
+
+    Returns
+    -------
+    angles : numpy.ndarray
+        visual angles (x, y) in degree, array of the shape of positions
+
+    """
+
+    _require_numpy("positions2visual_angles()")
+    screen_size = _np.asarray(_screen_size(screen_size), dtype=_np.float64)
+    cm = _as_point_array(positions) * \
+            (_np.asarray(monitor_size, dtype=_np.float64) / screen_size)
+    distance = _np.asarray(viewing_distance, dtype=_np.float64)[..., None]
+    return _np.degrees(2.0 * _np.arctan((cm / 2.0) / distance))
+
+
+def visual_angles2positions(visual_angles, viewing_distance, monitor_size,
+                            screen_size=None):
+    """Convert many visual angles to expyriment positions (pixel).
+
+    This is the array version of visual_angle2position() and requires NumPy.
+
+    Parameters
+    ----------
+    visual_angles : array_like
+        array of shape (..., 2) with visual angles (x, y) in degree
+    viewing_distance : numeric or array_like
+        viewing distance in cm (a single value or one value per angle)
+    monitor_size : (numeric, numeric)
+        physical size of the monitor in cm (x, y)
+    screen_size : (int, int), optional
+        size of the screen (default = size of the current screen)
+
+    Returns
+    -------
+    positions : numpy.ndarray
+        positions (x, y), array of the shape of visual_angles
+
+    """
+
+    _require_numpy("visual_angles2positions()")
+    screen_size = _np.asarray(_screen_size(screen_size), dtype=_np.float64)
+    distance = _np.asarray(viewing_distance, dtype=_np.float64)[..., None]
+    cm = _np.tan(_np.radians(_as_point_array(visual_angles)) / 2.0) * \
+            distance * 2
+    return cm * (screen_size / _np.asarray(monitor_size, dtype=_np.float64))
+
+
 def points_to_vertices(points):
     """Returns vertex representation of the points (int, int) in xy-coordinates
 
@@ -155,8 +296,49 @@ def lines_intersect(pa, pb, pc, pd):
 
     return ccw(pa, pc, pd) != ccw(pb, pc, pd) and ccw(pa, pb, pc) != ccw(pa, pb, pd)
 
-class XYPoint:
+def points_in_polygon(points, polygon):
+    """Return for many points, if they are inside a given polygon.
+
+    This is the array version of XYPoint.is_inside_polygon() and requires
+    NumPy. The loop runs over the edges of the polygon; all points are
+    tested at once.
+
+    Parameters
+    ----------
+    points : array_like
+        array of shape (..., 2) with points (x, y) or list of XYPoints
+    polygon : array_like
+        array of shape (n, 2) with the points defining the polygon or list of
+        XYPoints
+
+    Returns
+    -------
+    mask : numpy.ndarray
+        boolean array of the shape of points without the last axis
+
+    """
+
+    _require_numpy("points_in_polygon()")
+    points = _as_point_array(points)
+    polygon = _as_point_array(polygon).reshape(-1, 2)
+    x = points[..., 0]
+    y = points[..., 1]
+    inside = _np.zeros(x.shape, dtype=bool)
+    for (x1, y1), (x2, y2) in zip(polygon, _np.roll(polygon, -1, axis=0)):
+        if y1 == y2:
+            continue
+        crossing = (y > min(y1, y2)) & (y <= max(y1, y2)) & \
+                (x <= max(x1, x2))
+        if x1 != x2:
+            crossing &= x <= (y - y1) * (x2 - x1) / (y2 - y1) + x1
+        inside ^= crossing
+    return inside
+
+class XYPoint(object):
     """ The Expyriment point class """
+
+    __slots__ = ("_x", "_y")
+
     def __init__(self, x=None, y=None, xy=None):
         """Initialize a XYPoint.
 
@@ -28,6 +28,10 @@ from _fixcross import FixCross
 from _textbox import TextBox
 from _textscreen import TextScreen
 from _picture import Picture
+from _picture import load_pictures
 from _tone import Tone
 from _frame import Frame
+from _surfacecache import get_surface_cache
+from _fontpool import get_font_pool
+from _visual import blur_many
 import extras
@@ -0,0 +1,300 @@
+"""
+Compression backends for visual stimuli.
+
+This module contains the backends that are used by Visual.compress() to
+store the surfaces of compressed stimuli.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import os
+import zlib
+import bisect
+import tempfile
+import threading
+
+import pygame
+
+import defaults
+
+
+class CompressedSurface(object):
+    """A class implementing a handle to a compressed surface.
+
+    Handles are created by the compression backends only.
+
+    """
+
+    def __init__(self, backend, data):
+        self._backend = backend
+        self._data = data
+
+    def __deepcopy__(self, memo):
+        """Handles refer to data of a backend and are not copied."""
+
+        return self
+
+    def load(self):
+        """Return the decompressed surface."""
+
+        return self._backend._load(self._data)
+
+    def release(self):
+        """Free the compressed data.
+
+        Releasing a handle twice has no effect.
+
+        """
+
+        if self._data is not None:
+            self._backend._release(self._data)
+            self._data = None
+
+
+class TempFileCompression(object):
+    """A class implementing a compression backend based on temporary files.
+
+    Each surface is written to an individual TGA file in
+    stimuli.defaults.tempdir.
+
+    """
+
+    def compress(self, surface):
+        """Compress a surface.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+            the surface to compress
+
+        Returns
+        -------
+        handle : CompressedSurface
+
+        """
+
+        fid, filename = tempfile.mkstemp(dir=defaults.tempdir, suffix=".tga")
+        os.close(fid)
+        pygame.image.save(surface, filename)
+        return CompressedSurface(self, filename)
+
+    def _load(self, filename):
+        return pygame.image.load(filename).convert_alpha()
+
+    def _release(self, filename):
+        try:
+            os.remove(filename)
+        except:
+            pass
+
+
+class MemoryCompression(object):
+    """A class implementing an in-memory compression backend.
+
+    Surfaces are stored as zlib compressed RGBA buffers in memory. If the
+    compressed data of all surfaces exceeds 'max_memory', further surfaces
+    are written to a single spill file in stimuli.defaults.tempdir. Space of
+    released surfaces in the spill file is kept in a free list and reused;
+    free space at the end of the file is truncated. The backend can be used
+    from several threads.
+
+    """
+
+    def __init__(self, max_memory=None, level=1):
+        """Create an in-memory compression backend.
+
+        Parameters
+        ----------
+        max_memory : int, optional
+            maximal number of bytes to keep in memory
+        level : int, optional
+            zlib compression level (default = 1)
+
+        """
+
+        if max_memory is None:
+            max_memory = defaults.visual_compression_max_memory
+        self._max_memory = max_memory
+        self._level = level
+        self._memory_bytes = 0
+        self._spill_file = None
+        self._spill_filename = None
+        self._spill_bytes = 0  # bytes of spilled surfaces still in use
+        self._spill_free = []  # sorted free blocks [offset, length]
+        self._lock = threading.Lock()
+
+    def __del__(self):
+        """Remove the spill file."""
+
+        self._close_spill_file()
+
+    @property
+    def max_memory(self):
+        """Getter for max_memory."""
+
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, value):
+        """Setter for max_memory."""
+
+        self._max_memory = value
+
+    @property
+    def memory_bytes(self):
+        """Getter for the number of compressed bytes in memory."""
+
+        return self._memory_bytes
+
+    @property
+    def spill_bytes(self):
+        """Getter for the number of compressed bytes in the spill file."""
+
+        return self._spill_bytes
+
+    @property
+    def spill_file_size(self):
+        """Getter for the size of the spill file in bytes."""
+
+        with self._lock:
+            if self._spill_file is None:
+                return 0
+            self._spill_file.seek(0, os.SEEK_END)
+            return self._spill_file.tell()
+
+    def compress(self, surface):
+        """Compress a surface.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+            the surface to compress
+
+        Returns
+        -------
+        handle : CompressedSurface
+
+        """
+
+        size = surface.get_size()
+        buf = zlib.compress(pygame.image.tostring(surface, "RGBA"),
+                            self._level)
+        with self._lock:
+            if self._memory_bytes + len(buf) <= self._max_memory:
+                self._memory_bytes += len(buf)
+                return CompressedSurface(self, (size, buf, None))
+            if self._spill_file is None:
+                fid, self._spill_filename = tempfile.mkstemp(
+                    dir=defaults.tempdir, suffix=".spill")
+                self._spill_file = os.fdopen(fid, "w+b")
+            offset = self._allocate_spill(len(buf))
+            self._spill_file.seek(offset)
+            self._spill_file.write(buf)
+            self._spill_bytes += len(buf)
+            return CompressedSurface(self, (size, len(buf), offset))
+
+    def _allocate_spill(self, length):
+        """Return the offset of a block in the spill file (first fit)."""
+
+        for idx, (offset, free_length) in enumerate(self._spill_free):
+            if free_length >= length:
+                if free_length == length:
+                    del self._spill_free[idx]
+                else:
+                    self._spill_free[idx] = [offset + length,
+                                             free_length - length]
+                return offset
+        self._spill_file.seek(0, os.SEEK_END)
+        return self._spill_file.tell()
+
+    def _free_spill(self, offset, length):
+        """Put a block of the spill file back to the free list."""
+
+        free = self._spill_free
+        idx = bisect.bisect_left(free, [offset, length])
+        free.insert(idx, [offset, length])
+        # Merge with the following and the preceding block
+        if idx + 1 < len(free) and offset + length == free[idx + 1][0]:
+            free[idx][1] += free[idx + 1][1]
+            del free[idx + 1]
+        if idx > 0 and free[idx - 1][0] + free[idx - 1][1] == offset:
+            free[idx - 1][1] += free[idx][1]
+            del free[idx]
+            idx -= 1
+        # Give free space at the end of the file back to the file system
+        self._spill_file.seek(0, os.SEEK_END)
+        if free[idx][0] + free[idx][1] == self._spill_file.tell():
+            self._spill_file.truncate(free[idx][0])
+            del free[idx]
+
+    def _load(self, data):
+        size, buf, offset = data
+        if offset is not None:
+            with self._lock:
+                self._spill_file.seek(offset)
+                buf = self._spill_file.read(buf)
+        surface = pygame.image.fromstring(zlib.decompress(buf), size, "RGBA")
+        return surface.convert_alpha()
+
+    def _release(self, data):
+        size, buf, offset = data
+        with self._lock:
+            if offset is None:
+                self._memory_bytes -= len(buf)
+            else:
+                self._spill_bytes -= buf
+                self._free_spill(offset, buf)
+
+    def _close_spill_file(self):
+        self._spill_free = []
+        if self._spill_file is not None:
+            try:
+                self._spill_file.close()
+                os.remove(self._spill_filename)
+            except:
+                pass
+            self._spill_file = None
+
+
+_backends = {}
+
+
+def get_compression_backend(name=None):
+    """Return a compression backend.
+
+    Parameters
+    ----------
+    name : str, optional
+        "memory" (in-memory store with spill file) or "tempfile" (one
+        temporary file per stimulus); default is
+        stimuli.defaults.visual_compression_backend
+
+    Returns
+    -------
+    backend : MemoryCompression or TempFileCompression
+
+    """
+
+    if name is None:
+        name = defaults.visual_compression_backend
+    try:
+        backend = _backends[name]
+    except KeyError:
+        if name == "memory":
+            backend = MemoryCompression()
+        elif name == "tempfile":
+            backend = TempFileCompression()
+        else:
+            raise ValueError(
+                "Unknown compression backend '{0}'!".format(name))
+        _backends[name] = backend
+    if name == "memory" and \
+            backend.max_memory != defaults.visual_compression_max_memory:
+        backend.max_memory = defaults.visual_compression_max_memory
+    return backend
@@ -104,6 +104,11 @@ class Ellipse(Visual):
         else:
             self._line_width = value
 
+    def _surface_cache_key(self):
+        """Return all parameters that affect the rendering of the surface."""
+
+        return (self._size, self._colour, self._line_width)
+
     def _create_surface(self):
         """Create the surface of the stimulus."""
 
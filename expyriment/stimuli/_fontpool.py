@@ -0,0 +1,398 @@
+"""
+A font pool for text stimuli.
+
+This module contains classes implementing a process-wide pool of fonts.
+Fonts are addressed by file, size and style, so that the font file is loaded
+and parsed only once. Each pooled font caches the renders and the sizes of
+words, so that repeated words are not rasterised again.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import threading
+
+import pygame
+
+import defaults
+import expyriment
+
+
+def _colour_key(colour):
+    if colour is None:
+        return None
+    return tuple(colour)
+
+
+def _evict_lru(entries, max_entries):
+    """Remove the least recently used entries of a dictionary.
+
+    Entries are lists with the time of the last access as last element. If
+    the dictionary is too large, it is reduced to three quarters of
+    max_entries, so that sorting is only required occasionally.
+
+    Returns
+    -------
+    n_evicted : int
+
+    """
+
+    if len(entries) <= max_entries:
+        return 0
+    n_keep = max_entries - max_entries // 4
+    lru = sorted(entries.items(), key=lambda x: x[1][-1])
+    n_evicted = len(entries) - n_keep
+    for key, entry in lru[:n_evicted]:
+        del entries[key]
+    return n_evicted
+
+
+class FontPool(object):
+    """A class implementing a least recently used pool of fonts.
+
+    Fonts are addressed by (path, size, bold, italic, underline). The pool
+    returns PooledFont objects, which can be used like pygame fonts (size()
+    and render()) and which cache the renders of words.
+
+    """
+
+    def __init__(self, max_fonts=None, max_words=None):
+        """Create a font pool.
+
+        Parameters
+        ----------
+        max_fonts : int, optional
+            maximal number of fonts in the pool
+        max_words : int, optional
+            maximal number of cached word renders per font
+
+        """
+
+        if max_fonts is None:
+            max_fonts = defaults.fontpool_max_fonts
+        if max_words is None:
+            max_words = defaults.fontpool_max_words
+        self._max_fonts = max_fonts
+        self._max_words = max_words
+        self._fonts = {}  # key: [font, last_access]
+        self._access = 0
+        self._lock = threading.Lock()
+        self._font_hits = 0
+        self._font_misses = 0
+        self._word_hits = 0
+        self._word_misses = 0
+        self._evictions = 0
+
+    @property
+    def max_fonts(self):
+        """Getter for max_fonts."""
+
+        return self._max_fonts
+
+    @max_fonts.setter
+    def max_fonts(self, value):
+        """Setter for max_fonts."""
+
+        with self._lock:
+            self._max_fonts = value
+            self._evictions += _evict_lru(self._fonts, value)
+
+    @property
+    def max_words(self):
+        """Getter for max_words."""
+
+        return self._max_words
+
+    @max_words.setter
+    def max_words(self, value):
+        """Setter for max_words."""
+
+        self._max_words = value
+
+    @property
+    def n_fonts(self):
+        """Getter for the number of pooled fonts."""
+
+        return len(self._fonts)
+
+    @property
+    def font_hits(self):
+        """Getter for the number of fonts taken from the pool."""
+
+        return self._font_hits
+
+    @property
+    def font_misses(self):
+        """Getter for the number of fonts that had to be loaded."""
+
+        return self._font_misses
+
+    @property
+    def word_hits(self):
+        """Getter for the number of word renders taken from the caches."""
+
+        return self._word_hits
+
+    @property
+    def word_misses(self):
+        """Getter for the number of words that had to be rendered."""
+
+        return self._word_misses
+
+    @property
+    def evictions(self):
+        """Getter for the number of evicted fonts and word renders."""
+
+        return self._evictions
+
+    def get(self, path, size, bold=False, italic=False, underline=False):
+        """Return a pooled font.
+
+        Parameters
+        ----------
+        path : str
+            path to a font file (see misc.find_font)
+        size : int
+            size of the font
+        bold : bool, optional
+        italic : bool, optional
+        underline : bool, optional
+
+        Returns
+        -------
+        font : PooledFont
+
+        """
+
+        key = (path, size, bool(bold), bool(italic), bool(underline))
+        with self._lock:
+            self._access += 1
+            entry = self._fonts.get(key)
+            if entry is not None:
+                self._font_hits += 1
+                entry[1] = self._access
+                return entry[0]
+            self._font_misses += 1
+        font = PooledFont(self, key)
+        with self._lock:
+            if self._max_fonts > 0:
+                self._fonts[key] = [font, self._access]
+                self._evictions += _evict_lru(self._fonts, self._max_fonts)
+        return font
+
+    def clear(self):
+        """Remove all fonts from the pool and reset the counters."""
+
+        with self._lock:
+            self._fonts = {}
+            self._font_hits = 0
+            self._font_misses = 0
+            self._word_hits = 0
+            self._word_misses = 0
+            self._evictions = 0
+
+
+class PooledFont(object):
+    """A class implementing a font of the font pool.
+
+    A pooled font offers the size() and render() methods of pygame fonts.
+    Sizes of texts and renders of words are cached. Texts with several words
+    are composed from the cached word renders. The underlying pygame font
+    (font) is shared and its style must not be changed.
+
+    """
+
+    def __init__(self, pool, key):
+        """Create a pooled font.
+
+        Notes
+        -----
+        Pooled fonts are created by FontPool.get() only!
+
+        Parameters
+        ----------
+        pool : FontPool
+            the pool the font belongs to
+        key : tuple
+            (path, size, bold, italic, underline)
+
+        """
+
+        self._pool = pool
+        self._key = key
+        path, size, bold, italic, underline = key
+        self._font = pygame.font.Font(path, size)
+        self._font.set_bold(bold)
+        self._font.set_italic(italic)
+        self._font.set_underline(underline)
+        self._lock = threading.RLock()
+        self._words = {}  # (word, antialias, colour): [surface, last_access]
+        self._sizes = {}
+        self._access = 0
+        self._space_width = self._font.size(" ")[0]
+
+    @property
+    def font(self):
+        """Getter for the underlying pygame font."""
+
+        return self._font
+
+    @property
+    def key(self):
+        """Getter for key = (path, size, bold, italic, underline)."""
+
+        return self._key
+
+    @property
+    def space_width(self):
+        """Getter for the width of a space."""
+
+        return self._space_width
+
+    @property
+    def n_words(self):
+        """Getter for the number of cached word renders."""
+
+        return len(self._words)
+
+    def get_height(self):
+        """Return the height of the font."""
+
+        return self._font.get_height()
+
+    def get_linesize(self):
+        """Return the line size of the font."""
+
+        return self._font.get_linesize()
+
+    def size(self, text):
+        """Return the size (width, height) needed to render a text.
+
+        Parameters
+        ----------
+        text : str or unicode
+
+        """
+
+        size = self._sizes.get(text)
+        if size is None:
+            with self._lock:
+                size = self._font.size(text)
+            if len(self._sizes) >= self._pool.max_words:
+                self._sizes.clear()
+            self._sizes[text] = size
+        return size
+
+    def _render_cached(self, text, antialias, colour, background=None):
+        """Return a (shared) render of a text from the cache."""
+
+        key = (text, bool(antialias), _colour_key(colour),
+               _colour_key(background))
+        with self._lock:
+            self._access += 1
+            entry = self._words.get(key)
+            if entry is not None:
+                self._pool._word_hits += 1
+                entry[1] = self._access
+                return entry[0]
+            self._pool._word_misses += 1
+            if background is None:
+                surface = self._font.render(text, antialias, colour)
+            else:
+                surface = self._font.render(text, antialias, colour,
+                                            background)
+            if self._pool.max_words > 0:
+                self._words[key] = [surface, self._access]
+                self._pool._evictions += _evict_lru(self._words,
+                                                    self._pool.max_words)
+            return surface
+
+    def render(self, text, antialias, colour, background=None):
+        """Render a text.
+
+        The text is composed of the cached renders of its words. Underlined
+        texts are rendered (and cached) as a whole. If the composed width
+        differs from the width of the whole text (e.g. due to kerning), the
+        text is rendered as a whole, too.
+
+        Parameters
+        ----------
+        text : str or unicode
+            text to render
+        antialias : bool
+        colour : (int, int, int)
+            colour of the text
+        background : (int, int, int), optional
+            background colour (default = transparent)
+
+        Returns
+        -------
+        surface : pygame.Surface
+            a new surface, which is not shared
+
+        """
+
+        if text == "" or self._key[4]:
+            return self._render_cached(text, antialias, colour,
+                                       background).copy()
+        words = text.split(" ")
+        if len(words) == 1 and background is None:
+            return self._render_cached(text, antialias, colour).copy()
+        renders = [self._render_cached(word, antialias, colour)
+                   for word in words if word != ""]
+        width = sum([r.get_width() for r in renders]) + \
+                (len(words) - 1) * self._space_width
+        size = self.size(text)
+        if width != size[0] or \
+                max([size[1]] + [r.get_height() for r in renders]) > size[1]:
+            with self._lock:
+                if background is None:
+                    return self._font.render(text, antialias, colour)
+                return self._font.render(text, antialias, colour, background)
+        surface = pygame.surface.Surface(size, pygame.SRCALPHA)
+        if background is not None:
+            surface.fill(background)
+        else:
+            surface.fill((0, 0, 0, 0))
+        x = 0
+        renders = iter(renders)
+        for word in words:
+            if word != "":
+                render = renders.next()
+                surface.blit(render, (x, 0))
+                x += render.get_width()
+            x += self._space_width
+        return surface
+
+
+_pool = None
+_pool_screen = None
+
+
+def get_font_pool():
+    """Return the process-wide font pool.
+
+    Returns
+    -------
+    pool : FontPool
+        the font pool (stimuli.defaults.fontpool_max_fonts = 0 switches
+        pooling off)
+
+    """
+
+    global _pool, _pool_screen
+    screen = expyriment._active_exp.screen
+    if _pool is None or (screen is not None and _pool_screen is not screen):
+        # Fonts do not survive pygame.quit() at the end of an experiment
+        _pool = FontPool()
+        _pool_screen = screen
+    elif _pool.max_fonts != defaults.fontpool_max_fonts:
+        _pool.max_fonts = defaults.fontpool_max_fonts
+    if _pool.max_words != defaults.fontpool_max_words:
+        _pool.max_words = defaults.fontpool_max_words
+    return _pool
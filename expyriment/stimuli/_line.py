@@ -153,10 +153,6 @@ class Line(Visual):
         time : int
             the time it took to execute this method
 
-        Notes
-        -----
-        When using OpenGL, this can take longer then 1ms!
-
         """
 
         start = misc.Clock._cpu_time()
@@ -170,7 +166,7 @@ class Line(Visual):
             self._position[1] = self._position[1] + y
             moved = True
         if moved and self._ogl_screen is not None:
-            self._ogl_screen.refresh_position()
+            self._ogl_screen.refresh_position(self._position)
         self._start_point[0] = self._start_point[0] + x
         self._start_point[1] = self._start_point[1] + y
         self._end_point[0] = self._end_point[0] + x
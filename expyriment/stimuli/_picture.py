@@ -15,12 +15,14 @@ __date__ = ''
 
 
 import os
+import multiprocessing
+import multiprocessing.pool
 
 import pygame
 import expyriment
 import defaults
 from _visual import Visual
-from expyriment.misc import to_str, to_unicode
+from expyriment.misc import to_str, to_unicode, Clock
 
 
 class Picture(Visual):
@@ -45,6 +47,7 @@ class Picture(Visual):
         if not(os.path.isfile(self._filename)):
             raise IOError(u"The picture file '{0}' does not exist".format(
                 self._filename))
+        self._decode_time = None
 
     _getter_exception_message = "Cannot set {0} if surface exists!"
 
@@ -64,17 +67,157 @@ class Picture(Visual):
         else:
             self._filename = value
 
+    @property
+    def decode_time(self):
+        """Getter for decode_time.
+
+        The time in ms it took to decode the picture file the last time
+        (None if the file has not been decoded yet).
+
+        """
+
+        return self._decode_time
+
+    def _load_data(self):
+        """Decode the picture file into an RGBA string.
+
+        Returns
+        -------
+        data : (str, (int, int), float)
+            pixels, size and the time it took to decode the file
+
+        """
+
+        return _decode_worker((to_str(self._filename, fse=True), None))
+
+    def _create_surface_from_data(self, data):
+        """Create the surface from the decoded pixels (see _load_data)."""
+
+        pixels, size, decode_time = data
+        surface = pygame.image.fromstring(pixels, size, "RGBA").convert_alpha()
+        self._decode_time = int(decode_time * 1000)
+        if self._logging:
+            expyriment._active_exp._event_file_log("Picture,loaded,{0}"\
+                                   .format(to_str(self._filename, fse=True)), 1)
+        return surface
+
     def _create_surface(self):
         """Create the surface of the stimulus."""
 
         filename = to_str(self._filename, fse=True)
+        start = Clock._cpu_time()
         surface = pygame.image.load(filename).convert_alpha()
+        self._decode_time = int((Clock._cpu_time() - start) * 1000)
         if self._logging:
             expyriment._active_exp._event_file_log("Picture,loaded,{0}"\
                                    .format(filename), 1)
         return surface
 
 
+def _decode_worker(task):
+    """Decode a picture file into an RGBA string (in a worker).
+
+    Returns
+    -------
+    decoded : (str, (int, int), float)
+        pixels, size and the time it took to decode (and scale) the file
+
+    """
+
+    filename, max_size = task
+    start = Clock._cpu_time()
+    surface = pygame.image.load(filename)
+    size = surface.get_size()
+    pixels = pygame.image.tostring(surface, "RGBA")
+    if max_size is not None and (size[0] > max_size[0] or
+                                 size[1] > max_size[1]):
+        factor = min(max_size[0] / float(size[0]),
+                     max_size[1] / float(size[1]))
+        scaled_size = (max(1, int(size[0] * factor)),
+                       max(1, int(size[1] * factor)))
+        surface = pygame.transform.smoothscale(
+            pygame.image.frombuffer(pixels, size, "RGBA"), scaled_size)
+        size = scaled_size
+        pixels = pygame.image.tostring(surface, "RGBA")
+    return pixels, size, Clock._cpu_time() - start
+
+
+def load_pictures(filenames, workers=None, max_size=None, position=None,
+                  use_processes=False, preload=False):
+    """Load many pictures in parallel.
+
+    The picture files are decoded into RGBA pixel buffers by a pool of
+    worker threads (or processes). When all files are decoded, the surfaces
+    of the returned pictures are built from these buffers and converted to
+    the pixel format of the display in the main thread. The decode time of
+    each file is available as Picture.decode_time; the decode times and the
+    total throughput are written to the event file.
+
+    Parameters
+    ----------
+    filenames : list
+        list of filenames (incl. path) of picture files
+    workers : int, optional
+        number of worker threads or processes (default = number of CPUs)
+    max_size : (int, int), optional
+        pictures that are larger are scaled down to fit into this size,
+        keeping their aspect ratio (e.g. exp.screen.size)
+    position : (int, int), optional
+        position of the pictures
+    use_processes : bool, optional
+        decode in worker processes instead of threads (default = False)
+    preload : bool, optional
+        preload the pictures (default = False)
+
+    Returns
+    -------
+    pictures : list
+        list of Picture stimuli with surfaces
+
+    """
+
+    start = Clock._cpu_time()
+    pictures = [Picture(filename, position) for filename in filenames]
+    if len(pictures) == 0:
+        return pictures
+    if max_size is not None:
+        max_size = (int(max_size[0]), int(max_size[1]))
+    tasks = [(to_str(picture.filename, fse=True), max_size)
+             for picture in pictures]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(tasks)))
+    if use_processes:
+        pool = multiprocessing.Pool(workers)
+    else:
+        pool = multiprocessing.pool.ThreadPool(workers)
+    try:
+        results = pool.map(_decode_worker, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+    n_pixels = 0
+    for picture, (filename, scale_to), (pixels, size, decode_time) in \
+            zip(pictures, tasks, results):
+        picture._set_surface(pygame.image.frombuffer(
+            pixels, size, "RGBA").convert_alpha())
+        if preload:
+            picture.preload()
+        picture._decode_time = int(decode_time * 1000)
+        n_pixels += size[0] * size[1]
+        if picture._logging:
+            expyriment._active_exp._event_file_log(
+                "Picture,loaded,{0},{1}".format(filename,
+                                                picture._decode_time), 1)
+    elapsed = max(Clock._cpu_time() - start, 0.001)
+    expyriment._active_exp._event_file_log(
+        "Picture,bulk loaded,{0},{1},{2:.1f} files/s,{3:.1f} MP/s".format(
+            len(pictures), int(elapsed * 1000), len(pictures) / elapsed,
+            n_pixels / 1e6 / elapsed), 1)
+    return pictures
+
+
 if __name__ == "__main__":
     from expyriment import __file__
     from expyriment import control
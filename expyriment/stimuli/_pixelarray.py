@@ -0,0 +1,401 @@
+"""
+Pixel array operations for visual stimuli.
+
+This module contains functions that manipulate the pixels of surfaces as
+NumPy arrays (via pygame.surfarray). NumPy is an optional dependency of
+Expyriment; all functions raise an ImportError if it is not installed.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import math
+
+import pygame
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+
+def has_numpy():
+    """Return True if NumPy is available."""
+
+    return _np is not None
+
+
+def require_numpy(what):
+    """Raise an ImportError if NumPy is not available.
+
+    Parameters
+    ----------
+    what : str
+        name of the function that needs NumPy (for the error message)
+
+    """
+
+    if _np is None:
+        raise ImportError("{0} needs the Python package 'numpy', ".format(
+            what) + "which is not installed.")
+
+
+def make_rng(seed=None):
+    """Return a NumPy random number generator.
+
+    Parameters
+    ----------
+    seed : int or numpy.random.RandomState, optional
+        seed of a new generator or an existing generator
+
+    Returns
+    -------
+    rng : numpy.random.RandomState
+
+    """
+
+    require_numpy("make_rng()")
+    if seed is None:
+        return _np.random.RandomState()
+    if hasattr(seed, "permutation"):
+        return seed
+    return _np.random.RandomState(seed)
+
+
+def surface_to_array(surface):
+    """Return the pixels of a surface as array.
+
+    Parameters
+    ----------
+    surface : pygame.Surface
+
+    Returns
+    -------
+    pixels : numpy.ndarray
+        array of shape (width, height, 4) with RGBA values (uint8)
+
+    """
+
+    require_numpy("surface_to_array()")
+    width, height = surface.get_size()
+    pixels = _np.empty((width, height, 4), dtype=_np.uint8)
+    pixels[:, :, :3] = pygame.surfarray.array3d(surface)
+    if surface.get_flags() & pygame.SRCALPHA:
+        pixels[:, :, 3] = pygame.surfarray.array_alpha(surface)
+    else:
+        pixels[:, :, 3] = 255
+    return pixels
+
+
+def array_to_surface(pixels):
+    """Return a new surface with the pixels of an array.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        array of shape (width, height, 4) with RGBA values
+
+    Returns
+    -------
+    surface : pygame.Surface
+        surface with per pixel alpha
+
+    """
+
+    require_numpy("array_to_surface()")
+    pixels = _np.asarray(pixels)
+    surface = pygame.surface.Surface(pixels.shape[:2],
+                                     pygame.SRCALPHA).convert_alpha()
+    pygame.surfarray.blit_array(surface,
+                                _np.ascontiguousarray(pixels[:, :, :3]))
+    alpha = pygame.surfarray.pixels_alpha(surface)
+    alpha[:] = pixels[:, :, 3]
+    del alpha  # unlock surface
+    return surface
+
+
+def _permute_blocks(pixels, block_size, rng):
+    """Permute equally sized blocks of an array (in place, returns array).
+
+    The array is split into blocks of 'block_size' along the first two
+    axes; the shape of the array has to be a multiple of the block size.
+
+    """
+
+    width, height, channels = pixels.shape
+    bw, bh = block_size
+    nx, ny = width // bw, height // bh
+    if nx * ny < 2:
+        return pixels
+    blocks = pixels.reshape(nx, bw, ny, bh, channels).transpose(0, 2, 1, 3, 4)
+    blocks = blocks.reshape(nx * ny, bw, bh, channels)
+    blocks = blocks[rng.permutation(nx * ny)]
+    blocks = blocks.reshape(nx, ny, bw, bh, channels).transpose(0, 2, 1, 3, 4)
+    return blocks.reshape(width, height, channels)
+
+
+def scramble_blocks(pixels, grain_size, rng):
+    """Randomly permute the grains of a pixel array.
+
+    Grains at the right and bottom edge that are smaller than grain_size
+    are permuted among each other, so no pixels are lost.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        array of shape (width, height, channels)
+    grain_size : (int, int)
+        width and height of a grain
+    rng : numpy.random.RandomState
+
+    Returns
+    -------
+    scrambled : numpy.ndarray
+
+    """
+
+    width, height = pixels.shape[:2]
+    gw, gh = int(grain_size[0]), int(grain_size[1])
+    fw, fh = (width // gw) * gw, (height // gh) * gh
+    rw, rh = width - fw, height - fh
+    scrambled = pixels.copy()
+    if fw > 0 and fh > 0:
+        scrambled[:fw, :fh] = _permute_blocks(pixels[:fw, :fh], (gw, gh), rng)
+    if rw > 0 and fh > 0:
+        scrambled[fw:, :fh] = _permute_blocks(pixels[fw:, :fh], (rw, gh), rng)
+    if rh > 0 and fw > 0:
+        scrambled[:fw, fh:] = _permute_blocks(pixels[:fw, fh:], (gw, rh), rng)
+    return scrambled
+
+
+def scramble_phase(pixels, rng):
+    """Randomise the Fourier phase spectrum of a pixel array.
+
+    The amplitude spectrum of each colour channel is kept. The same random
+    phases are added to all colour channels. The alpha channel (4th
+    channel) is not changed.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        array of shape (width, height, 4)
+    rng : numpy.random.RandomState
+
+    Returns
+    -------
+    scrambled : numpy.ndarray
+
+    """
+
+    width, height = pixels.shape[:2]
+    # Phase spectrum of white noise is hermitian, so the result is real
+    noise_phase = _np.angle(_np.fft.fft2(rng.uniform(size=(width, height))))
+    scrambled = pixels.copy()
+    for channel in range(3):
+        spectrum = _np.fft.fft2(pixels[:, :, channel].astype(_np.float64))
+        spectrum = _np.abs(spectrum) * \
+                _np.exp(1j * (_np.angle(spectrum) + noise_phase))
+        values = _np.real(_np.fft.ifft2(spectrum))
+        scrambled[:, :, channel] = _np.clip(_np.round(values), 0, 255)
+    return scrambled
+
+
+def add_noise(pixels, grain_size, percentage, colour, rng):
+    """Cover a random selection of grains of a pixel array with colour.
+
+    The grains are located on a grid starting at the top left corner;
+    grains at the right and bottom edge may be incomplete.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        array of shape (width, height, 4)
+    grain_size : int
+        size of the grains
+    percentage : int or float
+        percentage of covered grains
+    colour : (int, int, int)
+        colour (RGB) of the noise; if None, each grain gets a random colour
+    rng : numpy.random.RandomState
+
+    Returns
+    -------
+    noisy : numpy.ndarray
+
+    """
+
+    width, height = pixels.shape[:2]
+    grain_size = int(grain_size)
+    nx = width // grain_size + 1
+    ny = height // grain_size + 1
+    n_noise = int(nx * ny * percentage / 100.0)
+    grains = _np.zeros(nx * ny, dtype=bool)
+    grains[rng.permutation(nx * ny)[:n_noise]] = True
+    grains = grains.reshape(ny, nx).T
+    mask = grains.repeat(grain_size, 0).repeat(grain_size, 1)
+    mask = mask[:width, :height]
+    noisy = pixels.copy()
+    if colour is None:
+        colours = rng.randint(0, 256, size=(nx, ny, 3)).astype(_np.uint8)
+        colours = colours.repeat(grain_size, 0).repeat(grain_size, 1)
+        noisy[mask, :3] = colours[:width, :height][mask]
+    else:
+        noisy[mask, :3] = colour[:3]
+    noisy[mask, 3] = 255
+    return noisy
+
+
+_kernels = {}
+
+
+def gaussian_kernel(sigma):
+    """Return a normalised one-dimensional Gaussian kernel.
+
+    Kernels are cached per sigma.
+
+    Parameters
+    ----------
+    sigma : float
+        standard deviation in pixels
+
+    Returns
+    -------
+    kernel : numpy.ndarray
+        kernel of length 2 * ceil(3 * sigma) + 1
+
+    """
+
+    require_numpy("gaussian_kernel()")
+    key = ("gaussian", float(sigma))
+    kernel = _kernels.get(key)
+    if kernel is None:
+        radius = max(1, int(math.ceil(3 * sigma)))
+        x = _np.arange(-radius, radius + 1, dtype=_np.float64)
+        kernel = _np.exp(-0.5 * (x / float(sigma)) ** 2)
+        kernel /= kernel.sum()
+        _kernels[key] = kernel
+    return kernel
+
+
+def box_kernel(size):
+    """Return a normalised one-dimensional box kernel.
+
+    Parameters
+    ----------
+    size : int
+        length of the kernel (even numbers are rounded up to the next odd
+        number)
+
+    Returns
+    -------
+    kernel : numpy.ndarray
+
+    """
+
+    require_numpy("box_kernel()")
+    size = int(size) // 2 * 2 + 1
+    key = ("box", size)
+    kernel = _kernels.get(key)
+    if kernel is None:
+        kernel = _np.ones(size, dtype=_np.float64) / size
+        _kernels[key] = kernel
+    return kernel
+
+
+def convolve_separable(values, kernel, axes=(0, 1)):
+    """Convolve an array with a one-dimensional kernel along several axes.
+
+    The array is extended at its borders by repeating the edge values.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+    kernel : numpy.ndarray
+        one-dimensional kernel of odd length
+    axes : tuple of int, optional
+        the axes to convolve (default = (0, 1))
+
+    Returns
+    -------
+    convolved : numpy.ndarray
+        float array of the shape of values
+
+    """
+
+    values = _np.asarray(values, dtype=_np.float64)
+    radius = len(kernel) // 2
+    for axis in axes:
+        swapped = values.swapaxes(0, axis)
+        n = swapped.shape[0]
+        padded = swapped[_np.clip(_np.arange(-radius, n + radius), 0, n - 1)]
+        result = _np.zeros(swapped.shape, dtype=_np.float64)
+        for tap, weight in enumerate(kernel):
+            result += weight * padded[tap:tap + n]
+        values = result.swapaxes(0, axis)
+    return values
+
+
+def blur_kernel(sigma, mode="gaussian"):
+    """Return the one-dimensional kernel of a blur.
+
+    Parameters
+    ----------
+    sigma : float
+        standard deviation of the blur in pixels
+    mode : str, optional
+        "gaussian" (default) or "box" (box of the same standard deviation)
+
+    Returns
+    -------
+    kernel : numpy.ndarray
+
+    """
+
+    if mode == "gaussian":
+        return gaussian_kernel(sigma)
+    elif mode == "box":
+        return box_kernel(round(math.sqrt(12 * sigma ** 2 + 1)))
+    else:
+        raise ValueError("Unknown blur mode '{0}'!".format(mode))
+
+
+def blur(pixels, sigma, mode="gaussian", axes=(0, 1)):
+    """Blur RGBA pixel arrays.
+
+    The colours are weighted by their alpha values, so that transparent
+    pixels do not darken the colours at the edges.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        array of shape (..., 4) with RGBA values
+    sigma : float
+        standard deviation of the blur in pixels
+    mode : str, optional
+        "gaussian" (default) or "box"
+    axes : tuple of int, optional
+        the two image axes of the array (default = (0, 1))
+
+    Returns
+    -------
+    blurred : numpy.ndarray
+
+    """
+
+    if mode not in ("gaussian", "box"):
+        raise ValueError("Unknown blur mode '{0}'!".format(mode))
+    if sigma <= 0:
+        return pixels.copy()
+    kernel = blur_kernel(sigma, mode)
+    values = pixels.astype(_np.float64)
+    values[..., :3] *= values[..., 3:4] / 255.0
+    values = convolve_separable(values, kernel, axes)
+    alpha = values[..., 3:4] / 255.0
+    visible = alpha > 0
+    values[..., :3] = _np.where(visible, values[..., :3] /
+                                _np.where(visible, alpha, 1), 0)
+    return _np.clip(_np.round(values), 0, 255).astype(_np.uint8)
@@ -14,8 +14,14 @@ __revision__ = ''
 __date__ = ''
 
 import copy
+import math
 from math import sqrt
+from array import array
 import pygame
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
 
 import defaults
 from _visual import Visual
@@ -23,7 +29,14 @@ import expyriment
 
 
 class Shape(Visual):
-    """A class implementing a shape."""
+    """A class implementing a shape.
+
+    The vertices are stored as points (cumulative sums of the vertices) in a
+    flat array of floats. Native scaling, flipping and rotation are composed
+    into a single affine transformation, which is applied to all points at
+    once and only when the points or the rect of the shape are requested.
+
+    """
 
     def __init__(self, position=None, colour=None, line_width=None,
                  anti_aliasing=None):
@@ -63,9 +76,12 @@ class Shape(Visual):
         else:
             self._anti_aliasing = defaults.shape_anti_aliasing
 
-        self._vertices = []
-        self._xy_points = []
-        self._rect = []
+        self._points_array = array('d', [0, 0])
+        self._bounds = [0.0, 0.0, 0.0, 0.0]
+        self._transformed = None
+        self._xy_points = None
+        self._rect = None
+        self._edge_index = None
         self._native_rotation = 0
         self._native_scaling = [1, 1]
         self._native_rotation_centre = (0, 0)
@@ -159,13 +175,23 @@ class Shape(Visual):
     def rect(self):
         """Getter for rect =(top, left, bottom, right)."""
 
+        if self._rect is None:
+            self._rect = self._make_shape_rect(self._transformed_points())
         return self._rect
 
     @property
     def vertices(self):
         """Getter for the polygon verticies."""
 
-        return self._vertices
+        pts = self._points_array
+        return [[pts[i] - pts[i - 2], pts[i + 1] - pts[i - 1]]
+                for i in range(2, len(pts), 2)]
+
+    @property
+    def n_vertices(self):
+        """Getter for the number of vertices."""
+
+        return len(self._points_array) // 2 - 1
 
     @property
     def points(self):
@@ -182,10 +208,7 @@ class Shape(Visual):
 
         """
 
-        rtn = []
-        for p in self.xy_points:
-            rtn.append(p.tuple)
-        return rtn
+        return [tuple(p) for p in self._transformed_list()]
 
     @property
     def points_on_screen(self):
@@ -202,10 +225,8 @@ class Shape(Visual):
 
         """
 
-        rtn = []
-        for p in self.xy_points_on_screen:
-            rtn.append(p.tuple)
-        return rtn
+        x, y = self.position
+        return [(p[0] + x, p[1] + y) for p in self._transformed_list()]
 
     @property
     def scaling(self):
@@ -240,6 +261,10 @@ class Shape(Visual):
 
         """
 
+        if self._xy_points is None:
+            XYPoint = expyriment.misc.geometry.XYPoint
+            self._xy_points = [XYPoint(p[0], p[1])
+                               for p in self._transformed_list()]
         return self._xy_points
 
     @property
@@ -257,11 +282,8 @@ class Shape(Visual):
 
         """
 
-        rtn = []
-        pos = expyriment.misc.geometry.XYPoint(xy=self.position)
-        for p in copy.deepcopy(self.xy_points):
-            rtn.append(p.move(pos))
-        return rtn
+        XYPoint = expyriment.misc.geometry.XYPoint
+        return [XYPoint(p[0], p[1]) for p in self.points_on_screen]
 
     def add_vertex(self, xy):
         """ Add a vertex to the shape.
@@ -296,7 +318,7 @@ class Shape(Visual):
                 raise TypeError(type_error_message)
             if len(xy) != 2:
                 raise TypeError(type_error_message)
-            self._vertices.append(list(xy))
+        self._append_vertices(vertex_list)
         self._update_points()
 
     def remove_vertex(self, index):
@@ -305,8 +327,10 @@ class Shape(Visual):
         if self.has_surface:
             raise AttributeError(Shape._getter_exception_message.format(
                 "remove_vertex"))
-        if index > 0 and index < len(self._vertices):
-            self._vertices.pop(index)
+        if index > 0 and index < self.n_vertices:
+            vertices = self.vertices
+            vertices.pop(index)
+            self._set_vertices(vertices)
         self._update_points()
 
     def erase_vertices(self):
@@ -316,9 +340,7 @@ class Shape(Visual):
             raise AttributeError(Shape._getter_exception_message.format(
                 "erase_vertices"))
 
-        self._vertices = []
-        self._xy_points = []
-        self._rect = []
+        self._set_vertices([])
         self._native_rotation = 0
         self._native_scaling = [1, 1]
         self._native_rotation_centre = (0, 0)
@@ -373,31 +395,74 @@ class Shape(Visual):
         val : bool
             True if overlapping
 
+        Notes
+        -----
+        Shapes overlap, if any of their edges intersect or if one shape lies
+        completely inside the other. The bounding rectangles are checked
+        first; edges are only compared with edges of the other shape that
+        are located in the same cells of a grid (spatial buckets).
+
         """
 
-        # shape and other shape do not overlap if 
-        # (a) no point of shape is inside other shape 
-        # (b) AND no point of other shape is inside shape
-        # (c) AND lines do not intersect
-
-        s1 = self.xy_points_on_screen
-        s2 = other.xy_points_on_screen
-        #(a) & (b)
-        for p in s1:
-            if p.is_inside_polygon(s2):
-                return True
-        for p in s2:
-            if p.is_inside_polygon(s1):
-                return True
-        #(c)
-        for from1 in range(0, len(s1) - 1):
-            for to1 in range(from1 + 1, len(s1)):
-                for from2 in range(0, len(s2) - 1):
-                    for to2 in range(0, len(s2)):
-                        if expyriment.misc.geometry.lines_intersect(s1[from1],
-                                                s1[to1], s2[from2], s2[to2]):
-                            return True
-        return False
+        return self.overlapping_with_shapes([other])[0]
+
+    def overlapping_with_shapes(self, others):
+        """Return for each of several shapes, if it overlaps with the shape.
+
+        The edges of the shape are indexed only once. The bounding
+        rectangles of all other shapes are checked at once.
+
+        Parameters
+        ----------
+        others : list of stimuli.Shape
+            the other shape objects
+
+        Returns
+        -------
+        val : list of bool
+            True for each overlapping shape
+
+        """
+
+        rtn = [False] * len(others)
+        if len(others) == 0:
+            return rtn
+        x, y = self.position
+        t, l, b, r = self.rect
+        if _np is not None:
+            rects = _np.array([o.rect for o in others], dtype=_np.float64)
+            positions = _np.array([o.position for o in others],
+                                  dtype=_np.float64)
+            rects[:, (1, 3)] += positions[:, 0:1] - x
+            rects[:, (0, 2)] += positions[:, 1:2] - y
+            candidates = _np.flatnonzero((rects[:, 0] >= b) &
+                                         (rects[:, 2] <= t) &
+                                         (rects[:, 1] <= r) &
+                                         (rects[:, 3] >= l)).tolist()
+        else:
+            candidates = []
+            for idx, other in enumerate(others):
+                ot, ol, ob, or_ = other.rect
+                dx = other.position[0] - x
+                dy = other.position[1] - y
+                if ot + dy >= b and ob + dy <= t and ol + dx <= r and \
+                        or_ + dx >= l:
+                    candidates.append(idx)
+        if len(candidates) == 0:
+            return rtn
+        if self._edge_index is None:
+            self._edge_index = _EdgeIndex(self._transformed_points())
+        for idx in candidates:
+            other = others[idx]
+            dx = other.position[0] - x
+            dy = other.position[1] - y
+            points = other._transformed_points()
+            if _np is not None:
+                points = points + (dx, dy)
+            else:
+                points = [(p[0] + dx, p[1] + dy) for p in points]
+            rtn[idx] = self._edge_index.overlaps(points)
+        return rtn
 
     def is_shape_overlapping(self, shape2):
         """DEPRECATED METHOD: Please use 'overlapping_with_shape'."""
@@ -478,11 +543,13 @@ class Shape(Visual):
             self._native_scaling[1] = self._native_scaling[1] * -1
         self._update_points()
 
-    def blur(self, level):
+    def blur(self, sigma, mode="gaussian"):
         """Blur the shape.
 
-        This blurs the stimulus, by scaling it down and up by the factor of
-        'level'.
+        The size of the surface is kept, so that the position, size and
+        collision geometry of the shape remain valid. The blur is therefore
+        clipped at the borders of the surface. See Visual.blur().
+
         Notes
         -----
         Depending on the blur level and the size of your stimulus, this method
@@ -490,8 +557,10 @@ class Shape(Visual):
 
         Parameters
         ----------
-        level : int
-            level of bluring
+        sigma : float
+            standard deviation of the blur in pixels
+        mode : str, optional
+            "gaussian" (default) or "box"
 
         Returns
         -------
@@ -500,71 +569,154 @@ class Shape(Visual):
 
         """
 
-        start = expyriment.misc.Clock._cpu_time()
-        self.scale((1.0 / level, 1.0 / level))
-        self.scale((level, level))
-        return int((expyriment.misc.Clock._cpu_time() - start) * 1000)
+        return Visual.blur(self, sigma, mode)
+
+    def _set_vertices(self, vertices):
+        """Replace all vertices (list of (x, y)) without any checks."""
+
+        self._points_array = array('d', [0, 0])
+        self._bounds = [0.0, 0.0, 0.0, 0.0]
+        self._append_vertices(vertices)
+
+    def _append_vertices(self, vertices):
+        """Append vertices (list of (x, y)) to the points array.
+
+        The points and their bounds are updated incrementally, so appending
+        a vertex takes amortised constant time.
+
+        """
+
+        pts = self._points_array
+        bounds = self._bounds
+        x, y = pts[-2], pts[-1]
+        for v in vertices:
+            x = x + v[0]
+            y = y + v[1]
+            pts.append(x)
+            pts.append(y)
+            if x < bounds[0]:
+                bounds[0] = x
+            elif x > bounds[2]:
+                bounds[2] = x
+            if y < bounds[1]:
+                bounds[1] = y
+            elif y > bounds[3]:
+                bounds[3] = y
 
     def _update_points(self):
-        """Updates the points of the shape and the drawing rect.
+        """Invalidate the points of the shape and the drawing rect.
 
-        Converts vertex to points, centers points, rotates, calculates rect and
-        clears surface and draw_rotation_point.
+        The points are recalculated from the vertices and the native
+        transformations, when they are requested the next time.
 
-         """
+        """
+
+        self._transformed = None
+        self._xy_points = None
+        self._rect = None
+        self._edge_index = None
+
+    def _affine_transformation(self):
+        """Return the affine transformation of the points.
 
-        # Copying and scaling and flipping of verticies
-        tmp_vtx = []
-        for v in self._vertices:
-            v = (v[0] * self._native_scaling[0],
-                 v[1] * self._native_scaling[1])
-            tmp_vtx.append(v)
+        Scaling (and flipping), centering and rotation around the rotation
+        centre are composed into one matrix and one translation vector.
 
-        # Converts tmp_vtx to points in xy-coordinates
-        xy_p = [expyriment.misc.geometry.XYPoint(0, 0)]
-        for v in tmp_vtx:
-            x = (v[0] + xy_p[-1].x)
-            y = (v[1] + xy_p[-1].y)
-            xy_p.append(expyriment.misc.geometry.XYPoint(x, y))
+        Returns
+        -------
+        matrix : (float, float, float, float)
+            the matrix ((a, b), (c, d)) as (a, b, c, d)
+        translation : (float, float)
 
-        xy_p = self._center_points(xy_p)
-        if self._native_rotation != 0:
-            for x in range(0, len(xy_p)):
-                xy_p[x].rotate(self._native_rotation,
-                               self._native_rotation_centre)
+        """
 
-        self._xy_points = xy_p
-        self._rect = self._make_shape_rect(self.xy_points)
+        sx, sy = self._native_scaling
+        min_x, min_y, max_x, max_y = self._bounds
+        l, r = sorted((min_x * sx, max_x * sx))
+        b, t = sorted((min_y * sy, max_y * sy))
+        # Centering (the origin is always part of the shape)
+        cx = ((r - l) / 2.0) - r
+        cy = ((t - b) / 2.0) - t
+        if self._native_rotation == 0:
+            return (sx, 0, 0, sy), (cx, cy)
+        angle = math.radians(self._native_rotation)
+        cos = math.cos(angle)
+        sin = math.sin(angle)
+        rx, ry = self._native_rotation_centre
+        return ((cos * sx, -sin * sy, sin * sx, cos * sy),
+                (cos * (cx - rx) - sin * (cy - ry) + rx,
+                 sin * (cx - rx) + cos * (cy - ry) + ry))
+
+    def _transformed_points(self):
+        """Return the transformed points of the shape.
+
+        Returns
+        -------
+        points : numpy.ndarray or list
+            Nx2 array of the points or, if NumPy is not installed, list of
+            (x, y) tuples
+
+        """
+
+        if self._transformed is None:
+            (a, b, c, d), (tx, ty) = self._affine_transformation()
+            pts = self._points_array
+            if _np is not None:
+                xy = _np.frombuffer(pts, dtype=_np.float64).reshape(-1, 2)
+                matrix = _np.array([[a, c], [b, d]], dtype=_np.float64)
+                self._transformed = xy.dot(matrix) + (tx, ty)
+            else:
+                self._transformed = [
+                    (a * pts[i] + b * pts[i + 1] + tx,
+                     c * pts[i] + d * pts[i + 1] + ty)
+                    for i in range(0, len(pts), 2)]
+        return self._transformed
+
+    def _transformed_list(self):
+        """Return the transformed points as list of (x, y)."""
+
+        points = self._transformed_points()
+        if _np is not None:
+            return points.tolist()
+        return points
 
     def _make_shape_rect(self, points):
-        """Four points (geomerty.XYPoint) top, left, bottom, right."""
+        """Return rect (top, left, bottom, right) that includes the origin.
+
+        Parameters
+        ----------
+        points : numpy.ndarray or list
+            Nx2 array or list of (x, y) tuples
+
+        """
 
-        t = 0
-        l = 0
-        r = 0
-        b = 0
+        if _np is not None and isinstance(points, _np.ndarray):
+            if len(points) == 0:
+                return (0, 0, 0, 0)
+            low = _np.minimum(points.min(axis=0), 0)
+            high = _np.maximum(points.max(axis=0), 0)
+            return (float(high[1]), float(low[0]), float(low[1]),
+                    float(high[0]))
+        t = l = b = r = 0
         for p in points:
-            if p.x < l:
-                l = p.x
-            elif p.x > r:
-                r = p.x
-            if p.y > t:
-                t = p.y
-            elif p.y < b:
-                b = p.y
+            if p[0] < l:
+                l = p[0]
+            elif p[0] > r:
+                r = p[0]
+            if p[1] > t:
+                t = p[1]
+            elif p[1] < b:
+                b = p[1]
         return (t, l, b, r)
 
-    def _center_points(self, points):
-        """Return centered points (list of geomerty.XYPoint)."""
+    def _surface_cache_key(self):
+        """Return all parameters that affect the rendering of the surface."""
 
-        t, l, b, r = self._make_shape_rect(points)
-
-        # Stimulus center
-        c = expyriment.misc.geometry.XYPoint(((r - l) / 2.0) - r,
-                                             ((t - b) / 2.0) - t)
-        for x in range(0, len(points)): # Center points
-            points[x].move(c)
-        return points
+        return (self._points_array.tostring(), self._colour,
+                self._line_width,
+                self._anti_aliasing, self._native_scaling,
+                self._native_rotation, self._native_rotation_centre,
+                self._rotation_centre_display_colour)
 
     def _create_surface(self):
         """Create the surface of the stimulus."""
@@ -583,8 +735,8 @@ class Shape(Visual):
                                         pygame.SRCALPHA).convert_alpha()
         #surface.fill((255, 0, 0)) # for debugging only
         poly = []
-        for p in self.xy_points: # Convert points_in_pygame_coordinates
-            poly.append(self.convert_expyriment_xy_to_surface_xy(p.tuple))
+        for p in self.points: # Convert points_in_pygame_coordinates
+            poly.append(self.convert_expyriment_xy_to_surface_xy(p))
         rot_centre = self.convert_expyriment_xy_to_surface_xy(
             self._native_rotation_centre)
         pygame.draw.polygon(surface, self.colour, poly, line_width)
@@ -603,6 +755,262 @@ class Shape(Visual):
         return surface
 
 
+def _point_in_polygon(point, polygon):
+    """Return True if a point (x, y) is inside a polygon (list of (x, y))."""
+
+    x, y = point
+    n = len(polygon)
+    inside = False
+    x1, y1 = polygon[0]
+    for i in range(1, n + 1):
+        x2, y2 = polygon[i % n]
+        if min(y1, y2) < y <= max(y1, y2) and x <= max(x1, x2):
+            if x1 == x2 or \
+                    x <= (y - y1) * (x2 - x1) / float(y2 - y1) + x1:
+                inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _segments_intersect(a, b, c, d):
+    """Return True if the line segments ab and cd intersect.
+
+    Works element-wise on NumPy arrays of shape (N, 2).
+
+    """
+
+    def ccw(p, q, r):
+        return (r[..., 1] - p[..., 1]) * (q[..., 0] - p[..., 0]) > \
+                (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0])
+
+    return (ccw(a, c, d) != ccw(b, c, d)) & (ccw(a, b, c) != ccw(a, b, d))
+
+
+class _EdgeIndex(object):
+    """A spatial index of the edges of a closed polygon.
+
+    The edges are sorted into the cells of a regular grid over the bounding
+    rectangle of the polygon. The cell size is the mean extent of the edges,
+    so that most edges cover only a few cells. Queries compare the edges of
+    another polygon only with the edges in the cells they cover. Edges whose
+    bounding rectangles cover more than _max_cells cells (e.g. a long chord
+    of a finely tessellated ellipse) are not sorted into the grid, but kept
+    in a list of long edges, which are tested against all edges.
+
+    """
+
+    _max_cells = 16
+
+    def __init__(self, points):
+        """Create an edge index.
+
+        Parameters
+        ----------
+        points : numpy.ndarray or list
+            Nx2 array or list of the points (x, y) of the polygon
+
+        """
+
+        if _np is not None:
+            pts = _np.asarray(points, dtype=_np.float64).reshape(-1, 2)
+            self._points = pts
+            self._start = pts
+            self._end = _np.roll(pts, -1, axis=0)
+            low = _np.minimum(self._start, self._end)
+            high = _np.maximum(self._start, self._end)
+            extent = (high - low).max(axis=1)
+            self._cell = max(float(extent.mean()) if len(pts) else 0, 1.0)
+            self._low = pts.min(axis=0) if len(pts) else _np.zeros(2)
+            self._high = pts.max(axis=0) if len(pts) else _np.zeros(2)
+            self._n_cells = ((self._high - self._low) //
+                             self._cell).astype(int) + 1
+            cells, edges, self._long = self._cover(low, high)
+            order = _np.argsort(cells, kind="mergesort")
+            self._cells = cells[order]
+            self._edges = edges[order]
+        else:
+            pts = [tuple(p) for p in points]
+            self._points = pts
+            n = len(pts)
+            edges = [(pts[i], pts[(i + 1) % n]) for i in range(n)]
+            self._start = [e[0] for e in edges]
+            self._end = [e[1] for e in edges]
+            extents = [max(abs(e[1][0] - e[0][0]), abs(e[1][1] - e[0][1]))
+                       for e in edges]
+            self._cell = max(sum(extents) / float(max(n, 1)), 1.0)
+            xs = [p[0] for p in pts] or [0]
+            ys = [p[1] for p in pts] or [0]
+            self._low = (min(xs), min(ys))
+            self._high = (max(xs), max(ys))
+            self._n_cells = (int((self._high[0] - self._low[0]) //
+                                 self._cell) + 1,
+                             int((self._high[1] - self._low[1]) //
+                                 self._cell) + 1)
+            self._buckets = {}
+            self._long = []
+            for idx, (a, b) in enumerate(edges):
+                cells = self._cover_edge(a, b)
+                if cells is None:
+                    self._long.append(idx)
+                    continue
+                for cell in cells:
+                    self._buckets.setdefault(cell, []).append(idx)
+
+    def _cover(self, low, high):
+        """Return the cells covered by edges with bounds low and high.
+
+        Edges cover all cells that intersect their bounding rectangles.
+
+        Returns
+        -------
+        cells : numpy.ndarray
+            covered cells
+        edges : numpy.ndarray
+            number of the edge for each covered cell
+        long_edges : numpy.ndarray
+            numbers of the edges that cover more than _max_cells cells (their
+            cells are not returned)
+
+        """
+
+        upper = self._n_cells - 1
+        first = _np.clip(((low - self._low) // self._cell).astype(int),
+                         0, upper)
+        last = _np.clip(((high - self._low) // self._cell).astype(int),
+                        0, upper)
+        counts = last - first + 1
+        totals = counts[:, 0] * counts[:, 1]
+        is_long = totals > _EdgeIndex._max_cells
+        totals[is_long] = 0
+        edges = _np.repeat(_np.arange(len(totals)), totals)
+        offset = _np.arange(totals.sum()) - \
+                _np.repeat(_np.cumsum(totals) - totals, totals)
+        width = counts[edges, 0]
+        cx = first[edges, 0] + offset % width
+        cy = first[edges, 1] + offset // width
+        return cy * self._n_cells[0] + cx, edges, _np.flatnonzero(is_long)
+
+    def _cover_edge(self, a, b):
+        """Return the cells covered by the edge ab (without NumPy).
+
+        None is returned for long edges, which cover more than _max_cells
+        cells.
+
+        """
+
+        def cell(value, axis):
+            c = int((value - self._low[axis]) // self._cell)
+            return min(max(c, 0), self._n_cells[axis] - 1)
+
+        x0, x1 = cell(min(a[0], b[0]), 0), cell(max(a[0], b[0]), 0)
+        y0, y1 = cell(min(a[1], b[1]), 1), cell(max(a[1], b[1]), 1)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > _EdgeIndex._max_cells:
+            return None
+        return [(cx, cy) for cx in range(x0, x1 + 1)
+                for cy in range(y0, y1 + 1)]
+
+    def _bounds_overlap(self, low, high):
+        return low[0] <= self._high[0] and high[0] >= self._low[0] and \
+                low[1] <= self._high[1] and high[1] >= self._low[1]
+
+    def edges_intersect(self, points):
+        """Return True if any edge of another polygon intersects an edge.
+
+        Parameters
+        ----------
+        points : numpy.ndarray or list
+            Nx2 array or list of the points (x, y) of the other polygon
+
+        """
+
+        if len(points) == 0 or len(self._points) == 0:
+            return False
+        if _np is not None:
+            start = _np.asarray(points, dtype=_np.float64).reshape(-1, 2)
+            end = _np.roll(start, -1, axis=0)
+            low = _np.minimum(start, end)
+            high = _np.maximum(start, end)
+            keep = _np.flatnonzero((low[:, 0] <= self._high[0]) &
+                                   (high[:, 0] >= self._low[0]) &
+                                   (low[:, 1] <= self._high[1]) &
+                                   (high[:, 1] >= self._low[1]))
+            if len(keep) == 0:
+                return False
+            cells, edges, long_edges = self._cover(low[keep], high[keep])
+            edges = keep[edges]
+            long_edges = keep[long_edges]
+            first = _np.searchsorted(self._cells, cells, "left")
+            counts = _np.searchsorted(self._cells, cells, "right") - first
+            other = _np.repeat(edges, counts)
+            offset = _np.arange(counts.sum()) - \
+                    _np.repeat(_np.cumsum(counts) - counts, counts)
+            own = self._edges[_np.repeat(first, counts) + offset]
+            # Long edges of both polygons are tested against all edges
+            n_own = len(self._points)
+            other = _np.concatenate((
+                other, _np.repeat(keep, len(self._long)),
+                _np.repeat(long_edges, n_own)))
+            own = _np.concatenate((
+                own, _np.tile(self._long, len(keep)),
+                _np.tile(_np.arange(n_own), len(long_edges))))
+            return bool(_segments_intersect(
+                start[other], end[other],
+                self._start[own], self._end[own]).any())
+        else:
+            n = len(points)
+            lines_intersect = expyriment.misc.geometry.lines_intersect
+            XYPoint = expyriment.misc.geometry.XYPoint
+            tested = set()
+            for i in range(n):
+                a, b = points[i], points[(i + 1) % n]
+                if not self._bounds_overlap(
+                        (min(a[0], b[0]), min(a[1], b[1])),
+                        (max(a[0], b[0]), max(a[1], b[1]))):
+                    continue
+                pa, pb = XYPoint(a[0], a[1]), XYPoint(b[0], b[1])
+                cells = self._cover_edge(a, b)
+                if cells is None:
+                    # Long edges are tested against all edges
+                    candidates = range(len(self._points))
+                else:
+                    candidates = [idx for cell in cells
+                                  for idx in self._buckets.get(cell, [])]
+                    candidates.extend(self._long)
+                for idx in candidates:
+                    if (i, idx) in tested:
+                        continue
+                    tested.add((i, idx))
+                    c, d = self._start[idx], self._end[idx]
+                    if lines_intersect(pa, pb, XYPoint(c[0], c[1]),
+                                       XYPoint(d[0], d[1])):
+                        return True
+            return False
+
+    def overlaps(self, points):
+        """Return True if another polygon overlaps with the polygon.
+
+        Parameters
+        ----------
+        points : numpy.ndarray or list
+            Nx2 array or list of the points (x, y) of the other polygon
+
+        """
+
+        if len(points) == 0 or len(self._points) == 0:
+            return False
+        if self.edges_intersect(points):
+            return True
+        # No intersecting edges: overlapping only if one polygon is inside
+        # the other, which can be decided by a single point of each.
+        if _np is not None:
+            points = _np.asarray(points).tolist()
+            own = self._points.tolist()
+        else:
+            own = self._points
+        return _point_in_polygon(points[0], own) or \
+                _point_in_polygon(own[0], points)
+
+
 if __name__ == "__main__":
     from expyriment import control
     control.set_develop_mode(True)
@@ -0,0 +1,238 @@
+"""
+A surface cache for parameterised stimuli.
+
+This module contains a class implementing a process-wide cache of stimulus
+surfaces. Surfaces are addressed by the stimulus class and all parameters
+that affect their rendering, so that stimuli with identical parameters (e.g.
+the same fixation cross or word in every trial) are rasterised only once.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import defaults
+import expyriment
+
+
+def _canonical(value):
+    """Return a hashable, canonical representation of a parameter value."""
+
+    if isinstance(value, (list, tuple)):
+        return tuple([_canonical(x) for x in value])
+    if isinstance(value, dict):
+        return tuple(sorted([(k, _canonical(v)) for k, v in value.items()]))
+    return value
+
+
+class SurfaceCache(object):
+    """A class implementing a least recently used cache of surfaces.
+
+    The size of the cache is bounded by the number of bytes of all cached
+    surfaces. Cached surfaces are shared between stimuli and must never be
+    modified in place.
+
+    """
+
+    def __init__(self, max_bytes=None):
+        """Create a surface cache.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            maximal number of bytes of all cached surfaces
+
+        """
+
+        if max_bytes is None:
+            max_bytes = defaults.visual_surface_cache_max_bytes
+        self._max_bytes = max_bytes
+        self._entries = {}  # key: [surface, n_bytes, last_access]
+        self._shared_ids = {}  # id(surface): key
+        self._access = 0
+        self._n_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(stimulus_class, parameters):
+        """Make a cache key.
+
+        Parameters
+        ----------
+        stimulus_class : class
+            the class of the stimulus
+        parameters : tuple
+            all parameters that affect the rendering of the stimulus
+
+        Returns
+        -------
+        key : tuple
+
+        """
+
+        return (stimulus_class, _canonical(parameters))
+
+    @property
+    def max_bytes(self):
+        """Getter for max_bytes."""
+
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        """Setter for max_bytes."""
+
+        self._max_bytes = value
+        self._evict(0)
+
+    @property
+    def n_bytes(self):
+        """Getter for the number of bytes of all cached surfaces."""
+
+        return self._n_bytes
+
+    @property
+    def n_surfaces(self):
+        """Getter for the number of cached surfaces."""
+
+        return len(self._entries)
+
+    @property
+    def hits(self):
+        """Getter for the number of cache hits."""
+
+        return self._hits
+
+    @property
+    def misses(self):
+        """Getter for the number of cache misses."""
+
+        return self._misses
+
+    @property
+    def evictions(self):
+        """Getter for the number of evicted surfaces."""
+
+        return self._evictions
+
+    def get(self, key):
+        """Return the cached surface for a key.
+
+        Parameters
+        ----------
+        key : tuple
+            the cache key (see make_key)
+
+        Returns
+        -------
+        surface : pygame.Surface
+            the shared surface or None, if key is not cached
+
+        """
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._access += 1
+        entry[2] = self._access
+        return entry[0]
+
+    def put(self, key, surface):
+        """Add a surface to the cache.
+
+        Surfaces that are larger than the cache are not added.
+
+        Parameters
+        ----------
+        key : tuple
+            the cache key (see make_key)
+        surface : pygame.Surface
+            the surface to cache
+
+        """
+
+        n_bytes = surface.get_pitch() * surface.get_height()
+        if n_bytes > self._max_bytes:
+            return
+        self._remove(key)
+        self._evict(n_bytes)
+        self._access += 1
+        self._entries[key] = [surface, n_bytes, self._access]
+        self._shared_ids[id(surface)] = key
+        self._n_bytes += n_bytes
+
+    def is_shared(self, surface):
+        """Return True if the surface is a (shared) surface of the cache.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+
+        """
+
+        key = self._shared_ids.get(id(surface))
+        return key is not None and self._entries[key][0] is surface
+
+    def clear(self):
+        """Remove all surfaces from the cache and reset the counters."""
+
+        self._entries = {}
+        self._shared_ids = {}
+        self._n_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            del self._shared_ids[id(entry[0])]
+            self._n_bytes -= entry[1]
+
+    def _evict(self, n_bytes):
+        """Remove least recently used surfaces until n_bytes do fit."""
+
+        if self._n_bytes + n_bytes <= self._max_bytes:
+            return
+        lru = sorted(self._entries.items(), key=lambda x: x[1][2])
+        for key, entry in lru:
+            if self._n_bytes + n_bytes <= self._max_bytes:
+                break
+            self._remove(key)
+            self._evictions += 1
+
+
+_cache = None
+_cache_screen = None
+
+
+def get_surface_cache():
+    """Return the process-wide surface cache.
+
+    Returns
+    -------
+    cache : SurfaceCache
+        the surface cache or None if caching is switched off
+        (stimuli.defaults.visual_surface_cache_max_bytes = 0)
+
+    """
+
+    global _cache, _cache_screen
+    if not defaults.visual_surface_cache_max_bytes:
+        return None
+    screen = expyriment._active_exp.screen
+    if _cache is None or _cache_screen is not screen:
+        # Surfaces are converted to the pixel format of the display
+        _cache = SurfaceCache()
+        _cache_screen = screen
+    elif _cache.max_bytes != defaults.visual_surface_cache_max_bytes:
+        _cache.max_bytes = defaults.visual_surface_cache_max_bytes
+    return _cache
@@ -16,6 +16,7 @@ __date__ = ''
 
 import os
 import re
+from bisect import bisect_left
 
 import pygame
 
@@ -23,6 +24,7 @@ import defaults
 from expyriment.misc import find_font
 import expyriment
 from _visual import Visual
+from _fontpool import get_font_pool
 
 
 class TextBox(Visual):
@@ -98,8 +100,7 @@ class TextBox(Visual):
         else:
             self._text_font = find_font(expyriment._active_exp.text_font)
         try:
-            _font = pygame.font.Font(self._text_font, 10)
-            _font = None
+            get_font_pool().get(self._text_font, self._text_size)
         except:
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_bold is not None:
@@ -297,10 +298,7 @@ class TextBox(Visual):
         """Create the surface of the stimulus."""
 
         rect = pygame.Rect((0, 0), self.size)
-        _font = pygame.font.Font(self._text_font, self._text_size)
-        _font.set_bold(self.text_bold)
-        _font.set_italic(self.text_italic)
-        _font.set_underline(self.text_underline)
+        _font = self._get_font()
         surface = self.render_textrect(self.format_block(self.text),
                                         _font, rect, self.text_colour,
                                         self.background_colour,
@@ -321,8 +319,8 @@ class TextBox(Visual):
         ----------
         string : str
             text you wish to render, '\n' begins a new line
-        font : pygame.Font object, optional
-            Font object
+        font : pygame.Font object
+            Font object or pooled font (see stimuli.get_font_pool)
         rect : bool
             rectstyle giving the size of requested surface
         text_colour : (int, int, int)
@@ -334,34 +332,7 @@ class TextBox(Visual):
 
         """
 
-        final_lines = []
-        requested_lines = string.splitlines()
-
-        # Create a series of lines that will fit on the provided
-        # rect.
-        for requested_line in requested_lines:
-            if font.size(requested_line)[0] > rect.width:
-                words = requested_line.split(' ')
-                # if any of our words are too long to fit, return.
-                for word in words:
-                    if font.size(word)[0] >= rect.width:
-                        raise Exception, "The word " + word + \
-                                " is too long to fit in the rect passed."
-
-                # Start a new line
-                accumulated_line = ""
-                for word in words:
-                    test_line = accumulated_line + word + " "
-
-                    # Build the line while the words fit.
-                    if font.size(test_line)[0] < rect.width:
-                        accumulated_line = test_line
-                    else:
-                        final_lines.append(accumulated_line)
-                        accumulated_line = word + " "
-                final_lines.append(accumulated_line)
-            else:
-                final_lines.append(requested_line)
+        final_lines = _wrap_lines(string, font, rect.width)
 
         # Let's try to write the text out on the surface.
         surface = pygame.surface.Surface(rect.size,
@@ -370,7 +341,8 @@ class TextBox(Visual):
             surface.fill(background_colour)
         accumulated_height = 0
         for line in final_lines:
-            if accumulated_height + font.size(line)[1] > rect.height: # Changed from >= which led to crashes sometimes!
+            line_height = font.size(line)[1]
+            if accumulated_height + line_height > rect.height: # Changed from >= which led to crashes sometimes!
                 raise Exception, "Once word-wrapped," + \
                         "the text string was too tall to fit in the rect."
             if line != "":
@@ -388,9 +360,59 @@ class TextBox(Visual):
                 else:
                     raise Exception, "Invalid justification argument: " + \
                             str(justification)
-            accumulated_height += font.size(line)[1]
+            accumulated_height += line_height
         return surface
 
+    def _get_font(self):
+        return get_font_pool().get(self._text_font, self._text_size,
+                                   self.text_bold, self.text_italic,
+                                   self.text_underline)
+
+    def layout(self):
+        """Return the lines of the wrapped text without rendering it.
+
+        Returns
+        -------
+        lines : list of str
+            the lines as they would be rendered
+        height : int
+            the height of all lines (might be larger than the text box)
+
+        """
+
+        font = self._get_font()
+        lines = _wrap_lines(self.format_block(self.text), font, self.size[0])
+        return lines, sum([font.size(line)[1] for line in lines])
+
+    def paginate(self):
+        """Split the text into pages that fit into the text box.
+
+        The text is only measured, not rendered.
+
+        Returns
+        -------
+        pages : list of str
+            the texts of the pages (one TextBox of the same size each)
+
+        """
+
+        font = self._get_font()
+        lines = _wrap_lines(self.format_block(self.text), font, self.size[0])
+        pages = []
+        page = []
+        height = 0
+        for line in lines:
+            line_height = font.size(line)[1]
+            if height + line_height > self.size[1] and len(page) > 0:
+                pages.append("\n".join(page))
+                page = []
+                height = 0
+            page.append(line.rstrip(" "))
+            height += line_height
+        if len(page) > 0:
+            pages.append("\n".join(page))
+        return pages
+
     def format_block(self, block):
         """Format the given block of text.
 
@@ -432,6 +454,78 @@ class TextBox(Visual):
     # End of code taken from the word-wrapped text display module
 
 
+_line_breaks = {}
+_max_line_breaks = 256
+
+
+def _wrap_lines(string, font, width):
+    """Wrap a text into lines that fit into a given width.
+
+    The width of each distinct word and of the space is measured only once;
+    line breaks are found by bisection in the prefix sums of the word widths
+    (greedy, like the original algorithm of render_textrect). For pooled
+    fonts the lines are cached per (text, font, width).
+
+    Parameters
+    ----------
+    string : str
+        text to wrap, '\n' begins a new line
+    font : pygame.Font object
+        Font object or pooled font (see stimuli.get_font_pool)
+    width : int
+        maximal width of a line
+
+    Returns
+    -------
+    lines : list of str
+
+    """
+
+    key = getattr(font, "key", None)
+    if key is not None:
+        key = (string, key, width)
+        lines = _line_breaks.get(key)
+        if lines is not None:
+            return list(lines)
+        size = font.size
+    else:
+        sizes = {}
+        def size(text):
+            if text not in sizes:
+                sizes[text] = font.size(text)
+            return sizes[text]
+
+    space = size(" ")[0]
+    lines = []
+    for requested_line in string.splitlines():
+        if size(requested_line)[0] <= width:
+            lines.append(requested_line)
+            continue
+        words = requested_line.split(' ')
+        # Prefix sums of the widths of the words (each followed by a space)
+        prefix = [0]
+        for word in words:
+            word_width = size(word)[0]
+            # if any of our words are too long to fit, return.
+            if word_width >= width:
+                raise Exception, "The word " + word + \
+                        " is too long to fit in the rect passed."
+            prefix.append(prefix[-1] + word_width + space)
+        if prefix[1] >= width:
+            lines.append("")
+        first = 0
+        while first < len(words):
+            last = max(first + 1, bisect_left(prefix, prefix[first] + width) - 1)
+            lines.append(" ".join(words[first:last]) + " ")
+            first = last
+
+    if key is not None:
+        if len(_line_breaks) >= _max_line_breaks:
+            _line_breaks.clear()
+        _line_breaks[key] = tuple(lines)
+    return lines
+
+
 if __name__ == "__main__":
     from expyriment import control
     control.set_develop_mode(True)
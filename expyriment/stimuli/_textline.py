@@ -20,6 +20,7 @@ import pygame
 
 import defaults
 from _visual import Visual
+from _fontpool import get_font_pool
 from expyriment.misc import find_font
 import expyriment
 
@@ -81,8 +82,7 @@ class TextLine(Visual):
         else:
             self._text_font = find_font(expyriment._active_exp.text_font)
         try:
-            _font = pygame.font.Font(self._text_font, 10)
-            _font = None
+            get_font_pool().get(self._text_font, self._text_size)
         except:
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_bold is not None:
@@ -239,14 +239,19 @@ class TextLine(Visual):
         else:
             self._background_colour = value
 
+    def _surface_cache_key(self):
+        """Return all parameters that affect the rendering of the surface."""
+
+        return (self._text, self._text_font, self._text_size,
+                self._text_bold, self._text_italic, self._text_underline,
+                self._text_colour, self._background_colour)
+
     def _create_surface(self):
         """Create the surface of the stimulus."""
 
-        _font = pygame.font.Font(self._text_font, self._text_size)
-
-        _font.set_bold(self.text_bold)
-        _font.set_italic(self.text_italic)
-        _font.set_underline(self.text_underline)
+        _font = get_font_pool().get(self._text_font, self._text_size,
+                                    self.text_bold, self.text_italic,
+                                    self.text_underline)
         if self.background_colour:
             text = _font.render(self.text, True, self.text_colour,
                                      self.background_colour)
@@ -20,6 +20,7 @@ import defaults
 from _visual import Visual
 from _textline import TextLine
 from _textbox import TextBox
+from _fontpool import get_font_pool
 from expyriment.misc import find_font
 import expyriment
 
@@ -88,8 +89,7 @@ class TextScreen(Visual):
         else:
             self._heading_font = expyriment._active_exp.text_font
         try:
-            _font = pygame.font.Font(self._heading_font, 10)
-            _font = None
+            get_font_pool().get(self._heading_font, 10)
         except:
             raise IOError("Font '{0}' not found!".format(heading_font))
         if heading_size is None:
@@ -126,8 +126,7 @@ class TextScreen(Visual):
         else:
             self._text_font = expyriment._active_exp.text_font
         try:
-            _font = pygame.font.Font(self._text_font, 10)
-            _font = None
+            get_font_pool().get(self._text_font, 10)
         except:
             raise IOError("Font '{0}' not found!".format(text_font))
         if text_size is None:
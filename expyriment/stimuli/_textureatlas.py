@@ -0,0 +1,420 @@
+"""
+A texture atlas for preloaded OpenGL stimuli.
+
+This module contains classes that pack many small surfaces into a few large
+OpenGL textures, instead of creating one texture object per stimulus.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import pygame
+try:
+    import OpenGL.GL as ogl
+except ImportError:
+    ogl = None
+
+import defaults
+import expyriment
+
+
+class AtlasRegion(object):
+    """A class implementing a rectangular region of a texture atlas page."""
+
+    def __init__(self, page, rect, size):
+        """Create an atlas region.
+
+        Notes
+        -----
+        Atlas regions are created by TextureAtlas.add() only!
+
+        Parameters
+        ----------
+        page : _AtlasPage
+            the page the region belongs to
+        rect : (int, int, int, int)
+            allocated rectangle (x, y, width, height) including padding
+        size : (int, int)
+            size of the surface stored in the region
+
+        """
+
+        self._page = page
+        self._rect = rect
+        self._size = size
+        self._n_users = 1
+        pad = TextureAtlas.padding
+        s = float(page.size)
+        self._uv = ((rect[0] + pad) / s, (rect[1] + pad) / s,
+                    (rect[0] + pad + size[0]) / s,
+                    (rect[1] + pad + size[1]) / s)
+
+    def __deepcopy__(self, memo):
+        """Regions are handles to shared texture memory and are not copied.
+
+        A copy adds a user to the region. The region is given back to the
+        atlas, when all users have released it.
+
+        """
+
+        self._n_users += 1
+        return self
+
+    @property
+    def texture(self):
+        """Getter for the OpenGL texture id of the region."""
+
+        return self._page.texture
+
+    @property
+    def size(self):
+        """Getter for size."""
+
+        return self._size
+
+    @property
+    def uv(self):
+        """Getter for the texture coordinates (u0, v0, u1, v1).
+
+        (u0, v0) is the bottom left and (u1, v1) the top right corner.
+
+        """
+
+        return self._uv
+
+    @property
+    def n_users(self):
+        """Getter for the number of users (copies) of the region."""
+
+        return self._n_users
+
+    def release(self):
+        """Release the region for one of its users.
+
+        The region is given back to the atlas when the last user released
+        it. Releasing a region more often than it has users has no effect.
+
+        """
+
+        if self._n_users > 0:
+            self._n_users -= 1
+            if self._n_users == 0:
+                self._page.release(self)
+
+
+class _AtlasPage(object):
+    """A class implementing a single texture of a texture atlas.
+
+    Regions are allocated on horizontal shelves. Released regions are kept
+    in a free list, in which neighbouring rectangles are merged, and reused
+    by later allocations of a fitting size.
+
+    """
+
+    def __init__(self, size):
+        """Create an atlas page and allocate its OpenGL texture.
+
+        Parameters
+        ----------
+        size : int
+            width and height of the texture in pixels
+
+        """
+
+        self.size = size
+        self.texture = ogl.glGenTextures(1)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, ogl.GL_RGBA, size, size, 0,
+                         ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE, None)
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MAG_FILTER,
+                            ogl.GL_NEAREST)
+        ogl.glTexParameterf(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER,
+                            ogl.GL_LINEAR)
+        ogl.glDisable(ogl.GL_TEXTURE_2D)
+        self._live = {}
+        self._reset_allocator()
+
+    def _reset_allocator(self):
+        self._shelves = []  # [y, height, used_width]
+        self._next_y = 0
+        self._free = []  # released rectangles (x, y, width, height)
+
+    def __del__(self):
+        """Call glDeleteTextures when deconstruction the object."""
+
+        try:
+            ogl.glDeleteTextures([self.texture])
+        except:
+            pass
+
+    @property
+    def n_regions(self):
+        """Getter for the number of allocated regions."""
+
+        return len(self._live)
+
+    def allocate(self, width, height):
+        """Allocate a rectangle on the page.
+
+        Parameters
+        ----------
+        width : int
+        height : int
+
+        Returns
+        -------
+        rect : (int, int, int, int) or None
+            the allocated rectangle or None if the page is full
+
+        """
+
+        # Best fit from the free list
+        best = None
+        for idx, (fx, fy, fw, fh) in enumerate(self._free):
+            if fw >= width and fh >= height:
+                waste = fw * fh - width * height
+                if best is None or waste < best[0]:
+                    best = (waste, idx)
+                    if waste == 0:
+                        break
+        if best is not None:
+            fx, fy, fw, fh = self._free.pop(best[1])
+            # Guillotine split of the remaining space
+            if fw - width > 0:
+                self._free.append((fx + width, fy, fw - width, height))
+            if fh - height > 0:
+                self._free.append((fx, fy + height, fw, fh - height))
+            return (fx, fy, width, height)
+
+        # Best fitting shelf
+        best = None
+        for shelf in self._shelves:
+            if shelf[1] >= height and self.size - shelf[2] >= width:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+        if best is not None:
+            rect = (best[2], best[0], width, height)
+            best[2] += width
+            if best[1] - height > 0:
+                self._free.append((rect[0], rect[1] + height,
+                                   width, best[1] - height))
+            return rect
+
+        # New shelf
+        if self._next_y + height <= self.size and width <= self.size:
+            shelf = [self._next_y, height, width]
+            self._shelves.append(shelf)
+            self._next_y += height
+            return (0, shelf[0], width, height)
+
+        return None
+
+    def upload(self, surface, region):
+        """Copy a surface into an allocated region of the texture.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+        region : AtlasRegion
+
+        """
+
+        pad = TextureAtlas.padding
+        width, height = surface.get_size()
+        if pad > 0:
+            padded = pygame.surface.Surface((width + 2 * pad,
+                                             height + 2 * pad),
+                                            pygame.SRCALPHA)
+            padded.fill((0, 0, 0, 0))
+            padded.blit(surface, (pad, pad))
+            surface = padded
+        x, y, width, height = region._rect
+        data = pygame.image.tostring(surface, "RGBA", 1)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        ogl.glTexSubImage2D(ogl.GL_TEXTURE_2D, 0, x, y, width, height,
+                            ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE, data)
+        ogl.glDisable(ogl.GL_TEXTURE_2D)
+
+    def release(self, region):
+        """Put the rectangle of a region back to the free list.
+
+        Parameters
+        ----------
+        region : AtlasRegion
+
+        """
+
+        if self._live.pop(id(region), None) is None:
+            return
+        if len(self._live) == 0:
+            self._reset_allocator()
+        else:
+            self._free.append(region._rect)
+            self._coalesce()
+
+    def _coalesce(self):
+        """Merge neighbouring free rectangles that share a complete edge."""
+
+        merged = True
+        while merged:
+            merged = False
+            free = self._free
+            for i in range(len(free)):
+                ax, ay, aw, ah = free[i]
+                for j in range(i + 1, len(free)):
+                    bx, by, bw, bh = free[j]
+                    if ay == by and ah == bh and \
+                            (ax + aw == bx or bx + bw == ax):
+                        rect = (min(ax, bx), ay, aw + bw, ah)
+                    elif ax == bx and aw == bw and \
+                            (ay + ah == by or by + bh == ay):
+                        rect = (ax, min(ay, by), aw, ah + bh)
+                    else:
+                        continue
+                    free[i] = rect
+                    del free[j]
+                    merged = True
+                    break
+                if merged:
+                    break
+
+
+class TextureAtlas(object):
+    """A class implementing a texture atlas.
+
+    The atlas packs small surfaces into a few large textures (pages). Each
+    packed surface is represented by an AtlasRegion, which holds the texture
+    and the texture coordinates of the surface. Surfaces that are larger than
+    'max_region_size' are not packed.
+
+    """
+
+    padding = 1  # transparent border around each region
+
+    def __init__(self, size=None, max_region_size=None):
+        """Create a texture atlas.
+
+        Parameters
+        ----------
+        size : int, optional
+            width and height of the atlas pages
+        max_region_size : int, optional
+            maximal width and height of a surface to be packed
+
+        """
+
+        if size is None:
+            size = defaults.visual_texture_atlas_size
+        max_size = ogl.glGetIntegerv(ogl.GL_MAX_TEXTURE_SIZE)
+        try:
+            size = min(size, int(max_size))
+        except TypeError:
+            pass
+        self._size = size
+        if max_region_size is None:
+            max_region_size = defaults.visual_texture_atlas_max_region_size
+        self._max_region_size = min(max_region_size,
+                                    size - 2 * TextureAtlas.padding)
+        self._pages = []
+
+    @property
+    def size(self):
+        """Getter for size."""
+
+        return self._size
+
+    @property
+    def max_region_size(self):
+        """Getter for max_region_size."""
+
+        return self._max_region_size
+
+    @property
+    def n_pages(self):
+        """Getter for the number of atlas pages (textures)."""
+
+        return len(self._pages)
+
+    @property
+    def n_regions(self):
+        """Getter for the number of packed surfaces."""
+
+        return sum([p.n_regions for p in self._pages])
+
+    def fits(self, surface):
+        """Return True if the surface can be packed into the atlas.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+
+        """
+
+        width, height = surface.get_size()
+        return 0 < width <= self._max_region_size and \
+                0 < height <= self._max_region_size
+
+    def add(self, surface):
+        """Pack a surface into the atlas.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+            the surface to pack
+
+        Returns
+        -------
+        region : AtlasRegion
+            the region in the atlas or None if the surface does not fit
+
+        """
+
+        if not self.fits(surface):
+            return None
+        size = surface.get_size()
+        pad = 2 * TextureAtlas.padding
+        for page in self._pages + [None]:
+            if page is None:
+                page = _AtlasPage(self._size)
+                self._pages.append(page)
+            rect = page.allocate(size[0] + pad, size[1] + pad)
+            if rect is not None:
+                break
+        region = AtlasRegion(page, rect, size)
+        page._live[id(region)] = region
+        page.upload(surface, region)
+        return region
+
+
+_atlas = None
+_atlas_screen = None
+
+
+def get_texture_atlas():
+    """Return the texture atlas of the current screen.
+
+    Returns
+    -------
+    atlas : TextureAtlas
+        the atlas or None if the atlas is switched off or OpenGL is not used
+
+    """
+
+    global _atlas, _atlas_screen
+    if not defaults.visual_texture_atlas or ogl is None:
+        return None
+    screen = expyriment._active_exp.screen
+    if screen is None or not screen.open_gl:
+        return None
+    if _atlas is None or _atlas_screen is not screen:
+        # A new screen means a new OpenGL context
+        _atlas = TextureAtlas()
+        _atlas_screen = screen
+    return _atlas
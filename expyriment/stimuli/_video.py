@@ -274,8 +274,9 @@ expyriment.control.stop_audiosystem() before preloading the video."
                         self._surface, position=self._position)
                     ogl_screen.display()
                 else:
-                    expyriment._active_exp._screen.surface.blit(self._surface,
-                                                 self._pos)
+                    rect = expyriment._active_exp._screen.surface.blit(
+                        self._surface, self._pos)
+                    expyriment._active_exp._screen.mark_dirty(rect)
                 expyriment._active_exp._screen.update()
 
     def _wait(self, frame=None):
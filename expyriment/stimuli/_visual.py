@@ -11,136 +11,243 @@ __date__ = ''
 
 import tempfile
 import os
-import copy
 import random
 import types
+import inspect
+import ctypes
 
 import pygame
 try:
-    import OpenGL.GLU as oglu
     import OpenGL.GL as ogl
 except ImportError:
-    oglu = None
     ogl = None
 
 import defaults
 import expyriment
 from _stimulus import Stimulus
+from _textureatlas import get_texture_atlas
+from _surfacecache import SurfaceCache, get_surface_cache
+from _compression import get_compression_backend
+import _pixelarray
 from expyriment.misc import geometry, Clock
 
 random.seed()
 
 
+class _GLDrawState(object):
+    """A class tracking the OpenGL state of consecutive stimulus draws.
+
+    All stimuli are drawn from one shared unit quad (a vertex buffer object
+    or, if not available, a client side vertex array). Blending, texturing
+    and the vertex arrays are enabled by the first draw and stay enabled for
+    all further draws, until the screen is updated (see reset()). Textures
+    and texture matrices are only changed, if they differ from the previous
+    draw.
+
+    """
+
+    # Interleaved vertex and texture coordinates (x, y, u, v)
+    _quad = (0.0, 0.0, 0.0, 0.0,
+             1.0, 0.0, 1.0, 0.0,
+             1.0, 1.0, 1.0, 1.0,
+             0.0, 1.0, 0.0, 1.0)
+    _stride = 4 * ctypes.sizeof(ctypes.c_float)
+    _screen = None
+    _vbo = None
+    _array = None
+    active = False
+    texture = None
+    uv = None
+
+    @classmethod
+    def _setup_quad(cls):
+        """Create the shared quad for the current screen."""
+
+        screen = expyriment._active_exp.screen
+        if cls._screen is screen:
+            return
+        cls._screen = screen
+        cls._array = (ctypes.c_float * len(cls._quad))(*cls._quad)
+        cls._vbo = None
+        if bool(ogl.glGenBuffers):
+            try:
+                cls._vbo = ogl.glGenBuffers(1)
+                ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, cls._vbo)
+                ogl.glBufferData(ogl.GL_ARRAY_BUFFER,
+                                 ctypes.sizeof(cls._array), cls._array,
+                                 ogl.GL_STATIC_DRAW)
+                ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, 0)
+            except:
+                cls._vbo = None
+
+    @classmethod
+    def begin(cls):
+        """Enable the state required to draw stimuli."""
+
+        if cls.active:
+            return
+        cls._setup_quad()
+        ogl.glEnable(ogl.GL_BLEND)
+        ogl.glBlendFunc(ogl.GL_SRC_ALPHA, ogl.GL_ONE_MINUS_SRC_ALPHA)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glTexEnvf(ogl.GL_TEXTURE_ENV, ogl.GL_TEXTURE_ENV_MODE,
+                      ogl.GL_REPLACE)
+        ogl.glEnableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glEnableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+        offset = 2 * ctypes.sizeof(ctypes.c_float)
+        if cls._vbo is not None:
+            ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, cls._vbo)
+            ogl.glVertexPointer(2, ogl.GL_FLOAT, cls._stride,
+                                ctypes.c_void_p(0))
+            ogl.glTexCoordPointer(2, ogl.GL_FLOAT, cls._stride,
+                                  ctypes.c_void_p(offset))
+        else:
+            address = ctypes.addressof(cls._array)
+            ogl.glVertexPointer(2, ogl.GL_FLOAT, cls._stride,
+                                ctypes.c_void_p(address))
+            ogl.glTexCoordPointer(2, ogl.GL_FLOAT, cls._stride,
+                                  ctypes.c_void_p(address + offset))
+        ogl.glMatrixMode(ogl.GL_MODELVIEW)
+        cls.active = True
+        cls.texture = None
+        cls.uv = None
+
+    @classmethod
+    def invalidate(cls):
+        """Forget the tracked state (e.g. after creating a texture)."""
+
+        cls.active = False
+        cls.texture = None
+        cls.uv = None
+
+    @classmethod
+    def reset(cls):
+        """Disable the draw state and reset the matrices."""
+
+        if not cls.active:
+            return
+        ogl.glDisableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glDisableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+        if cls._vbo is not None:
+            ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, 0)
+        ogl.glMatrixMode(ogl.GL_TEXTURE)
+        ogl.glLoadIdentity()
+        ogl.glMatrixMode(ogl.GL_MODELVIEW)
+        ogl.glLoadIdentity()
+        ogl.glDisable(ogl.GL_BLEND)
+        ogl.glDisable(ogl.GL_TEXTURE_2D)
+        cls.invalidate()
+
+
 class _LaminaPanelSurface(object):
     """A class implementing an OpenGL surface."""
 
-    # The following code is based on part of the Lamina module by David Keeney
-    # (http://pitchersduel.python-hosting.com/file/branches/Lamina/lamina.py)
-    # with some modifications to fit it into expyriment (e.g. positioning)
-    def __init__(self, surface, quadDims=(-1, 1, 1, 1),
-                 position=(0, 0)):
+    # The following code is originally based on part of the Lamina module by
+    # David Keeney (http://pitchersduel.python-hosting.com/file/branches/
+    # Lamina/lamina.py), but has been rewritten to draw from a shared quad
+    # with a per-stimulus modelview matrix.
+    def __init__(self, surface, position=(0, 0)):
         """Initialize new instance.
 
         Parameters
         ----------
         surface : pygame surface
             pygame surface to convert
-        quadDims : (int,int), optional
         position : (int,int), optional
 
         """
 
-        self._txtr = Visual._load_texture(surface)
+        self._region = None
+        self._txtr = None
+        atlas = get_texture_atlas()
+        if atlas is not None and atlas.fits(surface):
+            self._region = atlas.add(surface)
+            self._uv = self._region.uv
+        else:
+            self._txtr = Visual._load_texture(surface)
+            self._uv = (0.0, 0.0, 1.0, 1.0)
+        _GLDrawState.invalidate()
+        u0, v0, u1, v1 = self._uv
+        self._texture_matrix = [u1 - u0, 0, 0, 0,
+                                0, v1 - v0, 0, 0,
+                                0, 0, 1, 0,
+                                u0, v0, 0, 1]
         self._winsize = surface.get_size()
+        self._screensize = pygame.display.get_surface().get_size()
+        self._matrix = [2.0 * self._winsize[0] / self._screensize[0], 0, 0, 0,
+                        0, 2.0 * self._winsize[1] / self._screensize[1], 0, 0,
+                        0, 0, 1, 0,
+                        0, 0, 0, 1]
         self._position = position
-        left, top, width, height = quadDims
-        right, bottom = left + width, top - height
-        self._qdims = quadDims
-        self.dims = ((left, top, 0), (right, top, 0),
-                     (right, bottom, 0), (left, bottom, 0))
         self.refresh_position()
 
     def __del__(self):
         """Call glDeleteTextures when deconstruction the object."""
 
+        self.release()
+
+    def release(self):
+        """Free the texture or the texture atlas region of the surface."""
+
+        if self._region is not None:
+            self._region.release()
+            self._region = None
         if self._txtr is not None:
             try:
                 ogl.glDeleteTextures([self._txtr])
             except:
                 pass
+            self._txtr = None
 
-    def convertMousePos(self, pos):
-        """Convert 2d pixel mouse pos to 2d gl units.
+    @property
+    def texture(self):
+        """Getter for the OpenGL texture the surface is drawn from."""
+
+        if self._region is not None:
+            return self._region.texture
+        else:
+            return self._txtr
+
+    @property
+    def size(self):
+        """Getter for the size of the surface."""
+
+        return self._winsize
+
+    def refresh_position(self, position=None):
+        """Update the translation of the quad.
 
         Parameters
         ----------
-        pos : (int, int)
-            position of mouse
+        position : (int, int), optional
+            the new position
 
         """
 
-        x0, y0 = pos
-        x = x0 / self._winsize[0] * self._qdims[2] + self._qdims[0]
-        y = y0 / self._winsize[1] * self._qdims[3] + self._qdims[1]
-        return x, y
-
-    def refresh_position(self):
-        """Recalc where in modelspace quad needs to be to fill screen."""
-
-        screensize = pygame.display.get_surface().get_size()
-        bottomleft = oglu.gluUnProject(screensize[0] / 2 - \
-                                       self._winsize[0] / 2 + \
-                                       self._position[0],
-                                       screensize[1] / 2 - \
-                                       self._winsize[1] / 2 + \
-                                       self._position[1], 0)
-        bottomright = oglu.gluUnProject(screensize[0] / 2 + \
-                                        self._winsize[0] / 2 + \
-                                        self._position[0],
-                                        screensize[1] / 2 - \
-                                        self._winsize[1] / 2 + \
-                                        self._position[1], 0)
-        topleft = oglu.gluUnProject(screensize[0] / 2 - \
-                                    self._winsize[0] / 2 + \
-                                    self._position[0],
-                                    screensize[1] / 2 + \
-                                    self._winsize[1] / 2 + \
-                                    self._position[1], 0)
-        topright = oglu.gluUnProject(screensize[0] / 2 + \
-                                     self._winsize[0] / 2 + \
-                                     self._position[0],
-                                     screensize[1] / 2 + \
-                                     self._winsize[1] / 2 + \
-                                     self._position[1], 0)
-        self.dims = topleft, topright, bottomright, bottomleft
-        width = topright[0] - topleft[0]
-        height = topright[1] - bottomright[1]
-        self._qdims = topleft[0], topleft[1], width, height
+        if position is not None:
+            self._position = position
+        left = self._screensize[0] / 2 - self._winsize[0] / 2 + \
+                self._position[0]
+        bottom = self._screensize[1] / 2 - self._winsize[1] / 2 + \
+                self._position[1]
+        self._matrix[12] = 2.0 * left / self._screensize[0] - 1
+        self._matrix[13] = 2.0 * bottom / self._screensize[1] - 1
 
     def display(self):
         """Draw surface to a quad."""
 
-        ogl.glEnable(ogl.GL_BLEND)
-        ogl.glBlendFunc(ogl.GL_SRC_ALPHA, ogl.GL_ONE_MINUS_SRC_ALPHA)
-        ogl.glEnable(ogl.GL_TEXTURE_2D)
-        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self._txtr)
-        ogl.glTexEnvf(ogl.GL_TEXTURE_ENV, ogl.GL_TEXTURE_ENV_MODE,
-                      ogl.GL_REPLACE)
-        ogl.glTexParameterfv(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER,
-                           ogl.GL_LINEAR)
-        ogl.glBegin(ogl.GL_QUADS)
-        ogl.glTexCoord2f(0.0, 1.0)
-        ogl.glVertex3f(*self.dims[0])
-        ogl.glTexCoord2f(1.0, 1.0)
-        ogl.glVertex3f(*self.dims[1])
-        ogl.glTexCoord2f(1.0, 0.0)
-        ogl.glVertex3f(*self.dims[2])
-        ogl.glTexCoord2f(0.0, 0.0)
-        ogl.glVertex3f(*self.dims[3])
-        ogl.glEnd()
-        ogl.glDisable(ogl.GL_BLEND)
-        ogl.glDisable(ogl.GL_TEXTURE_2D)
-    # End of code bsed on Lamina module
+        _GLDrawState.begin()
+        texture = self.texture
+        if _GLDrawState.texture != texture:
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, texture)
+            _GLDrawState.texture = texture
+        if _GLDrawState.uv != self._uv:
+            ogl.glMatrixMode(ogl.GL_TEXTURE)
+            ogl.glLoadMatrixf(self._texture_matrix)
+            ogl.glMatrixMode(ogl.GL_MODELVIEW)
+            _GLDrawState.uv = self._uv
+        ogl.glLoadMatrixf(self._matrix)
+        ogl.glDrawArrays(ogl.GL_TRIANGLE_FAN, 0, 4)
 
 
 class Visual(Stimulus):
@@ -183,7 +290,7 @@ class Visual(Stimulus):
                             ogl.GL_NEAREST)
         ogl.glTexParameterf(ogl.GL_TEXTURE_2D,
                             ogl.GL_TEXTURE_MIN_FILTER,
-                            ogl.GL_NEAREST)
+                            ogl.GL_LINEAR)
         ogl.glDisable(ogl.GL_TEXTURE_2D)
         return txtr
     # End of code bsed on Lamina module
@@ -206,15 +313,19 @@ class Visual(Stimulus):
         else:
             self._position = list(defaults.visual_position)
         self._surface = None
+        self._surface_is_shared = False
+        self._surface_version = 0
+        self._collision_data = None
         self._is_preloaded = False
         self._parent = None
         self._ogl_screen = None
         self._is_compressed = False
-        self._compression_filename = None
+        self._compressed_surface = None
 
         self._was_compressed_before_preload = None
 
     _compression_exception_message = "Cannot call {0} on compressed stimuli!"
+    _cacheable_classes = {}
 
     def __del__(self):
         """ Clear surface and ogl_screen when when the objects is deconstructed.
@@ -225,11 +336,10 @@ class Visual(Stimulus):
             self.clear_surface()
         except:
             pass
-        if self._compression_filename is not None:
-            try:
-                os.remove(self._compression_filename)
-            except:
-                pass
+        try:
+            self._release_compressed_surface()
+        except:
+            pass
 
     @property
     def position(self):
@@ -239,15 +349,11 @@ class Visual(Stimulus):
 
     @position.setter
     def position(self, value):
-        """Setter for position.
-
-        When using OpenGL, this can take longer then 1ms!
-
-        """
+        """Setter for position."""
 
         self._position = list(value)
         if self.is_preloaded and self._ogl_screen is not None:
-            self._ogl_screen.refresh_position()
+            self._ogl_screen.refresh_position(self._position)
 
     @property
     def absolute_position(self):
@@ -290,6 +396,89 @@ class Visual(Stimulus):
         surface = pygame.surface.Surface((0, 0))
         return surface
 
+    def _load_data(self):
+        """Load the data the surface is created from.
+
+        Subclasses that read and decode files implement this method. It may
+        be called from a worker thread and must neither create nor convert
+        surfaces. The data is passed to _create_surface_from_data on the
+        main thread.
+
+        Returns
+        -------
+        data : object
+            the data or None if the stimulus does not need to load data
+
+        """
+
+        return None
+
+    def _create_surface_from_data(self, data):
+        """Create the surface from the data returned by _load_data."""
+
+        return self._create_surface()
+
+    def _surface_cache_key(self):
+        """Return all parameters that affect the rendering of the surface.
+
+        Subclasses that implement this method get their surfaces from the
+        process-wide surface cache. Returning None switches off caching.
+
+        """
+
+        return None
+
+    @classmethod
+    def _is_cacheable(cls):
+        """Return True if _surface_cache_key describes _create_surface.
+
+        Caching is only safe, if _surface_cache_key is not implemented by a
+        base class of the class that implements _create_surface.
+
+        """
+
+        try:
+            return Visual._cacheable_classes[cls]
+        except KeyError:
+            mro = inspect.getmro(cls)
+            create = [c for c in mro if "_create_surface" in c.__dict__][0]
+            key = [c for c in mro if "_surface_cache_key" in c.__dict__][0]
+            cacheable = key is not Visual and issubclass(key, create)
+            Visual._cacheable_classes[cls] = cacheable
+            return cacheable
+
+    def _create_cached_surface(self):
+        """Create the surface or take it from the surface cache.
+
+        The returned surface might be shared with other stimuli and must not
+        be modified in place (see _make_surface_private).
+
+        """
+
+        cache = get_surface_cache()
+        if cache is None or not self._is_cacheable():
+            return self._create_surface()
+        parameters = self._surface_cache_key()
+        if parameters is None:
+            return self._create_surface()
+        key = SurfaceCache.make_key(self.__class__, parameters)
+        surface = cache.get(key)
+        if surface is None:
+            surface = self._create_surface()
+            cache.put(key, surface)
+        return surface
+
+    def _make_surface_private(self):
+        """Copy on write: copy the surface if it is shared with others.
+
+        Has to be called before modifying the surface in place.
+
+        """
+
+        if self._surface_is_shared and self._surface is not None:
+            self._surface = self._surface.copy()
+        self._surface_is_shared = False
+
     def _set_surface(self, surface):
         """Set the surface.
 
@@ -304,6 +493,10 @@ class Visual(Stimulus):
             return False
         else:
             self._surface = surface
+            self._surface_version += 1
+            cache = get_surface_cache()
+            self._surface_is_shared = surface is not None and \
+                    cache is not None and cache.is_shared(surface)
             return True
 
     def _get_surface(self):
@@ -313,10 +506,9 @@ class Visual(Stimulus):
             return self._surface
         else:
             if self.is_compressed:
-                tmp = pygame.image.load(
-                    self._compression_filename).convert_alpha()
+                tmp = self._compressed_surface.load()
             else:
-                tmp = self._create_surface()
+                tmp = self._create_cached_surface()
             return tmp
 
     def copy(self):
@@ -333,6 +525,7 @@ class Visual(Stimulus):
 
         """
 
+        self._collision_data = None
         if self.has_surface:
             surface_backup = self._get_surface().copy()
             surface_copy = self._get_surface().copy()
@@ -343,7 +536,7 @@ class Visual(Stimulus):
             rtn._is_preloaded = False
             rtn._ogl_screen = None
             rtn._is_compressed = False
-            rtn._compression_filename = None
+            rtn._compressed_surface = None
         if self.is_preloaded:
             if expyriment._active_exp.screen.open_gl:
                 self._ogl_screen = _LaminaPanelSurface(
@@ -380,8 +573,6 @@ class Visual(Stimulus):
     def move(self, offset):
         """Moves the stimulus in 2D space.
 
-        When using OpenGL, this can take longer then 1ms!
-
         Parameters
         ----------
         offset : list, optional
@@ -405,9 +596,47 @@ class Visual(Stimulus):
             self._position[1] = self._position[1] + y
             moved = True
         if moved and self._ogl_screen is not None:
-            self._ogl_screen.refresh_position()
+            self._ogl_screen.refresh_position(self._position)
         return int((Clock._cpu_time() - start) * 1000)
 
+    def _get_collision_data(self):
+        """Return the collision mask of the visible pixels of the stimulus.
+
+        The mask, its bounding rectangle and its number of pixels are cached
+        and only rebuilt if the surface has changed.
+
+        Returns
+        -------
+        mask : pygame.mask.Mask
+        bounding_rect : pygame.Rect
+        count : int
+
+        """
+
+        tag = None
+        if self._surface is None and not self.is_compressed:
+            # The surface is created on demand from the current parameters
+            if self._is_cacheable():
+                tag = self._surface_cache_key()
+            if tag is None:
+                return _make_collision_data(self._get_surface())
+        key = (self._surface_version, tag)
+        if self._collision_data is None or self._collision_data[0] != key:
+            self._collision_data = (key,) + \
+                    _make_collision_data(self._get_surface())
+        return self._collision_data[1:]
+
+    def _collision_offset(self, stimulus, self_mask, other_mask):
+        """Return the offset of the mask of stimulus relative to own mask."""
+
+        self_size = self_mask.get_size()
+        other_size = other_mask.get_size()
+        # Screen centre cancels out in the offset
+        return (stimulus.position[0] - other_size[0] / 2 -
+                self.position[0] + self_size[0] / 2,
+                - stimulus.position[1] - other_size[1] / 2 +
+                self.position[1] + self_size[1] / 2)
+
     def inside_stimulus(self, stimulus, mode="visible"):
         """Check if stimulus is inside another stimulus.
 
@@ -432,23 +661,15 @@ class Visual(Stimulus):
         """
 
         if mode == "visible":
-            screen_size = expyriment._active_exp.screen.surface.get_size()
-            self_size = self.surface_size
-            other_size = stimulus.surface_size
-            self_pos = (
-                self.position[0] + screen_size[0] / 2 - self_size[0] / 2,
-                - self.position[1] + screen_size[1] / 2 - self_size[1] / 2)
-            other_pos = (
-                stimulus.position[0] + screen_size[0] / 2 - other_size[0] / 2,
-                - stimulus.position[1] + screen_size[1] / 2 - other_size[1] / 2)
-            offset = (-self_pos[0] + other_pos[0], -self_pos[1] + other_pos[1])
-            self_mask = pygame.mask.from_surface(self._get_surface())
-            other_mask = pygame.mask.from_surface(stimulus._get_surface())
-            overlap = self_mask.overlap_area(other_mask, offset)
-            if overlap > 0 and overlap == self_mask.count():
-                return True
-            else:
+            self_mask, self_rect, self_count = self._get_collision_data()
+            other_mask, other_rect, other_count = \
+                    stimulus._get_collision_data()
+            offset = self._collision_offset(stimulus, self_mask, other_mask)
+            if self_count == 0 or \
+                    not other_rect.move(offset).contains(self_rect):
                 return False
+            overlap = self_mask.overlap_area(other_mask, offset)
+            return overlap > 0 and overlap == self_count
 
         elif mode == "surface":
             screen_size = expyriment._active_exp.screen.surface.get_size()
@@ -495,18 +716,12 @@ class Visual(Stimulus):
         """
 
         if mode == "visible":
-            screen_size = expyriment._active_exp.screen.surface.get_size()
-            self_size = self.surface_size
-            other_size = stimulus.surface_size
-            self_pos = (
-                self.position[0] + screen_size[0] / 2 - self_size[0] / 2,
-                - self.position[1] + screen_size[1] / 2 - self_size[1] / 2)
-            other_pos = (
-                stimulus.position[0] + screen_size[0] / 2 - other_size[0] / 2,
-                - stimulus.position[1] + screen_size[1] / 2 - other_size[1] / 2)
-            offset = (-self_pos[0] + other_pos[0], -self_pos[1] + other_pos[1])
-            self_mask = pygame.mask.from_surface(self._get_surface())
-            other_mask = pygame.mask.from_surface(stimulus._get_surface())
+            self_mask, self_rect, self_count = self._get_collision_data()
+            other_mask, other_rect, other_count = \
+                    stimulus._get_collision_data()
+            offset = self._collision_offset(stimulus, self_mask, other_mask)
+            if not self_rect.colliderect(other_rect.move(offset)):
+                return False, 0
             overlap = self_mask.overlap_area(other_mask, offset)
             if overlap > 0:
                 return True, overlap
@@ -554,23 +769,14 @@ class Visual(Stimulus):
         """
 
         if mode == "visible":
-            screen_size = expyriment._active_exp.screen.surface.get_size()
-            self_size = self.surface_size
-            self_pos = (
-                (self.position[0] + screen_size[0] / 2) - self_size[0] / 2,
-                (-self.position[1] + screen_size[1] / 2) - self_size[1] / 2)
-            pos = (position[0] + screen_size[0] / 2,
-                   - position[1] + screen_size[1] / 2)
-            offset = (pos[0] - self_pos[0], pos[1] - self_pos[1])
-            self_mask = pygame.mask.from_surface(self._get_surface())
-            overlap = False
-            if 0 <= offset[0] < self_size[0] and 0 <= offset[1] < self_size[1]:
-                overlap = self_mask.get_at(offset)
-                if overlap > 0:
-                    overlap = True
-                else:
-                    overlap = False
-            return overlap
+            self_mask, self_rect, self_count = self._get_collision_data()
+            self_size = self_mask.get_size()
+            # Screen centre cancels out in the offset
+            offset = (position[0] - self.position[0] + self_size[0] / 2,
+                      - position[1] + self.position[1] + self_size[1] / 2)
+            if self_rect.collidepoint(offset):
+                return self_mask.get_at(offset) > 0
+            return False
 
         elif mode == "surface":
             screen_size = expyriment._active_exp.screen.surface.get_size()
@@ -614,6 +820,8 @@ class Visual(Stimulus):
             raise RuntimeError(Visual._compression_exception_message.format(
                 "plot()"))
         stimulus.unload(keep_surface=True)
+        stimulus._make_surface_private()
+        stimulus._surface_version += 1
         self._parent = stimulus
         rect = pygame.Rect((0, 0), self.surface_size)
         stimulus_surface_size = stimulus.surface_size
@@ -649,6 +857,7 @@ class Visual(Stimulus):
         if self.is_preloaded:
             self.unload(keep_surface=False)
         self._is_compressed = False
+        self._release_compressed_surface()
         self._set_surface(None)
         if self._logging:
             expyriment._active_exp._event_file_log(
@@ -658,9 +867,12 @@ class Visual(Stimulus):
     def compress(self):
         """"Compress the stimulus.
 
-        This will create a temporary file on the disk where the surface of the
-        stimululs is written to.
-        The surface will now be read from the disk to free memory.
+        The surface of the stimulus will be stored by the compression backend
+        defined in stimuli.defaults.visual_compression_backend: "memory"
+        keeps a compressed copy in memory (and writes to a single spill file
+        on the disk above stimuli.defaults.visual_compression_max_memory),
+        "tempfile" writes the surface to a temporary file on the disk.
+        The surface will now be read from the compressed copy to free memory.
         Compressed stimuli cannot do surface operations!
         Preloading comressed stimuli is possible and highly recommended.
         Depending on the size of the stimulus, this method may take some time
@@ -675,11 +887,10 @@ class Visual(Stimulus):
 
         start = Clock._cpu_time()
         if self.is_compressed is False:
-            if self._compression_filename is None:
-                fid, self._compression_filename = tempfile.mkstemp(
-                    dir=defaults.tempdir, suffix=".tga")
-                os.close(fid)
-            pygame.image.save(self._get_surface(), self._compression_filename)
+            surface = self._get_surface()
+            self._release_compressed_surface()
+            self._compressed_surface = \
+                    get_compression_backend().compress(surface)
             self._is_compressed = True
             self._surface = None
 
@@ -688,6 +899,13 @@ class Visual(Stimulus):
                                 "Stimulus,compressed,{0}".format(self.id), 2)
         return int((Clock._cpu_time() - start) * 1000)
 
+    def _release_compressed_surface(self):
+        """Free the data of the compression backend."""
+
+        if self._compressed_surface is not None:
+            self._compressed_surface.release()
+            self._compressed_surface = None
+
     def decompress(self):
         """Decompress the stimulus.
 
@@ -705,8 +923,9 @@ class Visual(Stimulus):
 
         start = Clock._cpu_time()
         if self.is_compressed:
-            self._surface = pygame.image.load(
-                self._compression_filename).convert_alpha()
+            self._surface = self._compressed_surface.load()
+            self._surface_is_shared = False
+            self._release_compressed_surface()
             self._is_compressed = False
 
             if self._logging:
@@ -802,6 +1021,8 @@ initilized before preloading a stimulus."
 
         start = Clock._cpu_time()
         if expyriment._active_exp.screen.open_gl:
+            if self._ogl_screen is not None and self.is_preloaded:
+                self._ogl_screen.release()
             self._ogl_screen = None
             if self.is_preloaded and not self._was_compressed_before_preload \
                 and keep_surface:
@@ -815,7 +1036,9 @@ initilized before preloading a stimulus."
                                        .format(self.id), 2)
         if not keep_surface:
             self._is_compressed = False
+            self._release_compressed_surface()
             self._surface = None
+            self._surface_version += 1
             if self._logging:
                 expyriment._active_exp._event_file_log("Stimulus,surface cleared,{0}"\
                                        .format(self.id), 2)
@@ -829,13 +1052,20 @@ initilized before preloading a stimulus."
 
         return self._is_preloaded
 
-    def present(self, clear=True, update=True):
+    def present(self, clear=True, update=True, at_frame=None, at_time=None):
         """Present the stimulus on the screen.
 
         This clears and updates the screen automatically.
         When not preloaded, depending on the size of the stimulus, this method
         can take some time to compute!
 
+        The screen update can be locked to a certain frame (refresh) with
+        'at_frame' or 'at_time'. The stimulus is drawn immediately and the
+        screen is updated on the target frame (see Screen.update_at). The
+        realised onset is available as Screen.last_flip_time. Scheduling
+        requires update=True, OpenGL mode and a known refresh interval
+        (measured by control.initialize).
+
         Parameters
         ----------
         clear : bool, optional
@@ -844,6 +1074,12 @@ initilized before preloading a stimulus."
         update : bool, optional
             if False the screen will be not be updated automatically
             (default = True)
+        at_frame : int, optional
+            update the screen this number of refresh intervals after the
+            last screen update
+        at_time : int, optional
+            update the screen on the frame closest to this time on the
+            experiment clock (in ms)
 
         Returns
         -------
@@ -858,6 +1094,12 @@ initilized before preloading a stimulus."
 
         start = Clock._cpu_time()
         preloading_required = not(self.is_preloaded)
+        scheduled = at_frame is not None or at_time is not None
+        if scheduled and not update:
+            raise ValueError(
+                "at_frame and at_time require update=True!")
+        if scheduled:
+            expyriment._active_exp.screen._require_refresh_interval()
 
         if clear:
             expyriment._active_exp.screen.clear()
@@ -874,11 +1116,15 @@ initilized before preloading a stimulus."
             screen_size = screen.get_size()
             rect.center = [self.position[0] + screen_size[0] / 2,
                            - self.position[1] + screen_size[1] / 2]
-            screen.blit(self._get_surface(), rect)
+            rect = screen.blit(self._get_surface(), rect)
+            expyriment._active_exp.screen.mark_dirty(rect)
         if self._logging:
             expyriment._active_exp._event_file_log("Stimulus,presented,{0}"\
                                    .format(self.id), 1)
-        if update:
+        if scheduled:
+            expyriment._active_exp.screen.update_at(at_frame=at_frame,
+                                                    at_time=at_time)
+        elif update:
             expyriment._active_exp.screen.update()
         if preloading_required:
             self.unload(keep_surface=keep_surface)
@@ -1053,16 +1299,18 @@ initilized before preloading a stimulus."
             "Stimulus,flipped,{0}, booleans={1}".format(self.id, booleans), 2)
         return int((Clock._cpu_time() - start) * 1000)
 
-    def blur(self, level):
+    def blur(self, sigma, mode="gaussian"):
         """Blur the stimulus.
 
-        This blurs the stimulus, by scaling it down and up by the factor of
-        'level'.
+        This is a surface operation. After this, a surface will be present!
 
         Parameters
         ----------
-        level : int
-            level of bluring
+        sigma : float
+            standard deviation of the blur in pixels
+        mode : str, optional
+            "gaussian" (default) or "box" (box filter with the same
+            standard deviation)
 
         Returns
         -------
@@ -1071,30 +1319,58 @@ initilized before preloading a stimulus."
 
         Notes
         -----
+        The blur is a separable convolution with NumPy. Without NumPy, the
+        stimulus is blurred by scaling it down and up again by the factor
+        2 * sigma (lossy approximation).
         Depending on the size of the stimulus, this method may take some time
         to compute!
 
         """
 
         start = Clock._cpu_time()
-        self.scale((1.0 / level, 1.0 / level))
-        self.scale((level, level))
+        if not self._set_surface(self._get_surface()):
+            raise RuntimeError(Visual._compression_exception_message.format(
+                "blur()"))
+        self.unload(keep_surface=True)
+        if _pixelarray.has_numpy():
+            pixels = _pixelarray.surface_to_array(self._get_surface())
+            pixels = _pixelarray.blur(pixels, sigma, mode)
+            self._set_surface(_pixelarray.array_to_surface(pixels))
+        elif sigma > 0.5:
+            size = self.surface_size
+            factor = 2.0 * sigma
+            self._set_surface(pygame.transform.smoothscale(
+                pygame.transform.smoothscale(
+                    self._get_surface(),
+                    (max(1, int(round(size[0] / factor))),
+                     max(1, int(round(size[1] / factor))))),
+                size))
         if self._logging:
             expyriment._active_exp._event_file_log(
-                "Stimulus,blured,{0}, level={1}".format(self.id, level), 2)
+                "Stimulus,blured,{0}, sigma={1}, mode={2}".format(
+                    self.id, sigma, mode), 2)
         return int((Clock._cpu_time() - start) * 1000)
 
-
-    def scramble(self, grain_size):
+    def scramble(self, grain_size=None, seed=None, mode="block"):
         """Scramble the stimulus.
 
-        Attention: If the surface size is not a multiple of the grain size,
-        you may loose some pixels on the edge.
+        In "block" mode, the stimulus is divided into grains which are
+        randomly permuted. Grains at the right and bottom edge that are
+        smaller than grain_size (if the surface size is not a multiple of
+        the grain size) are permuted among each other. In "phase" mode, the
+        Fourier phase spectrum of the stimulus is randomised, while its
+        amplitude spectrum is kept. The alpha channel moves with the pixels
+        ("block") or is kept unchanged ("phase").
 
         Parameters
         ----------
         grain_size : int or (int, int)
-            size of a grain (use tuple of integers for different width & height)
+            size of a grain (use tuple of integers for different width &
+            height); not used in "phase" mode
+        seed : int or numpy.random.RandomState, optional
+            seed or random number generator for reproducible scrambles
+        mode : str, optional
+            "block" (default) or "phase"
 
         Returns
         -------
@@ -1103,45 +1379,80 @@ initilized before preloading a stimulus."
 
         Notes
         -----
+        The "phase" mode requires NumPy. Without NumPy, "block" mode falls
+        back to a (slow) grain by grain copy.
         Depending on the size of the stimulus, this method may take some time
         to compute!
 
         """
 
         start = Clock._cpu_time()
-        if type(grain_size) is int:
-            grain_size = [grain_size, grain_size]
-        # Make Rect list
+        if mode not in ("block", "phase"):
+            raise ValueError("Unknown scramble mode '{0}'!".format(mode))
+        if mode == "block":
+            if grain_size is None:
+                raise ValueError("grain_size has to be specified!")
+            if type(grain_size) is int:
+                grain_size = [grain_size, grain_size]
         if not self._set_surface(self._get_surface()):
             raise RuntimeError(Visual._compression_exception_message.format(
                 "scramble()"))
-        s = self.surface_size
-        source = []
-        for r in range(s[1] / int(grain_size[1])):
-            for c in range(s[0] / int(grain_size[0])):
-                xy = (c * int(grain_size[0]), r * int(grain_size[1]))
-                source.append(pygame.Rect(xy, grain_size))
-        # Make copy and shuffle
-        dest = copy.deepcopy(source)
-        random.shuffle(dest)
-        # Create a new surface
-        tmp_surface = pygame.surface.Surface(
-            s, pygame.SRCALPHA).convert_alpha()
-        for n, s in enumerate(source):
-            tmp_surface.blit(self._get_surface(), dest[n], s)
-        self._set_surface(tmp_surface)
+        self.unload(keep_surface=True)
+        if mode == "phase":
+            _pixelarray.require_numpy("scramble(mode='phase')")
+        if _pixelarray.has_numpy():
+            rng = _pixelarray.make_rng(seed)
+            pixels = _pixelarray.surface_to_array(self._get_surface())
+            if mode == "block":
+                pixels = _pixelarray.scramble_blocks(pixels, grain_size, rng)
+            else:
+                pixels = _pixelarray.scramble_phase(pixels, rng)
+            self._set_surface(_pixelarray.array_to_surface(pixels))
+        else:
+            self._set_surface(self._scramble_blits(grain_size,
+                                                   random.Random(seed)))
 
         if self._logging:
             expyriment._active_exp._event_file_log(
-                            "Stimulus,scrambled,{0}, grain_size={1}".format(
-                                     self.id, grain_size), 2)
+                "Stimulus,scrambled,{0}, grain_size={1}, mode={2}".format(
+                    self.id, grain_size, mode), 2)
         return int((Clock._cpu_time() - start) * 1000)
 
-    def add_noise(self, grain_size, percentage, colour):
+    def _scramble_blits(self, grain_size, rng):
+        """Return a block scrambled surface (without NumPy)."""
+
+        size = self.surface_size
+        gw, gh = int(grain_size[0]), int(grain_size[1])
+        fw, fh = (size[0] / gw) * gw, (size[1] / gh) * gh
+        # Full grains and the smaller edge grains are permuted separately
+        groups = [[], [], []]
+        for y in range(0, size[1], gh):
+            for x in range(0, size[0], gw):
+                rect = pygame.Rect((x, y), (min(gw, size[0] - x),
+                                            min(gh, size[1] - y)))
+                if x < fw and y < fh:
+                    groups[0].append(rect)
+                elif y < fh:
+                    groups[1].append(rect)
+                elif x < fw:
+                    groups[2].append(rect)
+                else:
+                    groups.append([rect])
+        surface = self._get_surface()
+        tmp_surface = pygame.surface.Surface(
+            size, pygame.SRCALPHA).convert_alpha()
+        tmp_surface.fill((0, 0, 0, 0))
+        for source in groups:
+            dest = list(source)
+            rng.shuffle(dest)
+            for n, rect in enumerate(source):
+                tmp_surface.blit(surface, dest[n], rect,
+                                 special_flags=pygame.BLEND_RGBA_ADD)
+        return tmp_surface
+
+    def add_noise(self, grain_size, percentage, colour, seed=None):
         """Add visual noise on top of the stimulus.
 
-        This function might take very long for large stimuli.
-
         Parameters
         ----------
         grain_size : int
@@ -1149,7 +1460,10 @@ initilized before preloading a stimulus."
         percentage : int
             percentage of covered area
         colour : (int, int, int)
-            colour (RGB) of the noise
+            colour (RGB) of the noise; if None, each grain gets a random
+            colour
+        seed : int or numpy.random.RandomState, optional
+            seed or random number generator for reproducible noise
 
         Returns
         -------
@@ -1158,31 +1472,103 @@ initilized before preloading a stimulus."
 
         Notes
         -----
-        Depending on the size of the stimulus, this method may take some time
-        to compute!
+        With NumPy, the noise is computed as one array operation. Without
+        NumPy, the grains are filled one by one, which might take long for
+        large stimuli.
 
         """
-        import _rectangle
+
         start = Clock._cpu_time()
         if not self._set_surface(self._get_surface()):
             raise RuntimeError(Visual._compression_exception_message.format(
                 "add_noise()"))
         self.unload(keep_surface=True)
-        number_of_pixel_x = int(self.surface_size[0] / grain_size) + 1
-        number_of_pixel_y = int(self.surface_size[1] / grain_size) + 1
-        seq = range(number_of_pixel_x * number_of_pixel_y)
-        random.seed()
-        random.shuffle(seq)
-
-        for idx in seq[:int(len(seq) * (percentage) / 100.0)]:
-            x = (idx % number_of_pixel_x) * grain_size
-            x = int(self.surface_size[0] / 2 - grain_size / 2 - x)
-            y = (idx / number_of_pixel_x) * grain_size
-            y = int(self.surface_size[1] / 2 - grain_size / 2 - y)
-            dot = _rectangle.Rectangle((grain_size, grain_size), (x, y), colour)
-            dot.plot(self)
+        if _pixelarray.has_numpy():
+            pixels = _pixelarray.surface_to_array(self._get_surface())
+            pixels = _pixelarray.add_noise(pixels, grain_size, percentage,
+                                           colour, _pixelarray.make_rng(seed))
+            self._set_surface(_pixelarray.array_to_surface(pixels))
+        else:
+            rng = random.Random(seed)
+            self._make_surface_private()
+            surface = self._get_surface()
+            number_of_pixel_x = int(self.surface_size[0] / grain_size) + 1
+            number_of_pixel_y = int(self.surface_size[1] / grain_size) + 1
+            seq = range(number_of_pixel_x * number_of_pixel_y)
+            rng.shuffle(seq)
+            for idx in seq[:int(len(seq) * (percentage) / 100.0)]:
+                x = (idx % number_of_pixel_x) * grain_size
+                y = (idx / number_of_pixel_x) * grain_size
+                if colour is None:
+                    grain_colour = [rng.randint(0, 255) for _x in range(3)]
+                else:
+                    grain_colour = colour
+                surface.fill(grain_colour, ((x, y), (grain_size, grain_size)))
         if self._logging:
             expyriment._active_exp._event_file_log(
                     "Stimulus,noise added,{0}, grain_size={1}, percentage={2}"\
                         .format(self.id, grain_size, percentage))
         return int((Clock._cpu_time() - start) * 1000)
+
+
+def _make_collision_data(surface):
+    """Return mask, bounding rectangle and pixel count of a surface."""
+
+    mask = pygame.mask.from_surface(surface)
+    rects = mask.get_bounding_rects()
+    if len(rects) > 0:
+        bounding_rect = rects[0].unionall(rects[1:])
+    else:
+        bounding_rect = pygame.Rect(0, 0, 0, 0)
+    return mask, bounding_rect, mask.count()
+
+
+def blur_many(stimuli, sigma, mode="gaussian"):
+    """Blur several visual stimuli of the same size.
+
+    The surfaces of all stimuli are blurred together as one stacked array.
+    See Visual.blur().
+
+    Parameters
+    ----------
+    stimuli : list
+        list of visual stimuli (all surfaces have to be of the same size)
+    sigma : float
+        standard deviation of the blur in pixels
+    mode : str, optional
+        "gaussian" (default) or "box"
+
+    Returns
+    -------
+    time : int
+        the time it took to execute this function
+
+    Notes
+    -----
+    This function requires NumPy.
+
+    """
+
+    _pixelarray.require_numpy("blur_many()")
+    start = Clock._cpu_time()
+    surfaces = []
+    for stim in stimuli:
+        if not stim._set_surface(stim._get_surface()):
+            raise RuntimeError(Visual._compression_exception_message.format(
+                "blur_many()"))
+        stim.unload(keep_surface=True)
+        surfaces.append(stim._get_surface())
+    if len(surfaces) == 0:
+        return 0
+    if len(set([s.get_size() for s in surfaces])) > 1:
+        raise ValueError("All stimuli must have the same surface size!")
+    stack = _pixelarray._np.array(
+        [_pixelarray.surface_to_array(s) for s in surfaces])
+    stack = _pixelarray.blur(stack, sigma, mode, axes=(1, 2))
+    for stim, pixels in zip(stimuli, stack):
+        stim._set_surface(_pixelarray.array_to_surface(pixels))
+        if stim._logging:
+            expyriment._active_exp._event_file_log(
+                "Stimulus,blured,{0}, sigma={1}, mode={2}".format(
+                    stim.id, sigma, mode), 2)
+    return int((Clock._cpu_time() - start) * 1000)
@@ -18,6 +18,16 @@ import tempfile as _tempfile
 
 # Visual
 visual_position = (0, 0)
+visual_texture_atlas = False # pack small preloaded stimuli into shared textures
+visual_texture_atlas_size = 2048
+visual_texture_atlas_max_region_size = 256 # larger stimuli get own textures
+visual_surface_cache_max_bytes = 32 * 1024 * 1024 # 0 switches caching off
+visual_compression_backend = "memory" # "memory" or "tempfile"
+visual_compression_max_memory = 256 * 1024 * 1024 # above: use spill file
+
+# FontPool
+fontpool_max_fonts = 32 # 0 switches pooling off
+fontpool_max_words = 1024 # cached word renders per font
 
 # Canvas
 canvas_colour = None # 'None' is transparent
@@ -180,9 +180,14 @@ class DotCloud(Visual):
                 return True
         return False
 
-    def make(self, n_dots, dot_radius, gap=0):
+    def make(self, n_dots, dot_radius, gap=0, seed=None):
         """Make the cloud by randomly putting dots on it.
 
+        Dots are placed one after another at random positions that do not
+        overlap with the dots placed so far. Candidate positions are checked
+        only against the dots in the neighbouring cells of a grid; Dot
+        stimuli are created for accepted positions only.
+
         Parameters
         ----------
         n_dots : int
@@ -191,40 +196,65 @@ class DotCloud(Visual):
             radius of the dots
         gap : int, optional
             gap between dots (default = 0)
+        seed : int, optional
+            seed of the random number generator for reproducible clouds
+
+        Returns
+        -------
+        success : bool
+            False if no solution was found
 
         """
 
+        rng = random.Random(seed)
         top_left = dot_radius - self._radius
         bottom_right = self._radius - dot_radius
-        remix = 0
-
-        while(True): #remix-loop
-            self._cloud = []
-            remix = remix + 1
+        max_distance2 = (self._radius - dot_radius) ** 2
+        min_distance = 2 * dot_radius + gap
+        min_distance2 = min_distance ** 2
+        cell_size = max(min_distance, 1)
+
+        for _remix in range(11):
+            positions = []
+            grid = {}
             reps = 0
-            while(True): #find a solution
-                dot = Dot(radius=dot_radius)
-                expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
-                dot.position = (random.randint(top_left, bottom_right),
-                                random.randint(top_left, bottom_right))
+            while len(positions) < n_dots and reps <= 10000:
+                x = rng.randint(top_left, bottom_right)
+                y = rng.randint(top_left, bottom_right)
                 reps = reps + 1
+                if x * x + y * y > max_distance2:
+                    continue
+                cx, cy = int(x // cell_size), int(y // cell_size)
+                overlapping = False
+                for nx in (cx - 1, cx, cx + 1):
+                    for ny in (cy - 1, cy, cy + 1):
+                        for px, py in grid.get((nx, ny), ()):
+                            if (px - x) ** 2 + (py - y) ** 2 <= min_distance2:
+                                overlapping = True
+                                break
+                        if overlapping:
+                            break
+                    if overlapping:
+                        break
+                if not overlapping:
+                    positions.append((x, y))
+                    grid.setdefault((cx, cy), []).append((x, y))
+                    reps = 0
+
+            if len(positions) >= n_dots:
+                self._cloud = []
+                for position in positions:
+                    self._cloud.append(Dot(radius=dot_radius,
+                                           position=position))
+                    expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
+                self.clear_surface()
+                return True
 
-                if dot.is_inside(self.area):
-                    if not self._is_overlapping_with_point(dot, gap):
-                        self._cloud.append(dot)
-                        reps = 0
-                if reps > 10000:
-                    break
-                if len(self._cloud) >= n_dots:
-                    self.clear_surface()
-                    return True
-
-            if remix > 10:
-                message = "Dotcloud make: Cannot find a solution."
-                print("Warning: ", message)
-                if self._logging:
-                    expyriment._active_exp._event_file_log(message)
-                return False
+        message = "Dotcloud make: Cannot find a solution."
+        print("Warning: ", message)
+        if self._logging:
+            expyriment._active_exp._event_file_log(message)
+        return False
 
     def shuffel_dot_sequence(self, from_idx=0, to_idx= -1):
         """Shuffle the dots sequence.
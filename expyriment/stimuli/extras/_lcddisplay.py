@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+"""
+A LCD display.
+
+This module contains a class implementing a display of several LCD symbols.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import pygame
+
+import defaults
+import expyriment
+from expyriment.stimuli._visual import Visual
+from expyriment.stimuli.extras._lcdsymbol import LcdSymbol
+
+
+class LcdDisplay(Visual):
+    """A class implementing a display of several LCD symbols (digits).
+
+    The display shows a text of LCD symbols, for instance the time of a
+    countdown or a digital clock. Besides the shapes of LcdSymbol, spaces
+    and '-' can be shown. Changing the text redraws only the digits whose
+    character changed.
+
+    """
+
+    _extra_shapes = {" ": (), "-": (3,)}
+
+    def __init__(self, text, n_digits=None, position=None, digit_size=None,
+                 spacing=None, colour=None, inactive_colour=None,
+                 background_colour=None, line_width=None, gap=None,
+                 simple_lines=None):
+        """Create a LCD display.
+
+        Parameters
+        ----------
+        text : str or int
+            text to show
+        n_digits : int, optional
+            number of digits (default = length of text); shorter texts are
+            aligned right
+        position : (int, int), optional
+            position of the display
+        digit_size : (int, int), optional
+            size of a single digit
+        spacing : int, optional
+            space between the digits
+        colour : (int, int, int), optional
+            colour of active lines
+        inactive_colour : (int, int, int), optional
+            colour of inactive lines
+        background_colour : (int, int, int), optional
+        line_width : int, optional
+            width of the lines
+        gap : int, optional
+            gap between lines
+        simple_lines : bool, optional
+            use simple lines
+
+        """
+
+        if position is None:
+            position = defaults.lcddisplay_position
+        Visual.__init__(self, position)
+        text = str(text)
+        if n_digits is None:
+            n_digits = defaults.lcddisplay_n_digits
+        if n_digits is None:
+            n_digits = len(text)
+        self._n_digits = n_digits
+        if digit_size is None:
+            digit_size = defaults.lcddisplay_digit_size
+        self._digit_size = tuple(digit_size)
+        if spacing is None:
+            spacing = defaults.lcddisplay_spacing
+        self._spacing = spacing
+        if colour is None:
+            colour = defaults.lcddisplay_colour
+        if colour is None:
+            colour = expyriment._active_exp.foreground_colour
+        if inactive_colour is None:
+            inactive_colour = defaults.lcddisplay_inactive_colour
+        if background_colour is None:
+            background_colour = defaults.lcddisplay_background_colour
+        self._background_colour = background_colour
+        if line_width is None:
+            line_width = defaults.lcddisplay_line_width
+        if gap is None:
+            gap = defaults.lcddisplay_gap
+        if simple_lines is None:
+            simple_lines = defaults.lcddisplay_simple_lines
+
+        # A single symbol draws all digits
+        self._symbol = LcdSymbol("8", size=self._digit_size, colour=colour,
+                                 inactive_colour=inactive_colour,
+                                 background_colour=background_colour,
+                                 line_width=line_width, gap=gap,
+                                 simple_lines=simple_lines)
+        expyriment.stimuli._stimulus.Stimulus._id_counter -= 1
+        self._text = self._pad(text)
+
+    def _pad(self, text):
+        """Check a text and align it right."""
+
+        if len(text) > self._n_digits:
+            raise ValueError(
+                "Text '{0}' has more than {1} digits!".format(text,
+                                                              self._n_digits))
+        for char in text:
+            if char not in LcdSymbol._shapes and \
+                    char not in LcdDisplay._extra_shapes:
+                raise ValueError(
+                    "Cannot show '{0}' on a LCD display!".format(char))
+        return text.rjust(self._n_digits)
+
+    @property
+    def text(self):
+        """Getter for text."""
+
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        """Setter for text.
+
+        If the surface exists, only the digits that changed are redrawn.
+
+        """
+
+        value = self._pad(str(value))
+        changed = [idx for idx in range(self._n_digits)
+                   if value[idx] != self._text[idx]]
+        self._text = value
+        if len(changed) == 0 or not self.has_surface:
+            return
+        if not self._set_surface(self._get_surface()):
+            raise RuntimeError(Visual._compression_exception_message.format(
+                "text"))
+        was_preloaded = self.is_preloaded
+        self.unload(keep_surface=True)
+        self._make_surface_private()
+        self._surface_version += 1
+        surface = self._get_surface()
+        for idx in changed:
+            self._draw_digit(surface, idx)
+        if was_preloaded:
+            self.preload()
+
+    @property
+    def n_digits(self):
+        """Getter for n_digits."""
+
+        return self._n_digits
+
+    @property
+    def digit_size(self):
+        """Getter for digit_size."""
+
+        return self._digit_size
+
+    @property
+    def spacing(self):
+        """Getter for spacing."""
+
+        return self._spacing
+
+    @property
+    def colour(self):
+        """Getter for colour."""
+
+        return self._symbol.colour
+
+    @property
+    def inactive_colour(self):
+        """Getter for inactive_colour."""
+
+        return self._symbol.inactive_colour
+
+    @property
+    def background_colour(self):
+        """Getter for background_colour."""
+
+        return self._background_colour
+
+    @property
+    def size(self):
+        """Getter for size."""
+
+        return (self._n_digits * self._digit_size[0] +
+                (self._n_digits - 1) * self._spacing,
+                self._digit_size[1])
+
+    def _get_shape(self, char):
+        if char in LcdDisplay._extra_shapes:
+            return LcdDisplay._extra_shapes[char]
+        return LcdSymbol._shapes[char]
+
+    def _digit_rect(self, idx):
+        """Return the rectangle of a digit on the surface."""
+
+        return pygame.Rect((idx * (self._digit_size[0] + self._spacing), 0),
+                           self._digit_size)
+
+    def _draw_digit(self, surface, idx):
+        """Clear the area of a digit on the surface and draw it again."""
+
+        rect = self._digit_rect(idx)
+        surface.fill((0, 0, 0, 0), rect)
+        self._symbol._draw_shape(surface, self._get_shape(self._text[idx]),
+                                 rect.topleft)
+
+    def _create_surface(self):
+        """Create the surface of the stimulus."""
+
+        surface = pygame.surface.Surface(self.size,
+                                         pygame.SRCALPHA).convert_alpha()
+        if self._background_colour is not None:
+            surface.fill(self._background_colour)
+        else:
+            surface.fill((0, 0, 0, 0))
+        for idx in range(self._n_digits):
+            self._draw_digit(surface, idx)
+        return surface
+
+
+if __name__ == "__main__":
+    from expyriment import control
+    control.set_develop_mode(True)
+    defaults.event_logging = 0
+    exp = control.initialize()
+    lcddisplay = LcdDisplay("10", inactive_colour=(40, 40, 40))
+    lcddisplay.preload()
+    for second in range(10, -1, -1):
+        lcddisplay.text = second
+        lcddisplay.present()
+        exp.clock.wait(1000)
@@ -0,0 +1,11 @@
+# LcdDisplay
+lcddisplay_n_digits = None # 'None' is length of text
+lcddisplay_position = (0, 0)
+lcddisplay_digit_size = (50, 100)
+lcddisplay_spacing = 10
+lcddisplay_colour = None # 'None' is experiment_text_colour
+lcddisplay_background_colour = None # 'None' is transparent
+lcddisplay_inactive_colour = None # 'None' is transparent
+lcddisplay_line_width = 5
+lcddisplay_gap = 3
+lcddisplay_simple_lines = False
@@ -25,6 +25,34 @@ from expyriment.stimuli._visual import Visual
 from expyriment.stimuli.extras._polygondot import PolygonDot
 
 
+_segment_cache = {}
+_segment_cache_screen = None
+_max_segment_sets = 64
+
+
+def _colour_key(colour):
+    if colour is None:
+        return None
+    return tuple(colour)
+
+
+def _get_segment_cache():
+    """Return the cache of segment surfaces of the current screen.
+
+    Segment surfaces are converted to the pixel format of the display. The
+    cache is emptied if the screen changes or if it gets too large.
+
+    """
+
+    global _segment_cache, _segment_cache_screen
+    screen = expyriment._active_exp.screen
+    if _segment_cache_screen is not screen or \
+            len(_segment_cache) >= _max_segment_sets:
+        _segment_cache = {}
+        _segment_cache_screen = screen
+    return _segment_cache
+
+
 class LcdSymbol(Visual):
     """A LCD symbol class.
 
@@ -41,6 +69,9 @@ class LcdSymbol(Visual):
         '0','1','2','3','4','5','6','7','8','9'
         'A','C','E','F','U','H','L','P','h'
 
+    The surfaces of the lines are drawn once per geometry and colour and
+    symbols are composed of these cached surfaces.
+
     """
 
     _shapes = {"0":(0, 1, 2, 4, 5, 6),
@@ -304,27 +335,119 @@ class LcdSymbol(Visual):
 
         return self._points
 
+    def _segment_key(self):
+        """Return all parameters that affect the geometry of the segments."""
+
+        return (tuple([tuple(p.position) for p in self._points]),
+                self._line_width, self._gap, self._simple_lines)
+
+    def _surface_cache_key(self):
+        """Return all parameters that affect the rendering of the surface."""
+
+        return (self._width, self._height, self._segment_key(),
+                tuple(self._shape), self._colour, self._inactive_colour,
+                self._background_colour)
+
+    def _get_segments(self, colour):
+        """Return the surfaces of all seven lines in a colour.
+
+        The segment surfaces are cached per geometry and colour.
+
+        Returns
+        -------
+        segments : tuple of (pygame.Surface, (int, int))
+            surface and position on the symbol of each line
+
+        """
+
+        cache = _get_segment_cache()
+        key = ("segments", self._segment_key(), tuple(colour))
+        segments = cache.get(key)
+        if segments is None:
+            segments = []
+            for idx in range(len(self._lines)):
+                poly = [(p[0], p[1]) for p in self.get_line_polygon(idx)]
+                left = int(math.floor(min([p[0] for p in poly])))
+                top = int(math.floor(min([p[1] for p in poly])))
+                right = int(math.floor(max([p[0] for p in poly])))
+                bottom = int(math.floor(max([p[1] for p in poly])))
+                surface = pygame.surface.Surface(
+                    (right - left + 2, bottom - top + 2),
+                    pygame.SRCALPHA).convert_alpha()
+                surface.fill((0, 0, 0, 0))
+                pygame.draw.polygon(surface, colour,
+                                    [(p[0] - left, p[1] - top) for p in poly],
+                                    0)
+                segments.append((surface, (left, top)))
+            segments = tuple(segments)
+            cache[key] = segments
+        return segments
+
+    def _get_base(self):
+        """Return the background with all inactive lines (cached).
+
+        Returns
+        -------
+        base : pygame.Surface
+            the base surface or None if the symbol has neither a background
+            nor an inactive colour
+
+        """
+
+        if self._background_colour is None and self._inactive_colour is None:
+            return None
+        cache = _get_segment_cache()
+        key = ("base", (self._width, self._height), self._segment_key(),
+               _colour_key(self._background_colour),
+               _colour_key(self._inactive_colour))
+        base = cache.get(key)
+        if base is None:
+            base = pygame.surface.Surface((self._width, self._height),
+                                          pygame.SRCALPHA).convert_alpha()
+            base.fill((0, 0, 0, 0))
+            if self._background_colour is not None:
+                base.fill(self._background_colour)
+            if self._inactive_colour is not None:
+                for segment, position in self._get_segments(
+                        self._inactive_colour):
+                    base.blit(segment, position)
+            cache[key] = base
+        return base
+
+    def _draw_shape(self, surface, shape, offset=(0, 0)):
+        """Draw a shape of the symbol onto a surface.
+
+        The shape is composed of the cached segment surfaces. The area of the
+        symbol on the surface has to be transparent.
+
+        Parameters
+        ----------
+        surface : pygame.Surface
+            surface to draw on
+        shape : list
+            lines to show
+        offset : (int, int), optional
+            position of the top left corner of the symbol on the surface
+
+        """
+
+        base = self._get_base()
+        if base is not None:
+            surface.blit(base, offset)
+        if len(shape) > 0:
+            segments = self._get_segments(self._colour)
+            for idx in shape:
+                segment, position = segments[idx]
+                surface.blit(segment, (offset[0] + position[0],
+                                       offset[1] + position[1]))
+
     def _create_surface(self):
         """Create the surface of the stimulus."""
 
         surface = pygame.surface.Surface((self._width, self._height),
                                         pygame.SRCALPHA).convert_alpha()
-        if self.background_colour is not None:
-            surface.fill(self.background_colour)
-        if self.inactive_colour is not None:
-            #draw background
-            for x in self._shapes["8"]:
-                moved_poly = []
-                for p in self.get_line_polygon(x):
-                    moved_poly.append((p[0], p[1]))
-                pygame.draw.polygon(surface, self.inactive_colour,
-                                    moved_poly, 0)
-        if len(self._shape) > 0:
-            for x in self._shape:
-                moved_poly = []
-                for p in self.get_line_polygon(x):
-                    moved_poly.append((p[0], p[1]))
-                pygame.draw.polygon(surface, self.colour, moved_poly, 0)
+        surface.fill((0, 0, 0, 0))
+        self._draw_shape(surface, self._shape)
         return surface
 
     def get_line_points(self, idx):
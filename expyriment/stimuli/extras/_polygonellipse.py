@@ -75,7 +75,7 @@ class PolygonEllipse(Shape):
             points.append([.5 * _math.cos(l) * w + .5 * w,
                            .5 * _math.sin(l) * h + .5 * h])
             l = l + s
-        self._vertices = _geometry.points_to_vertices(points)
+        self._set_vertices(_geometry.points_to_vertices(points))
         self._update_points()
 
 
@@ -13,12 +13,16 @@ __revision__ = ''
 __date__ = ''
 
 
+import math
 import random
+import multiprocessing
+import multiprocessing.pool
 
 import pygame
 
 import defaults
 import expyriment
+from expyriment.misc import Clock
 from expyriment.stimuli._visual import Visual
 
 
@@ -61,6 +65,7 @@ class StimulusCloud(Visual):
             self._background_colour = \
                     defaults.stimuluscloud_background_colour
         self._rect = None
+        self._layout_statistics = None
 
     _getter_exception_message = "Cannot set {0} if surface exists!"
 
@@ -108,15 +113,36 @@ class StimulusCloud(Visual):
             surface.blit(stim._get_surface(), stim.rect)
         return surface
 
-    def make(self, stimuli, min_distance=None):
+    @property
+    def layout_statistics(self):
+        """Getter for the statistics of the last call of make().
+
+        Dictionary with the number of tested candidate positions
+        ('attempts'), pixel mask comparisons ('mask_checks') and restarts
+        ('remixes') as well as the time it took to find the layout in ms
+        ('time').
+
+        """
+
+        return self._layout_statistics
+
+    def make(self, stimuli, min_distance=None, seed=None):
         """Make the cloud by randomly putting stimuli on it.
 
+        Candidate positions are drawn uniformly from all positions that are
+        not yet known to be invalid, i.e. that are closer than min_distance to
+        a placed stimulus or, without min_distance, where a stimulus without
+        transparent pixels would overlap another one. Thus, the distribution
+        of the positions does not differ from drawing them from the whole
+        cloud. Pixel masks are only compared for stimuli with intersecting
+        bounding rectangles.
+
         Notes
         -----
         If min_distance is None, the stimuli will automatically spaced to not
-        overlap. This will result in a long computation!
+        overlap.
         Set the distance manually to space them wit a minimal distance between
-        centers. This will result in a way shorter computation!
+        centers. This will result in a shorter computation!
 
         This will build surfaces for all stimuli in the cloud!
 
@@ -126,52 +152,125 @@ class StimulusCloud(Visual):
             list of stimuli to put in the cloud
         min_distance : int, optional
             minimal allowed distance between stimuli
+        seed : int, optional
+            seed of the random number generator for reproducible clouds
+
+        Returns
+        -------
+        success : bool
+            False if no solution was found
 
         """
 
-        surface = pygame.surface.Surface(self.size,
-                                         pygame.SRCALPHA).convert_alpha()
-        surface.fill((0, 0, 0))
-        self._set_surface(surface)
-        remix = 0
-        while(True): #remix-loop
-            self._cloud = []
-            remix = remix + 1
-            for stimulus in stimuli:
-                reps = 0
-                stimulus._set_surface(stimulus._get_surface())
-                while(True): #find a solution
-                    stimulus.position = (random.randint(-self.size[0] / 2,
-                                                        self.size[0] / 2),
-                                         random.randint(-self.size[1] / 2,
-                                                        self.size[1] / 2))
-                    reps = reps + 1
-                    if stimulus.inside_stimulus(self):
-                        okay = True
-                        if min_distance is None:
-                            for s in self._cloud:
-                                if stimulus.overlapping_with_stimulus(s)[0]:
-                                    okay = False
-                                    break
-                        else:
-                            for s in self._cloud:
-                                if stimulus.distance(s) < min_distance:
-                                    okay = False
-                                    break
-                        if okay:
-                            self._cloud.append(stimulus)
-                            reps = 0
-                            if len(self._cloud) == len(stimuli):
-                                self.clear_surface()
-                                return True
-                            break
-                    if reps > 10000:
-                        break
+        start = Clock._cpu_time()
+        items = self._layout_items(stimuli, min_distance)
+        positions, statistics = _layout(self.size, items, min_distance,
+                                        seed)
+        statistics["time"] = int((Clock._cpu_time() - start) * 1000)
+        return self._apply_layout(stimuli, positions, statistics)
 
-            if (remix > 10):
-                message = "Stimuluscloud make: Cannot find a solution."
-                print("Warning: ", message)
-                return False
+    @staticmethod
+    def make_many(clouds, stimuli, min_distance=None, seeds=None,
+                  workers=None, use_processes=False):
+        """Make several clouds in parallel.
+
+        See make().
+
+        Notes
+        -----
+        By default, the clouds are made in a pool of worker threads. Worker
+        processes (use_processes=True) can use several CPUs, but on Windows
+        they can only be started if the main module of the experiment is
+        protected by ``if __name__ == "__main__":``.
+
+        Parameters
+        ----------
+        clouds : list
+            list of stimulus clouds
+        stimuli : list
+            list with a list of stimuli for each cloud
+        min_distance : int, optional
+            minimal allowed distance between stimuli
+        seeds : list, optional
+            list with a seed for each cloud
+        workers : int, optional
+            number of worker threads or processes (default = number of CPUs)
+        use_processes : bool, optional
+            make the clouds in worker processes instead of threads
+            (default = False)
+
+        Returns
+        -------
+        success : list
+            list of bool, False if no solution was found for a cloud
+
+        """
+
+        start = Clock._cpu_time()
+        if seeds is None:
+            seeds = [None] * len(clouds)
+        tasks = []
+        for cloud, stims, seed in zip(clouds, stimuli, seeds):
+            items = cloud._layout_items(stims, min_distance)
+            if use_processes and min_distance is None:
+                # Masks cannot be pickled, send the pixels instead
+                items = [(size, rect, pygame.image.tostring(
+                    stim._get_surface(), "RGBA"), solid)
+                         for (size, rect, mask, solid), stim in zip(items,
+                                                                    stims)]
+            tasks.append((cloud.size, items, min_distance, seed))
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = max(1, min(workers, len(tasks)))
+        if use_processes:
+            pool = multiprocessing.Pool(workers)
+            worker = _layout_worker
+        else:
+            pool = multiprocessing.pool.ThreadPool(workers)
+            worker = _layout_task
+        try:
+            results = pool.map(worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+        elapsed = int((Clock._cpu_time() - start) * 1000)
+        success = []
+        for cloud, stims, (positions, statistics) in zip(clouds, stimuli,
+                                                          results):
+            statistics["time"] = elapsed
+            success.append(cloud._apply_layout(stims, positions, statistics))
+        return success
+
+    def _layout_items(self, stimuli, min_distance):
+        """Return (surface size, visible rect, mask, solid) of all stimuli.
+
+        A stimulus is solid if all pixels in its visible rect are visible.
+
+        """
+
+        items = []
+        for stimulus in stimuli:
+            stimulus._set_surface(stimulus._get_surface())
+            mask, rect, count = stimulus._get_collision_data()
+            solid = count > 0 and count == rect.width * rect.height
+            if min_distance is not None:
+                mask = None
+            items.append((stimulus.surface_size, tuple(rect), mask, solid))
+        return items
+
+    def _apply_layout(self, stimuli, positions, statistics):
+        """Set the positions found by _layout."""
+
+        self._layout_statistics = statistics
+        if positions is None:
+            message = "Stimuluscloud make: Cannot find a solution."
+            print("Warning: ", message)
+            return False
+        for stimulus, position in zip(stimuli, positions):
+            stimulus.position = position
+        self._cloud = list(stimuli)
+        self.clear_surface()
+        return True
 
     def shuffel_surface_sequence(self, from_idx=0, to_idx= -1):
         """Shuffle the surfaces sequence.
@@ -194,6 +293,199 @@ class StimulusCloud(Visual):
             self._cloud[r], self._cloud[x] = self._cloud[x], self._cloud[r]
 
 
+def _free_cells(ranges, cell_size, blocked_intervals):
+    """Return the cells of the candidate range that are not blocked.
+
+    Parameters
+    ----------
+    ranges : (int, int, int, int)
+        range of candidate positions (x0, x1, y0, y1), inclusive
+    cell_size : int
+    blocked_intervals : list
+        list of open intervals (x_lo, x_hi, y_lo, y_hi) of positions that
+        are certainly invalid
+
+    Returns
+    -------
+    free : list
+        indices of the cells that are not completely blocked
+    n_cells_x : int
+
+    """
+
+    x0, x1, y0, y1 = ranges
+    nx = (x1 - x0) // cell_size + 1
+    ny = (y1 - y0) // cell_size + 1
+    blocked = bytearray(nx * ny)
+    for x_lo, x_hi, y_lo, y_hi in blocked_intervals:
+        # cells that lie completely inside the open intervals
+        i_min = max(0, int(math.floor(float(x_lo - x0) / cell_size)) + 1)
+        i_max = min(nx - 1, int(math.ceil(
+            float(x_hi - x0 - cell_size + 1) / cell_size)) - 1)
+        j_min = max(0, int(math.floor(float(y_lo - y0) / cell_size)) + 1)
+        j_max = min(ny - 1, int(math.ceil(
+            float(y_hi - y0 - cell_size + 1) / cell_size)) - 1)
+        if i_min > i_max:
+            continue
+        row = bytearray([1]) * (i_max - i_min + 1)
+        for j in range(j_min, j_max + 1):
+            blocked[j * nx + i_min:j * nx + i_max + 1] = row
+    return [k for k in xrange(nx * ny) if not blocked[k]], nx
+
+
+def _layout(cloud_size, items, min_distance, seed):
+    """Find positions for items, so that they do not overlap.
+
+    Positions are searched as top left corners of the item surfaces in
+    cloud surface coordinates and converted to stimulus positions.
+
+    Parameters
+    ----------
+    cloud_size : (int, int)
+    items : list
+        list of (surface size, visible rect, mask, solid) of the items; mask
+        can be None if min_distance is given
+    min_distance : int
+        minimal distance between item centres or None to compare masks
+    seed : int
+
+    Returns
+    -------
+    positions : list
+        stimulus positions or None if no solution was found
+    statistics : dict
+
+    """
+
+    rng = random.Random(seed)
+    width, height = cloud_size
+    statistics = {"attempts": 0, "mask_checks": 0, "remixes": 0}
+    rects = [pygame.Rect(rect) for size, rect, mask, solid in items]
+    if min_distance is None:
+        index_cell = max([1] + [max(r.width, r.height) for r in rects])
+        half_square = 0
+    else:
+        index_cell = max(1, int(math.ceil(min_distance)))
+        # points inside this square are closer than min_distance
+        half_square = (min_distance - 1) / math.sqrt(2)
+    min_distance2 = None
+    if min_distance is not None:
+        min_distance2 = min_distance ** 2
+
+    for remix in range(11):
+        statistics["remixes"] = remix
+        placed = []  # [top left, visible rect, mask, centre, solid]
+        index = {}
+        for (size, rect, mask, solid), vis in zip(items, rects):
+            ranges = (-vis.left, width - vis.right,
+                      -vis.top, height - vis.bottom)
+            if ranges[1] < ranges[0] or ranges[3] < ranges[2]:
+                return None, statistics  # does not fit at all
+            cell_size = max(1, int(math.ceil(math.sqrt(
+                float((ranges[1] - ranges[0] + 1) *
+                      (ranges[3] - ranges[2] + 1)) / 4096))))
+            offset = (size[0] // 2, size[1] // 2)
+            blocked = []
+            for p_topleft, p_rect, p_mask, p_centre, p_solid in placed:
+                if min_distance is None:
+                    # intersecting rects overlap only if both are solid
+                    if solid and p_solid:
+                        blocked.append((p_rect.left - vis.right,
+                                        p_rect.right - vis.left,
+                                        p_rect.top - vis.bottom,
+                                        p_rect.bottom - vis.top))
+                else:
+                    blocked.append((p_centre[0] - offset[0] - half_square,
+                                    p_centre[0] - offset[0] + half_square,
+                                    p_centre[1] - offset[1] - half_square,
+                                    p_centre[1] - offset[1] + half_square))
+            free, nx = _free_cells(ranges, cell_size, blocked)
+
+            found = None
+            for _reps in xrange(10001):
+                statistics["attempts"] += 1
+                if len(free) > 0:
+                    # all cells have the same size, positions outside of the
+                    # range are rejected to keep the distribution uniform
+                    k = rng.choice(free)
+                    x = ranges[0] + (k % nx) * cell_size
+                    y = ranges[2] + (k // nx) * cell_size
+                    x = rng.randint(x, x + cell_size - 1)
+                    y = rng.randint(y, y + cell_size - 1)
+                    if x > ranges[1] or y > ranges[3]:
+                        continue
+                else:
+                    x = rng.randint(ranges[0], ranges[1])
+                    y = rng.randint(ranges[2], ranges[3])
+                centre = (x + offset[0], y + offset[1])
+                candidate = vis.move(x, y)
+                if min_distance is None:
+                    # intersecting rects have close centres
+                    cell = (int(candidate.centerx // index_cell),
+                            int(candidate.centery // index_cell))
+                else:
+                    cell = (int(centre[0] // index_cell),
+                            int(centre[1] // index_cell))
+                okay = True
+                checked = set()
+                for i in (cell[0] - 1, cell[0], cell[0] + 1):
+                    for j in (cell[1] - 1, cell[1], cell[1] + 1):
+                        for idx in index.get((i, j), ()):
+                            if idx in checked:
+                                continue
+                            checked.add(idx)
+                            p_topleft, p_rect, p_mask, p_centre, p_solid = \
+                                    placed[idx]
+                            if min_distance is not None:
+                                if (centre[0] - p_centre[0]) ** 2 + \
+                                   (centre[1] - p_centre[1]) ** 2 < \
+                                   min_distance2:
+                                    okay = False
+                            elif candidate.colliderect(p_rect):
+                                statistics["mask_checks"] += 1
+                                if mask.overlap(p_mask,
+                                                (p_topleft[0] - x,
+                                                 p_topleft[1] - y)):
+                                    okay = False
+                            if not okay:
+                                break
+                        if not okay:
+                            break
+                    if not okay:
+                        break
+                if okay:
+                    found = (x, y)
+                    break
+            if found is None:
+                break
+            index.setdefault(cell, []).append(len(placed))
+            placed.append([found, candidate, mask, centre, solid])
+
+        if len(placed) == len(items):
+            return [(x - width // 2 + size[0] // 2,
+                     - (y - height // 2 + size[1] // 2))
+                    for ((x, y), r, m, c, s), (size, rect, mask, solid) in
+                    zip(placed, items)], statistics
+    return None, statistics
+
+
+def _layout_task(task):
+    """Run _layout in a worker thread."""
+
+    return _layout(*task)
+
+
+def _layout_worker(task):
+    """Run _layout in a worker process (masks are sent as RGBA strings)."""
+
+    cloud_size, items, min_distance, seed = task
+    if min_distance is None:
+        items = [(size, rect, pygame.mask.from_surface(
+            pygame.image.fromstring(pixels, size, "RGBA")), solid)
+                 for size, rect, pixels, solid in items]
+    return _layout(cloud_size, items, min_distance, seed)
+
+
 if __name__ == "__main__":
     from expyriment.stimuli._textline import TextLine
     from expyriment import control
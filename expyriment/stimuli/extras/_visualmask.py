@@ -14,10 +14,13 @@ __revision__ = ''
 __date__ = ''
 
 
-from random import shuffle
-import tempfile
 import os
+import math
+import random
+import tempfile
+import threading
 
+import pygame
 try:
     from PIL import Image, ImageDraw, ImageFilter #import PIL
 except:
@@ -25,16 +28,17 @@ except:
 
 import expyriment
 from expyriment.misc import Clock
-from expyriment.stimuli._picture import Picture
+from expyriment.stimuli._visual import Visual
+from expyriment.stimuli import _pixelarray
 import defaults
 
 
-class VisualMask(Picture):
+class VisualMask(Visual):
     """A class implementing a visual mask stimulus."""
 
     def __init__(self, size, position=None, dot_size=None,
                  background_colour=None, dot_colour=None,
-                 dot_percentage=None, smoothing=None):
+                 dot_percentage=None, smoothing=None, pool_size=None):
         """Create a visual mask.
 
         Parameters
@@ -51,20 +55,26 @@ class VisualMask(Picture):
             percentage of covered area by the dots (1 to 100)
         smoothing : int, optional
             smoothing (default=3)
+        pool_size : int, optional
+            number of masks that are generated in advance in a background
+            thread; create_mask() hands them out round-robin (default=0,
+            no pool)
+
+        Notes
+        -----
+        The mask is generated in memory with NumPy. If NumPy is not
+        installed, the Python Imaging Library (PIL) is used. Each mask is
+        generated from a random seed, so that its surface can be rebuilt
+        identically (e.g. after clear_surface() or unload()).
 
         """
 
-        import types
-        if type(Image) is not types.ModuleType:
+        if not _pixelarray.has_numpy() and Image is None:
             message = """VisualMask can not be initialized.
-The Python package 'Python Imaging Library (PIL)' is not installed."""
+The Python package 'numpy' or 'Python Imaging Library (PIL)' is not installed."""
             raise ImportError(message)
 
-        fid, filename = tempfile.mkstemp(
-                    dir=expyriment.stimuli.defaults.tempdir,
-                    suffix=".png")
-        os.close(fid)
-        Picture.__init__(self, filename, position)
+        Visual.__init__(self, position)
 
         self._size = size
         if dot_size is not None:
@@ -91,17 +101,173 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
             self.smoothing = smoothing
         else:
             self.smoothing = defaults.visualmask_smoothing
+        if pool_size is None:
+            pool_size = defaults.visualmask_pool_size
 
+        self._seed = None
+        self._filename = None
+        self._saved_seed = None
+        self._pool = []
+        self._pool_index = 0
+        self._pool_thread = None
+        if pool_size > 0:
+            self.fill_pool(pool_size)
         self.create_mask()
 
-    def create_mask(self):
+    @property
+    def pool_size(self):
+        """Getter for pool_size."""
+
+        return len(self._pool)
+
+    @property
+    def seed(self):
+        """Getter for the seed of the current mask."""
+
+        return self._seed
+
+    @property
+    def filename(self):
+        """Getter for filename.
+
+        The mask is generated in memory. For compatibility, the current mask
+        is written to a temporary PNG file in stimuli.defaults.tempdir, when
+        the filename is requested.
+
+        """
+
+        if self._filename is None:
+            fid, self._filename = tempfile.mkstemp(
+                dir=expyriment.stimuli.defaults.tempdir, suffix=".png")
+            os.close(fid)
+        if self._saved_seed != self._seed:
+            pygame.image.save(self._get_surface(), self._filename)
+            self._saved_seed = self._seed
+        return self._filename
+
+    def _create_surface(self):
+        """Create the surface of the stimulus (again) from its seed."""
+
+        return self._make_surface(self._generate_pixels(self._seed))
+
+    def _make_surface(self, pixels):
+        """Return a surface for pixels made by _generate_pixels()."""
+
+        if _pixelarray.has_numpy():
+            return _pixelarray.array_to_surface(pixels)
+        return pygame.image.fromstring(pixels.tostring(), pixels.size,
+                                       "RGB").convert_alpha()
+
+    def _generate_pixels(self, seed):
+        """Generate the pixels of a mask.
+
+        Parameters
+        ----------
+        seed : int
+            seed of the random number generator
+
+        Returns an RGBA array (NumPy) or an RGB image (PIL).
+
+        """
+
+        s = (self._size[0] + 4 * self.smoothing,
+             self._size[1] + 4 * self.smoothing) #somewhat larger mask
+        n_dots_x = int(s[0] / self.dot_size[0]) + 1
+        n_dots_y = int(s[1] / self.dot_size[1]) + 1
+        n_dots = int(n_dots_x * n_dots_y * self.dot_percentage / 100)
+        c = (s[0] / 2, s[1] / 2)
+        box = (c[0] - self._size[0] / 2, c[1] - self._size[1] / 2,
+               c[0] + self._size[0] / 2, c[1] + self._size[1] / 2)
+
+        if not _pixelarray.has_numpy():
+            im = Image.new("RGB", s)
+            draw = ImageDraw.Draw(im)
+            draw.rectangle([(0, 0), s], outline=self.background_colour,
+                           fill=self.background_colour)
+            dots = range(n_dots_x * n_dots_y)
+            random.Random(seed).shuffle(dots)
+            for d in dots[:n_dots]:
+                y = (d / n_dots_x) * self.dot_size[1]
+                x = (d % n_dots_x) * self.dot_size[0]
+                draw.rectangle([(x, y),
+                                (x + self.dot_size[0], y + self.dot_size[1])],
+                               outline=self.dot_colour, fill=self.dot_colour)
+            for x in range(self.smoothing):
+                im = im.filter(ImageFilter.BLUR).filter(
+                    ImageFilter.SMOOTH_MORE)
+            return im.crop(box)
+
+        np = _pixelarray._np
+        rng = np.random.RandomState(seed)
+        dots = np.zeros(n_dots_x * n_dots_y, dtype=bool)
+        dots[rng.permutation(n_dots_x * n_dots_y)[:n_dots]] = True
+        dots = dots.reshape(n_dots_y, n_dots_x).T
+        dots = dots.repeat(self.dot_size[0], 0).repeat(self.dot_size[1], 1)
+        dots = dots[:s[0], :s[1]]
+        background = np.asarray(self.background_colour[:3], dtype=np.float64)
+        dot = np.asarray(self.dot_colour[:3], dtype=np.float64)
+        pixels = background + dots[:, :, np.newaxis] * (dot - background)
+        if self.smoothing > 0:
+            # Variance of one BLUR + SMOOTH_MORE step of the former PIL
+            # implementation is 2.75 + 0.74 pixels^2
+            sigma = math.sqrt(3.49 * self.smoothing)
+            pixels = _pixelarray.convolve_separable(
+                pixels, _pixelarray.gaussian_kernel(sigma))
+        rgba = np.empty((self._size[0], self._size[1], 4), dtype=np.uint8)
+        rgba[:, :, :3] = np.clip(np.round(
+            pixels[box[0]:box[0] + self._size[0],
+                   box[1]:box[1] + self._size[1]]), 0, 255)
+        rgba[:, :, 3] = 255
+        return rgba
+
+    def fill_pool(self, pool_size=None):
+        """Generate a pool of masks in a background thread.
+
+        The masks are handed out round-robin by create_mask(). The pool has
+        to be filled again after changing the properties of the mask.
+
+        Parameters
+        ----------
+        pool_size : int, optional
+            number of masks in the pool (default = current pool size)
+
+        """
+
+        if self._pool_thread is not None:
+            self._pool_thread.join()
+        if pool_size is None:
+            pool_size = len(self._pool)
+        self._pool = [None] * pool_size
+        self._pool_index = 0
+        self._pool_ready = [threading.Event() for _x in range(pool_size)]
+        self._pool_thread = threading.Thread(target=self._pool_worker,
+                                             args=(self._pool,
+                                                   self._pool_ready))
+        self._pool_thread.daemon = True
+        self._pool_thread.start()
+
+    def _pool_worker(self, pool, ready):
+        for idx in range(len(pool)):
+            seed = _new_seed()
+            pool[idx] = (seed, self._generate_pixels(seed))
+            ready[idx].set()
+
+    def create_mask(self, seed=None):
         """Creates a new visual mask.
 
+        If a pool of masks exists and no seed is given, the next mask of the
+        pool is used.
+
         Notes
         -----
         CAUTION: Depending on the size of the stimulus, this method may take
         some time to execute.
 
+        Parameters
+        ----------
+        seed : int, optional
+            seed of the random number generator (to create a certain mask)
+
         Returns
         -------
         time  : int
@@ -112,41 +278,28 @@ The Python package 'Python Imaging Library (PIL)' is not installed."""
         start = Clock._cpu_time()
         was_preloaded = self.is_preloaded
         if was_preloaded:
-            self.unload()
-
-        s = (self._size[0] + 4 * self.smoothing,
-             self._size[1] + 4 * self.smoothing) #somewhat larger mask 
-        im = Image.new("RGB", s)
-        draw = ImageDraw.Draw(im)
-        draw.rectangle([(0, 0), s], outline=self.background_colour,
-                       fill=self.background_colour)
-
-        n_dots_x = int(s[0] / self.dot_size[0]) + 1
-        n_dots_y = int(s[1] / self.dot_size[1]) + 1
-        dots = range(n_dots_x * n_dots_y)
-        shuffle(dots)
-        for d in dots[:int(len(dots) * self.dot_percentage / 100)]:
-            y = (d / n_dots_x) * self.dot_size[1]
-            x = (d % n_dots_x) * self.dot_size[0]
-            draw.rectangle([(x, y),
-                            (x + self.dot_size[0], y + self.dot_size[1])],
-                           outline=self.dot_colour, fill=self.dot_colour)
-
-        for x in range(self.smoothing):
-            im = im.filter(ImageFilter.BLUR).filter(ImageFilter.SMOOTH_MORE)
-
-        #crop image and save
-        c = (im.size[0] / 2, im.size[1] / 2)
-        box = (c[0] - self._size[0] / 2, c[1] - self._size[1] / 2,
-               c[0] + self._size[0] / 2, c[1] + self._size[1] / 2)
-        im = im.crop(box)
-        im.save(self._filename, format="png")
-
+            self.unload(keep_surface=False)
+        if self.is_compressed:
+            self.decompress()
+        if seed is None and len(self._pool) > 0:
+            self._pool_ready[self._pool_index].wait()
+            seed, pixels = self._pool[self._pool_index]
+            self._pool_index = (self._pool_index + 1) % len(self._pool)
+        else:
+            if seed is None:
+                seed = _new_seed()
+            pixels = self._generate_pixels(seed)
+        self._seed = seed
+        self._set_surface(self._make_surface(pixels))
         if was_preloaded:
             self.preload()
         return int((Clock._cpu_time() - start) * 1000)
 
 
+def _new_seed():
+    return random.randint(0, 2 ** 31 - 1)
+
+
 if __name__ == "__main__":
     from expyriment import control
     control.set_develop_mode(True)
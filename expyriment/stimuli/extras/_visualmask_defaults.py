@@ -4,3 +4,4 @@ visualmask_background_colour = None
 visualmask_dot_colour = None
 visualmask_dot_percentage = 50
 visualmask_smoothing = 3
+visualmask_pool_size = 0
@@ -0,0 +1,123 @@
+"""
+Tests for the compression backends.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import os
+import copy
+import random
+import unittest
+
+import pygame
+
+from expyriment.stimuli._compression import MemoryCompression, \
+        TempFileCompression
+
+
+def setUpModule():
+    # Decompressed surfaces are converted to the pixel format of the display
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    pygame.display.set_mode((1, 1), 0, 32)
+
+
+def tearDownModule():
+    pygame.display.quit()
+
+
+def _surface(seed, size=(20, 10)):
+    rng = random.Random(seed)
+    surface = pygame.surface.Surface(size, pygame.SRCALPHA, 32)
+    for x in range(size[0]):
+        for y in range(size[1]):
+            surface.set_at((x, y), (rng.randint(0, 255), rng.randint(0, 255),
+                                    rng.randint(0, 255), rng.randint(0, 255)))
+    return surface
+
+
+def _pixels(surface):
+    return pygame.image.tostring(surface, "RGBA")
+
+
+class MemoryCompressionTest(unittest.TestCase):
+
+    def test_in_memory(self):
+        backend = MemoryCompression(max_memory=10 ** 6)
+        surface = _surface(1)
+        handle = backend.compress(surface)
+        self.assertTrue(backend.memory_bytes > 0)
+        self.assertEqual(backend.spill_bytes, 0)
+        self.assertEqual(_pixels(handle.load()), _pixels(surface))
+        self.assertEqual(_pixels(handle.load()), _pixels(surface))
+        handle.release()
+        handle.release()
+        self.assertEqual(backend.memory_bytes, 0)
+
+    def test_handles_are_not_copied(self):
+        handle = MemoryCompression().compress(_surface(1))
+        self.assertTrue(copy.deepcopy(handle) is handle)
+
+    def test_spill_file(self):
+        backend = MemoryCompression(max_memory=0)
+        surfaces = [_surface(seed) for seed in range(4)]
+        handles = [backend.compress(s) for s in surfaces]
+        self.assertEqual(backend.memory_bytes, 0)
+        self.assertEqual(backend.spill_bytes, backend.spill_file_size)
+        for handle, surface in zip(handles, surfaces):
+            self.assertEqual(_pixels(handle.load()), _pixels(surface))
+        for handle in handles:
+            handle.release()
+        self.assertEqual(backend.spill_bytes, 0)
+        self.assertEqual(backend.spill_file_size, 0)
+        backend._close_spill_file()
+
+    def test_spill_space_is_reused(self):
+        backend = MemoryCompression(max_memory=0)
+        rng = random.Random(2)
+        live = []
+        for step in range(300):
+            if live and rng.random() < 0.5:
+                handle, surface = live.pop(rng.randrange(len(live)))
+                self.assertEqual(_pixels(handle.load()), _pixels(surface))
+                handle.release()
+            else:
+                surface = _surface(step, (rng.randint(1, 20), 5))
+                live.append((backend.compress(surface), surface))
+            # The free blocks are sorted, disjoint and not adjacent
+            end = -1
+            for offset, length in backend._spill_free:
+                self.assertTrue(offset > end and length > 0)
+                end = offset + length
+            self.assertTrue(end < backend.spill_file_size)
+            self.assertEqual(backend.spill_bytes +
+                             sum([l for o, l in backend._spill_free]),
+                             backend.spill_file_size)
+        for handle, surface in live:
+            self.assertEqual(_pixels(handle.load()), _pixels(surface))
+            handle.release()
+        self.assertEqual(backend.spill_file_size, 0)
+        backend._close_spill_file()
+
+
+class TempFileCompressionTest(unittest.TestCase):
+
+    def test_compress(self):
+        backend = TempFileCompression()
+        surface = _surface(1)
+        handle = backend.compress(surface)
+        filename = handle._data
+        self.assertTrue(os.path.isfile(filename))
+        self.assertEqual(_pixels(handle.load()), _pixels(surface))
+        handle.release()
+        self.assertFalse(os.path.isfile(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
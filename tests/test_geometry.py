@@ -0,0 +1,102 @@
+"""
+Tests for the array functions of the geometry module.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import math
+import random
+import unittest
+
+from expyriment.misc import geometry
+from expyriment.misc.geometry import XYPoint
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class PointsInPolygonTest(unittest.TestCase):
+
+    def _compare(self, polygon, points):
+        xy_polygon = [XYPoint(x, y) for x, y in polygon]
+        expected = [XYPoint(x, y).is_inside_polygon(xy_polygon)
+                    for x, y in points]
+        result = geometry.points_in_polygon(points, polygon)
+        self.assertEqual(result.shape, (len(points),))
+        self.assertEqual(list(result), expected)
+
+    def test_square(self):
+        square = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0)]
+        self.assertEqual(list(geometry.points_in_polygon(
+            [(5, 5), (15, 5), (-1, 5), (5, 11)], square)),
+                         [True, False, False, False])
+        grid = [(x * 0.5, y * 0.5) for x in range(-4, 25)
+                for y in range(-4, 25)]
+        self._compare(square, grid)
+
+    def test_random_polygons(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            n = rng.randint(3, 9)
+            polygon = [(rng.uniform(-50, 50), rng.uniform(-50, 50))
+                       for _ in range(n)]
+            points = [(rng.uniform(-60, 60), rng.uniform(-60, 60))
+                      for _ in range(200)]
+            self._compare(polygon, points)
+
+    def test_shapes(self):
+        triangle = [XYPoint(0.0, 0.0), XYPoint(4.0, 0.0), XYPoint(0.0, 4.0)]
+        points = np.zeros((3, 5, 2))
+        points[1, 2] = (1, 1)
+        result = geometry.points_in_polygon(points, triangle)
+        self.assertEqual(result.shape, (3, 5))
+        self.assertEqual(result.sum(), 1)
+        self.assertTrue(result[1, 2])
+        self.assertRaises(ValueError, geometry.points_in_polygon,
+                          [(1, 2, 3)], triangle)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class ConversionTest(unittest.TestCase):
+
+    def test_coordinates(self):
+        coordinates = np.array([[0, 0], [400, 300], [799, 599]])
+        positions = geometry.coordinates2positions(coordinates, (800, 600))
+        self.assertEqual(positions.tolist(),
+                         [[-400, 300], [0, 0], [399, -299]])
+        self.assertEqual(geometry.positions2coordinates(
+            positions, (800, 600)).tolist(), coordinates.tolist())
+        self.assertEqual(geometry.positions2coordinates(
+            [XYPoint(0, 0)], (800, 600)).tolist(), [[400, 300]])
+
+    def test_visual_angles(self):
+        # 40 cm on the screen at 20 cm distance are 90 degree
+        angles = geometry.positions2visual_angles([(400, -300), (0, 0)], 20,
+                                                  (80, 60), (800, 600))
+        self.assertTrue(np.allclose(angles, [[90, -73.739795], [0, 0]]))
+        positions = geometry.visual_angles2positions(angles, 20, (80, 60),
+                                                     (800, 600))
+        self.assertTrue(np.allclose(positions, [[400, -300], [0, 0]]))
+
+    def test_viewing_distance_per_sample(self):
+        positions = np.array([[100.0, 50.0], [100.0, 50.0]])
+        angles = geometry.positions2visual_angles(positions, [20, 40],
+                                                  (40, 30), (800, 600))
+        for angle, distance in zip(angles, (20, 40)):
+            expected = [2 * math.degrees(math.atan(2.5 / distance)),
+                        2 * math.degrees(math.atan(1.25 / distance))]
+            self.assertTrue(np.allclose(angle, expected))
+        self.assertTrue(np.allclose(geometry.visual_angles2positions(
+            angles, [20, 40], (40, 30), (800, 600)), positions))
+
+
+if __name__ == "__main__":
+    unittest.main()
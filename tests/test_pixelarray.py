@@ -0,0 +1,113 @@
+"""
+Tests for the blur kernels of the pixel array operations.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import unittest
+
+from expyriment.stimuli import _pixelarray
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class KernelTest(unittest.TestCase):
+
+    def test_gaussian_kernel(self):
+        for sigma in (0.3, 1, 2.5):
+            kernel = _pixelarray.gaussian_kernel(sigma)
+            radius = max(1, int(np.ceil(3 * sigma)))
+            self.assertEqual(len(kernel), 2 * radius + 1)
+            self.assertAlmostEqual(kernel.sum(), 1.0)
+            self.assertTrue(np.allclose(kernel, kernel[::-1]))
+            self.assertEqual(kernel.argmax(), radius)
+        self.assertTrue(_pixelarray.gaussian_kernel(2) is
+                        _pixelarray.gaussian_kernel(2.0))
+
+    def test_gaussian_kernel_sigma(self):
+        kernel = _pixelarray.gaussian_kernel(3)
+        x = np.arange(len(kernel)) - len(kernel) // 2
+        self.assertAlmostEqual(np.sqrt((kernel * x ** 2).sum()), 3, 1)
+
+    def test_box_kernel(self):
+        for size, length in ((1, 1), (3, 3), (4, 5), (5, 5), (6, 7)):
+            kernel = _pixelarray.box_kernel(size)
+            self.assertEqual(len(kernel), length)
+            self.assertTrue(np.allclose(kernel, 1.0 / length))
+
+    def test_blur_kernel(self):
+        kernel = _pixelarray.blur_kernel(2, "box")
+        x = np.arange(len(kernel)) - len(kernel) // 2
+        self.assertTrue(abs(np.sqrt((kernel * x ** 2).sum()) - 2) < 0.3)
+        self.assertTrue(_pixelarray.blur_kernel(2) is
+                        _pixelarray.gaussian_kernel(2))
+        self.assertRaises(ValueError, _pixelarray.blur_kernel, 2, "disc")
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class ConvolutionTest(unittest.TestCase):
+
+    def test_impulse_response(self):
+        kernel = _pixelarray.gaussian_kernel(1)
+        values = np.zeros((15, 15))
+        values[7, 7] = 1
+        result = _pixelarray.convolve_separable(values, kernel)
+        self.assertTrue(np.allclose(result[4:11, 4:11],
+                                    np.outer(kernel, kernel)))
+        self.assertAlmostEqual(result.sum(), 1.0)
+
+    def test_single_axis(self):
+        values = np.zeros((5, 5))
+        values[2, 2] = 1
+        result = _pixelarray.convolve_separable(
+            values, _pixelarray.box_kernel(3), axes=(1,))
+        self.assertTrue(np.allclose(result[2, 1:4], 1 / 3.0))
+        self.assertAlmostEqual(result[1:4, 2].sum(), 1 / 3.0)
+
+    def test_edges_are_repeated(self):
+        values = np.arange(12, dtype=float).reshape(3, 4)
+        result = _pixelarray.convolve_separable(
+            values, _pixelarray.box_kernel(3), axes=(0,))
+        self.assertTrue(np.allclose(result[0], (2 * values[0] +
+                                                values[1]) / 3.0))
+        self.assertTrue(np.allclose(result[1], values[1]))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class BlurTest(unittest.TestCase):
+
+    def test_uniform_colour_is_kept(self):
+        pixels = np.zeros((10, 8, 4), dtype=np.uint8)
+        pixels[...] = (200, 100, 50, 255)
+        for mode in ("gaussian", "box"):
+            self.assertTrue((_pixelarray.blur(pixels, 2, mode) ==
+                             pixels).all())
+
+    def test_transparent_pixels_do_not_darken(self):
+        pixels = np.zeros((9, 9, 4), dtype=np.uint8)
+        pixels[3:6, 3:6] = (255, 128, 0, 255)
+        blurred = _pixelarray.blur(pixels, 1)
+        visible = blurred[..., 3] > 0
+        self.assertTrue(visible.sum() > 9)
+        self.assertTrue((blurred[visible][:, :3] == (255, 128, 0)).all())
+        self.assertTrue(blurred[4, 4, 3] < 255)
+
+    def test_no_blur(self):
+        pixels = np.zeros((3, 3, 4), dtype=np.uint8)
+        blurred = _pixelarray.blur(pixels, 0)
+        self.assertTrue((blurred == pixels).all())
+        self.assertFalse(blurred is pixels)
+        self.assertRaises(ValueError, _pixelarray.blur, pixels, 1, "disc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests for the edge index of shapes.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import math
+import random
+import unittest
+
+from expyriment.misc.geometry import XYPoint, lines_intersect
+from expyriment.stimuli import _shape
+from expyriment.stimuli._shape import _EdgeIndex
+
+
+def _edges(points):
+    return [(points[i], points[(i + 1) % len(points)])
+            for i in range(len(points))]
+
+
+def _brute_force(a_points, b_points):
+    for a, b in _edges(a_points):
+        for c, d in _edges(b_points):
+            if lines_intersect(XYPoint(*a), XYPoint(*b), XYPoint(*c),
+                               XYPoint(*d)):
+                return True
+    return False
+
+
+def _ellipse_with_chord(n, width, height, dx=0.0, dy=0.0):
+    """Return the points of half an ellipse, closed by a long chord."""
+
+    return [(dx + width * math.cos(math.pi * i / (n - 1)),
+             dy + height * math.sin(math.pi * i / (n - 1)))
+            for i in range(n)]
+
+
+def _random_polygon(rng, n, centre, radius):
+    return [(centre[0] + rng.uniform(0.2, 1) * radius * math.cos(phi),
+             centre[1] + rng.uniform(0.2, 1) * radius * math.sin(phi))
+            for phi in sorted([rng.uniform(0, 2 * math.pi)
+                               for _ in range(n)])]
+
+
+class EdgeIndexTest(unittest.TestCase):
+
+    def _check(self, rng):
+        for _ in range(60):
+            a = _random_polygon(rng, rng.randint(3, 40), (0, 0), 50)
+            if rng.random() < 0.5:
+                a = _ellipse_with_chord(rng.randint(20, 200), 60, 30)
+            b = _random_polygon(rng, rng.randint(3, 12),
+                                (rng.uniform(-80, 80), rng.uniform(-80, 80)),
+                                rng.uniform(5, 100))
+            index = _EdgeIndex(a)
+            self.assertEqual(index.edges_intersect(b), _brute_force(a, b))
+            self.assertEqual(_EdgeIndex(b).edges_intersect(a),
+                             _brute_force(a, b))
+
+    @unittest.skipIf(_shape._np is None, "NumPy is not installed")
+    def test_edges_intersect(self):
+        self._check(random.Random(5))
+
+    def test_edges_intersect_without_numpy(self):
+        np = _shape._np
+        _shape._np = None
+        try:
+            self._check(random.Random(6))
+        finally:
+            _shape._np = np
+
+    def test_long_edges_are_not_gridded(self):
+        # The chord spans the whole grid of the short edges
+        points = _ellipse_with_chord(2000, 500, 300)
+        np = _shape._np
+        for use_numpy in (True, False):
+            if use_numpy and np is None:
+                continue
+            _shape._np = np if use_numpy else None
+            try:
+                index = _EdgeIndex(points)
+                if use_numpy:
+                    n_cells = len(index._cells)
+                else:
+                    n_cells = sum([len(x) for x in index._buckets.values()])
+                self.assertEqual(list(index._long), [len(points) - 1])
+                self.assertTrue(n_cells <= 4 * len(points))
+                # A small polygon crossing only the chord
+                self.assertTrue(index.edges_intersect(
+                    [(-5, -5), (5, -5), (5, 5), (-5, 5)]))
+                self.assertFalse(index.edges_intersect(
+                    [(-5, 5), (5, 5), (5, 15), (-5, 15)]))
+            finally:
+                _shape._np = np
+
+
+if __name__ == "__main__":
+    unittest.main()
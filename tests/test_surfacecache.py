@@ -0,0 +1,90 @@
+"""
+Tests for the surface cache.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import unittest
+
+import pygame
+
+from expyriment.stimuli._surfacecache import SurfaceCache
+
+
+def _surface(width, height=1):
+    return pygame.surface.Surface((width, height), 0, 32)
+
+
+class SurfaceCacheTest(unittest.TestCase):
+
+    def test_make_key(self):
+        key = SurfaceCache.make_key(int, ([1, 2], {"b": [3], "a": 1}))
+        self.assertEqual(key, (int, ((1, 2), (("a", 1), ("b", (3,))))))
+        self.assertEqual(key, SurfaceCache.make_key(
+            int, ((1, 2), {"a": 1, "b": (3,)})))
+        hash(key)
+
+    def test_get_and_put(self):
+        cache = SurfaceCache(1000)
+        surface = _surface(10)
+        self.assertEqual(cache.get("a"), None)
+        cache.put("a", surface)
+        self.assertTrue(cache.get("a") is surface)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.n_surfaces, 1)
+        self.assertEqual(cache.n_bytes, 40)
+
+    def test_is_shared(self):
+        cache = SurfaceCache(1000)
+        surface = _surface(10)
+        cache.put("a", surface)
+        self.assertTrue(cache.is_shared(surface))
+        self.assertFalse(cache.is_shared(surface.copy()))
+        cache.put("a", _surface(10))
+        self.assertFalse(cache.is_shared(surface))
+        self.assertEqual(cache.n_bytes, 40)
+
+    def test_lru_eviction(self):
+        cache = SurfaceCache(120)
+        for key in "abc":
+            cache.put(key, _surface(10))
+        cache.get("a")
+        cache.put("d", _surface(10))
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get("b"), None)
+        for key in "acd":
+            self.assertNotEqual(cache.get(key), None)
+        self.assertEqual(cache.n_bytes, 120)
+
+    def test_too_large(self):
+        cache = SurfaceCache(100)
+        cache.put("a", _surface(30))
+        self.assertEqual(cache.n_surfaces, 0)
+
+    def test_max_bytes(self):
+        cache = SurfaceCache(1000)
+        for key in "abcd":
+            cache.put(key, _surface(10))
+        cache.max_bytes = 80
+        self.assertEqual(cache.n_surfaces, 2)
+        self.assertEqual(cache.n_bytes, 80)
+        self.assertNotEqual(cache.get("d"), None)
+
+    def test_clear(self):
+        cache = SurfaceCache(1000)
+        cache.put("a", _surface(10))
+        cache.get("a")
+        cache.clear()
+        self.assertEqual((cache.n_surfaces, cache.n_bytes, cache.hits),
+                         (0, 0, 0))
+        self.assertEqual(cache.get("a"), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
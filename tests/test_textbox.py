@@ -0,0 +1,113 @@
+"""
+Tests for the line wrapping of text boxes.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import random
+import unittest
+
+from expyriment.stimuli import _textbox
+from expyriment.stimuli._textbox import _wrap_lines
+
+
+class _Font(object):
+    """A font with a fixed width per character."""
+
+    def __init__(self, widths=None):
+        self.widths = widths or {}
+        self.n_calls = 0
+
+    def size(self, text):
+        self.n_calls += 1
+        return (sum([self.widths.get(c, 10) for c in text]), 20)
+
+
+class _PooledFont(_Font):
+    key = ("font.ttf", 20, False, False, False)
+
+
+def _reference_wrap(string, font, width):
+    """The greedy line wrapping of the former render_textrect."""
+
+    final_lines = []
+    for requested_line in string.splitlines():
+        if font.size(requested_line)[0] > width:
+            words = requested_line.split(' ')
+            for word in words:
+                if font.size(word)[0] >= width:
+                    raise Exception
+            accumulated_line = ""
+            for word in words:
+                test_line = accumulated_line + word + " "
+                if font.size(test_line)[0] < width:
+                    accumulated_line = test_line
+                else:
+                    final_lines.append(accumulated_line)
+                    accumulated_line = word + " "
+            final_lines.append(accumulated_line)
+        else:
+            final_lines.append(requested_line)
+    return final_lines
+
+
+class WrapLinesTest(unittest.TestCase):
+
+    def setUp(self):
+        _textbox._line_breaks.clear()
+
+    def test_short_lines(self):
+        self.assertEqual(_wrap_lines("ab cd\nef", _Font(), 100),
+                         ["ab cd", "ef"])
+
+    def test_wrap(self):
+        self.assertEqual(_wrap_lines("aa bb cc dd", _Font(), 70),
+                         ["aa bb ", "cc dd "])
+        self.assertEqual(_wrap_lines("aaaaaa b", _Font(), 70),
+                         ["", "aaaaaa ", "b "])
+
+    def test_word_too_long(self):
+        self.assertRaises(Exception, _wrap_lines, "a bbbbbbb", _Font(), 70)
+
+    def test_same_as_reference(self):
+        rng = random.Random(4)
+        widths = dict([(c, rng.randint(3, 15)) for c in "abcdefgh "])
+        font = _Font(widths)
+        for _ in range(200):
+            lines = []
+            for _ in range(rng.randint(1, 4)):
+                words = ["".join([rng.choice("abcdefgh")
+                                  for _ in range(rng.randint(0, 8))])
+                         for _ in range(rng.randint(1, 30))]
+                lines.append(" ".join(words))
+            text = "\n".join(lines)
+            width = rng.randint(130, 400)
+            self.assertEqual(_wrap_lines(text, font, width),
+                             _reference_wrap(text, font, width))
+
+    def test_words_are_measured_once(self):
+        font = _Font()
+        _wrap_lines(" ".join(["ab", "cde"] * 100), font, 100)
+        self.assertTrue(font.n_calls <= 5)
+
+    def test_pooled_font_cache(self):
+        font = _PooledFont()
+        lines = _wrap_lines("aa bb cc dd", font, 70)
+        n_calls = font.n_calls
+        lines.append("x")
+        self.assertEqual(_wrap_lines("aa bb cc dd", font, 70),
+                         ["aa bb ", "cc dd "])
+        self.assertEqual(font.n_calls, n_calls)
+        self.assertEqual(_wrap_lines("aa bb cc dd", font, 71),
+                         ["aa bb ", "cc dd "])
+        self.assertTrue(font.n_calls > n_calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
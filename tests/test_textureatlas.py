@@ -0,0 +1,133 @@
+"""
+Tests for the texture atlas.
+
+The allocator of the atlas pages is tested without an OpenGL context.
+
+"""
+
+__author__ = 'Florian Krause <florian@expyriment.org>, \
+Oliver Lindemann <oliver@expyriment.org>'
+__version__ = ''
+__revision__ = ''
+__date__ = ''
+
+
+import copy
+import random
+import unittest
+
+from expyriment.stimuli._textureatlas import AtlasRegion, _AtlasPage
+
+
+def _make_page(size):
+    """Return an atlas page without an OpenGL texture."""
+
+    page = object.__new__(_AtlasPage)
+    page.size = size
+    page.texture = None
+    page._live = {}
+    page._reset_allocator()
+    return page
+
+
+def _add_region(page, width, height):
+    rect = page.allocate(width, height)
+    if rect is None:
+        return None
+    region = AtlasRegion(page, rect, (width - 2, height - 2))
+    page._live[id(region)] = region
+    return region
+
+
+def _overlap(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and \
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+class AtlasPageTest(unittest.TestCase):
+
+    def test_regions_do_not_overlap(self):
+        page = _make_page(256)
+        rng = random.Random(1)
+        regions = []
+        for _ in range(500):
+            if regions and rng.random() < 0.4:
+                regions.pop(rng.randrange(len(regions))).release()
+            else:
+                region = _add_region(page, rng.randint(3, 40),
+                                     rng.randint(3, 40))
+                if region is not None:
+                    regions.append(region)
+            rects = [r._rect for r in regions]
+            for rect in rects:
+                self.assertTrue(rect[0] >= 0 and rect[1] >= 0)
+                self.assertTrue(rect[0] + rect[2] <= page.size)
+                self.assertTrue(rect[1] + rect[3] <= page.size)
+            for i, a in enumerate(rects):
+                for b in rects[i + 1:]:
+                    self.assertFalse(_overlap(a, b))
+            for free in page._free:
+                for rect in rects:
+                    self.assertFalse(_overlap(free, rect))
+        self.assertEqual(page.n_regions, len(regions))
+
+    def test_full_page(self):
+        page = _make_page(64)
+        self.assertEqual(page.allocate(64, 64), (0, 0, 64, 64))
+        self.assertEqual(page.allocate(1, 1), None)
+        self.assertEqual(_make_page(64).allocate(65, 1), None)
+
+    def test_release_all_resets_page(self):
+        page = _make_page(64)
+        regions = [_add_region(page, 16, 16) for _ in range(8)]
+        for region in regions:
+            region.release()
+        self.assertEqual(page.n_regions, 0)
+        self.assertEqual(page._shelves, [])
+        self.assertEqual(page._free, [])
+        self.assertEqual(page.allocate(64, 64), (0, 0, 64, 64))
+
+    def test_coalesce(self):
+        page = _make_page(64)
+        regions = [_add_region(page, 16, 16) for _ in range(4)]
+        keep = _add_region(page, 16, 16)
+        for region in regions:
+            region.release()
+        self.assertEqual(page._free, [(0, 0, 64, 16)])
+        self.assertEqual(page.allocate(64, 16), (0, 0, 64, 16))
+        keep.release()
+
+    def test_coalesce_vertical(self):
+        page = _make_page(64)
+        page._free = [(0, 0, 8, 8), (8, 0, 8, 8), (0, 8, 16, 8)]
+        page._coalesce()
+        self.assertEqual(page._free, [(0, 0, 16, 16)])
+
+
+class AtlasRegionTest(unittest.TestCase):
+
+    def test_copies_share_the_region(self):
+        page = _make_page(64)
+        region = _add_region(page, 10, 10)
+        copied = copy.deepcopy(region)
+        self.assertTrue(copied is region)
+        self.assertEqual(region.n_users, 2)
+        region.release()
+        self.assertEqual(page.n_regions, 1)
+        region.release()
+        self.assertEqual(page.n_regions, 0)
+        region.release()
+        self.assertEqual(region.n_users, 0)
+
+    def test_uv(self):
+        page = _make_page(100)
+        region = AtlasRegion(page, (10, 20, 12, 7), (10, 5))
+        self.assertEqual(region.size, (10, 5))
+        self.assertAlmostEqual(region.uv[0], 0.11)
+        self.assertAlmostEqual(region.uv[1], 0.21)
+        self.assertAlmostEqual(region.uv[2], 0.21)
+        self.assertAlmostEqual(region.uv[3], 0.26)
+
+
+if __name__ == "__main__":
+    unittest.main()